@@ -0,0 +1,257 @@
+import asyncio
+import os
+import logging
+import tempfile
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import metrics
+from audio_upload import AUDIO_EXTENSIONS, AUDIO_UPLOAD_MAX_BYTES, UploadTooLargeError, remove_spooled
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Recording ingestion configuration
+AUDIO_SEGMENT_SECONDS = float(os.getenv("AUDIO_SEGMENT_SECONDS", "30"))
+AUDIO_SEGMENT_WAIT_SECONDS = float(os.getenv("AUDIO_SEGMENT_WAIT_SECONDS", "5"))
+AUDIO_INGEST_IDLE_SECONDS = float(os.getenv("AUDIO_INGEST_IDLE_SECONDS", "900"))
+AUDIO_INGEST_DIR = os.getenv("AUDIO_INGEST_DIR", os.path.join(tempfile.gettempdir(), "audio_ingest"))
+# Per-worker limits on recordings in progress and their spool files in AUDIO_INGEST_DIR
+AUDIO_INGEST_MAX_RECORDINGS = int(os.getenv("AUDIO_INGEST_MAX_RECORDINGS", "50"))
+AUDIO_INGEST_MAX_TOTAL_BYTES = int(os.getenv("AUDIO_INGEST_MAX_TOTAL_BYTES", str(512 * 1024 * 1024)))
+
+# transcribe(path, mime_type, start_ms, end_ms) -> text of that time range; `path`
+# holds the recording so far and the callee cuts the range out of it
+TranscribeFn = Callable[[str, str, int, int], Awaitable[str]]
+
+
+class ChunkOrderError(Exception):
+    """Raised when a chunk arrives out of order"""
+
+
+class IngestCapacityError(Exception):
+    """Raised when the worker already holds as many recordings or bytes as it may"""
+
+
+class Recording:
+    """A recording being assembled from ordered chunks"""
+
+    def __init__(self, session_id: str, recording_id: str, mime_type: str):
+        self.session_id = session_id
+        self.recording_id = recording_id
+        self.mime_type = mime_type
+        self.path = os.path.join(AUDIO_INGEST_DIR, f"{uuid.uuid4().hex}{AUDIO_EXTENSIONS.get(mime_type, '.bin')}")
+        self.next_seq = 0
+        self.size = 0
+        self.elapsed_ms = 0
+        self.scheduled_until_ms = 0
+        self.segments: List[Dict] = []
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+
+def format_timestamp(ms: int) -> str:
+    seconds = int(ms // 1000)
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+def _copy_prefix(source_path: str, size: int) -> str:
+    """Copy the first `size` bytes of a growing file so it can be read while appends continue"""
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(source_path)[1])
+    with open(source_path, "rb") as source, os.fdopen(fd, "wb") as target:
+        remaining = size
+        while remaining > 0:
+            block = source.read(min(remaining, 1024 * 1024))
+            if not block:
+                break
+            target.write(block)
+            remaining -= len(block)
+    return path
+
+
+class AudioIngest:
+    """Assembles Part 5 recordings from chunks sent while the candidate records.
+
+    Chunks are appended in order to a spool file per session. Each time another
+    AUDIO_SEGMENT_SECONDS of audio has arrived, that time range is cut out and
+    transcribed on its own in the background, so when the recording is
+    submitted only the tail after the last transcribed segment is sent to the
+    model. Without `transcribe` chunks are only assembled. State is per worker
+    process, so chunk uploads and the final submit must reach the same worker;
+    otherwise the client falls back to uploading the whole recording.
+    """
+
+    def __init__(self, transcribe: Optional[TranscribeFn], segment_seconds: float = AUDIO_SEGMENT_SECONDS, max_bytes: int = AUDIO_UPLOAD_MAX_BYTES,
+                 max_recordings: int = AUDIO_INGEST_MAX_RECORDINGS, max_total_bytes: int = AUDIO_INGEST_MAX_TOTAL_BYTES):
+        self.transcribe = transcribe
+        self.segment_ms = int(segment_seconds * 1000)
+        self.max_bytes = max_bytes
+        self.max_recordings = max_recordings
+        self.max_total_bytes = max_total_bytes
+        self.recordings: Dict[str, Recording] = {}
+        self._tasks = set()
+
+    async def append(self, session_id: str, recording_id: str, seq: int, chunks: AsyncIterator[bytes], mime_type: str, elapsed_ms: int) -> Dict:
+        """Append chunk `seq` of recording `recording_id` to the session's recording.
+
+        Seq 0 of a new recording_id replaces the recording in progress; a resent
+        seq 0 of the same recording_id is a duplicate like any other chunk.
+        """
+        self.expire_idle()
+        recording = self.recordings.get(session_id)
+        if recording and recording.recording_id != recording_id:
+            if seq != 0:
+                raise ChunkOrderError("Chunk belongs to a recording that is no longer in progress")
+            self.discard(session_id)
+            recording = None
+        if recording is None:
+            if seq != 0:
+                raise ChunkOrderError("No recording in progress for this session")
+            if len(self.recordings) >= self.max_recordings:
+                metrics.increment("audio_ingest", "rejected_capacity")
+                raise IngestCapacityError(f"{self.max_recordings} recordings already in progress")
+            os.makedirs(AUDIO_INGEST_DIR, exist_ok=True)
+            recording = self.recordings[session_id] = Recording(session_id, recording_id, mime_type)
+
+        async with recording.lock:
+            if seq < recording.next_seq:
+                # Client retry of a chunk that already arrived
+                metrics.increment("audio_ingest", "duplicate_chunks")
+                return self.status(session_id)
+            if seq > recording.next_seq:
+                raise ChunkOrderError(f"Expected chunk {recording.next_seq}, got {seq}")
+
+            offset = recording.size
+            try:
+                with open(recording.path, "ab") as spool:
+                    async for block in chunks:
+                        if recording.size + len(block) > self.max_bytes:
+                            raise UploadTooLargeError(f"Audio recording exceeds {self.max_bytes} bytes")
+                        if self.total_bytes() + len(block) > self.max_total_bytes:
+                            metrics.increment("audio_ingest", "rejected_capacity")
+                            raise IngestCapacityError(f"Recordings in progress already use {self.max_total_bytes} bytes")
+                        await asyncio.to_thread(spool.write, block)
+                        recording.size += len(block)
+            except UploadTooLargeError:
+                self.discard(session_id)
+                raise
+            except BaseException:
+                # Drop the partial chunk so a retry of this seq starts at the same offset
+                os.truncate(recording.path, offset)
+                recording.size = offset
+                metrics.increment("audio_ingest", "partial_chunks")
+                raise
+
+            recording.next_seq = seq + 1
+            recording.elapsed_ms = max(recording.elapsed_ms, elapsed_ms)
+            recording.updated_at = time.monotonic()
+            metrics.increment("audio_ingest", "chunks")
+            self._schedule_segments(recording)
+        return self.status(session_id)
+
+    def _schedule_segments(self, recording: Recording):
+        if self.transcribe is None:
+            return
+        while recording.elapsed_ms - recording.scheduled_until_ms >= self.segment_ms:
+            start_ms = recording.scheduled_until_ms
+            end_ms = start_ms + self.segment_ms
+            task = asyncio.create_task(self._transcribe_segment(recording, recording.size, start_ms, end_ms))
+            self._tasks.add(task)
+            task.add_done_callback(self._forget)
+            recording.segments.append({"start_ms": start_ms, "end_ms": end_ms, "task": task})
+            recording.scheduled_until_ms = end_ms
+
+    def _forget(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        # Failures are logged in _transcribe_segment; mark them retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def _transcribe_segment(self, recording: Recording, size: int, start_ms: int, end_ms: int) -> str:
+        prefix_path = await asyncio.to_thread(_copy_prefix, recording.path, size)
+        started = time.monotonic()
+        try:
+            text = await self.transcribe(prefix_path, recording.mime_type, start_ms, end_ms)
+            metrics.increment("audio_ingest", "segments_transcribed")
+            metrics.observe("audio_segment_transcription_seconds", time.monotonic() - started)
+            return text
+        except Exception as e:
+            metrics.increment("audio_ingest", "segment_failures")
+            logger.warning(f"Early transcription of {format_timestamp(start_ms)}-{format_timestamp(end_ms)} failed for session {recording.session_id}: {e}")
+            raise
+        finally:
+            remove_spooled(prefix_path)
+
+    def total_bytes(self) -> int:
+        return sum(recording.size for recording in self.recordings.values())
+
+    def status(self, session_id: str) -> Dict:
+        recording = self.recordings.get(session_id)
+        if not recording:
+            return {"sessionId": session_id, "receivedChunks": 0, "bytes": 0, "elapsedMs": 0, "transcribedSegments": 0}
+        return {
+            "sessionId": session_id,
+            "receivedChunks": recording.next_seq,
+            "bytes": recording.size,
+            "elapsedMs": recording.elapsed_ms,
+            "transcribedSegments": sum(1 for s in recording.segments if s["task"].done() and not s["task"].cancelled() and not s["task"].exception())
+        }
+
+    async def finish(self, session_id: str, wait_seconds: float = AUDIO_SEGMENT_WAIT_SECONDS) -> Optional[Dict]:
+        """Close the recording, returning its spool file and the transcription of its leading segments.
+
+        The caller owns the spool file afterwards and must remove it.
+        """
+        recording = self.recordings.pop(session_id, None)
+        if recording is None or recording.size == 0:
+            if recording:
+                remove_spooled(recording.path)
+            return None
+
+        async with recording.lock:
+            tasks = [segment["task"] for segment in recording.segments]
+            if tasks:
+                await asyncio.wait(tasks, timeout=wait_seconds)
+        # Whatever is still running is transcribed with the tail instead
+        self._cancel_segments(recording)
+
+        # Only a gap-free run of segments from the start can be handed over
+        texts = []
+        transcribed_until_ms = 0
+        for segment in recording.segments:
+            task = segment["task"]
+            if not task.done() or task.cancelled() or task.exception():
+                break
+            texts.append(task.result().strip())
+            transcribed_until_ms = segment["end_ms"]
+
+        metrics.observe("audio_early_transcribed_ms", transcribed_until_ms)
+        metrics.observe("audio_tail_ms", max(0, recording.elapsed_ms - transcribed_until_ms))
+        return {
+            "path": recording.path,
+            "mime_type": recording.mime_type,
+            "size": recording.size,
+            "elapsed_ms": recording.elapsed_ms,
+            "prior_transcription": " ".join(text for text in texts if text) or None,
+            "transcribed_until_ms": transcribed_until_ms
+        }
+
+    def _cancel_segments(self, recording: Recording):
+        for segment in recording.segments:
+            if not segment["task"].done():
+                segment["task"].cancel()
+                metrics.increment("audio_ingest", "segments_cancelled")
+
+    def discard(self, session_id: str):
+        recording = self.recordings.pop(session_id, None)
+        if recording:
+            self._cancel_segments(recording)
+            remove_spooled(recording.path)
+
+    def expire_idle(self):
+        """Drop recordings that were abandoned mid-way"""
+        cutoff = time.monotonic() - AUDIO_INGEST_IDLE_SECONDS
+        for session_id in [sid for sid, r in self.recordings.items() if r.updated_at < cutoff]:
+            metrics.increment("audio_ingest", "expired")
+            self.discard(session_id)
@@ -0,0 +1,252 @@
+import array
+import asyncio
+import functools
+import math
+import multiprocessing
+import os
+import logging
+import shutil
+import subprocess
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from pydantic import BaseModel
+
+import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Speech-grade target encoding for recordings sent to the model
+AUDIO_NORMALIZE_ENABLED = os.getenv("AUDIO_NORMALIZE_ENABLED", "true").lower() == "true"
+AUDIO_NORMALIZE_WORKERS = int(os.getenv("AUDIO_NORMALIZE_WORKERS", "2"))
+AUDIO_NORMALIZE_SAMPLE_RATE = int(os.getenv("AUDIO_NORMALIZE_SAMPLE_RATE", "16000"))
+AUDIO_NORMALIZE_BITRATE = os.getenv("AUDIO_NORMALIZE_BITRATE", "24k")
+AUDIO_SILENCE_THRESHOLD_DB = float(os.getenv("AUDIO_SILENCE_THRESHOLD_DB", "-45"))
+AUDIO_NORMALIZE_TIMEOUT_SECONDS = float(os.getenv("AUDIO_NORMALIZE_TIMEOUT_SECONDS", "60"))
+
+FFMPEG_PATH = os.getenv("FFMPEG_PATH") or shutil.which("ffmpeg")
+
+# Format of clips cut from recordings
+CLIP_MIME_TYPE = "audio/ogg"
+
+# Silence is trimmed in 20 ms frames
+_FRAME_SECONDS = 0.02
+
+# Workers start from a clean forkserver (spawn where unavailable) instead of
+# forking the server with its event loop, sockets and client threads
+_POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+class NormalizedAudio(BaseModel):
+    path: str
+    mime_type: str
+    container: Optional[str]
+    method: str  # "ffmpeg", "python" or "passthrough"
+    input_bytes: int
+    output_bytes: int
+    seconds: float
+
+
+def detect_container(header: bytes) -> Optional[str]:
+    """MIME type of an audio file from its leading bytes, or None if unknown"""
+    if header.startswith(b"\x1a\x45\xdf\xa3"):
+        return "audio/webm"
+    if header.startswith(b"OggS"):
+        return "audio/ogg"
+    if header.startswith(b"RIFF") and header[8:12] == b"WAVE":
+        return "audio/wav"
+    if header.startswith(b"fLaC"):
+        return "audio/flac"
+    if header[4:8] == b"ftyp":
+        return "audio/mp4"
+    if header.startswith(b"ID3") or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return "audio/mpeg"
+    return None
+
+
+def _ffmpeg_normalize(source_path: str, target_path: str, sample_rate: int, bitrate: str, threshold_db: float, timeout: float,
+                      trim_leading: bool = True):
+    """Mono, resampled Opus in Ogg with trailing (and unless trim_leading is False, leading) silence removed"""
+    trim = f"silenceremove=start_periods=1:start_threshold={threshold_db}dB"
+    silence_filter = f"{trim},areverse,{trim},areverse" if trim_leading else f"areverse,{trim},areverse"
+    subprocess.run(
+        [
+            FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y", "-i", source_path,
+            "-vn", "-ac", "1", "-ar", str(sample_rate),
+            "-af", silence_filter,
+            "-c:a", "libopus", "-b:a", bitrate, "-application", "voip",
+            target_path,
+        ],
+        check=True, capture_output=True, timeout=timeout,
+    )
+
+
+def _ffmpeg_cut(source_path: str, target_path: str, start_ms: int, end_ms: Optional[int], sample_rate: int, bitrate: str, timeout: float):
+    """Mono Opus clip of [start_ms, end_ms) of a recording, to the end if end_ms is None"""
+    bounds = ["-ss", f"{start_ms / 1000:.3f}"] + (["-to", f"{end_ms / 1000:.3f}"] if end_ms is not None else [])
+    subprocess.run(
+        [
+            FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y", "-i", source_path, *bounds,
+            "-vn", "-ac", "1", "-ar", str(sample_rate),
+            "-c:a", "libopus", "-b:a", bitrate, "-application", "voip",
+            target_path,
+        ],
+        check=True, capture_output=True, timeout=timeout,
+    )
+
+
+def cut_file(source_path: str, start_ms: int, end_ms: Optional[int] = None, sample_rate: int = AUDIO_NORMALIZE_SAMPLE_RATE,
+             bitrate: str = AUDIO_NORMALIZE_BITRATE, timeout: float = AUDIO_NORMALIZE_TIMEOUT_SECONDS) -> str:
+    """Cut one time range of a recording into its own file; runs inside the process pool"""
+    target_path = f"{os.path.splitext(source_path)[0]}.{start_ms}-{end_ms if end_ms is not None else 'end'}.ogg"
+    try:
+        _ffmpeg_cut(source_path, target_path, start_ms, end_ms, sample_rate, bitrate, timeout)
+    except Exception:
+        if os.path.exists(target_path):
+            os.unlink(target_path)
+        raise
+    return target_path
+
+
+def _python_normalize_wav(source_path: str, target_path: str, sample_rate: int, threshold_db: float, trim_leading: bool = True):
+    """Pure-Python fallback for PCM WAV: downmix, resample and trim to 16-bit mono"""
+    with wave.open(source_path, "rb") as source:
+        channels, width, rate, frames = source.getnchannels(), source.getsampwidth(), source.getframerate(), source.getnframes()
+        if width != 2:
+            raise ValueError(f"Unsupported WAV sample width: {width}")
+        samples = array.array("h", source.readframes(frames))
+
+    # Downmix
+    if channels > 1:
+        samples = array.array("h", (sum(samples[i:i + channels]) // channels for i in range(0, len(samples), channels)))
+
+    # Linear-interpolation resample
+    if rate != sample_rate and samples:
+        step = rate / sample_rate
+        count = int(len(samples) / step)
+        last = len(samples) - 1
+        resampled = array.array("h", bytes(2 * count))
+        for i in range(count):
+            position = i * step
+            index = int(position)
+            fraction = position - index
+            following = samples[min(index + 1, last)]
+            resampled[i] = int(samples[index] + (following - samples[index]) * fraction)
+        samples = resampled
+
+    # Trim frames quieter than the threshold from both ends
+    frame = max(1, int(sample_rate * _FRAME_SECONDS))
+    threshold = 32768 * (10 ** (threshold_db / 20))
+
+    def loud(start: int) -> bool:
+        window = samples[start:start + frame]
+        return bool(window) and math.sqrt(sum(s * s for s in window) / len(window)) >= threshold
+
+    starts = range(0, len(samples), frame)
+    first = next((s for s in starts if loud(s)), None)
+    if first is None:
+        samples = array.array("h")
+    else:
+        last_loud = next(s for s in reversed(starts) if loud(s))
+        samples = samples[first if trim_leading else 0:last_loud + frame]
+
+    with wave.open(target_path, "wb") as target:
+        target.setnchannels(1)
+        target.setsampwidth(2)
+        target.setframerate(sample_rate)
+        target.writeframes(samples.tobytes())
+
+
+def normalize_file(source_path: str, mime_hint: Optional[str], sample_rate: int = AUDIO_NORMALIZE_SAMPLE_RATE,
+                   bitrate: str = AUDIO_NORMALIZE_BITRATE, threshold_db: float = AUDIO_SILENCE_THRESHOLD_DB,
+                   timeout: float = AUDIO_NORMALIZE_TIMEOUT_SECONDS, trim_leading: bool = True) -> dict:
+    """Normalize one recording; runs inside the process pool.
+
+    With trim_leading=False the output keeps the input's timeline, so offsets
+    measured on the original (such as early-transcribed segments) still apply.
+    """
+    started = time.monotonic()
+    with open(source_path, "rb") as source:
+        container = detect_container(source.read(64))
+    input_bytes = os.path.getsize(source_path)
+    base = os.path.splitext(source_path)[0]
+
+    path, mime_type, method = source_path, container or mime_hint, "passthrough"
+    try:
+        if FFMPEG_PATH:
+            path, mime_type, method = f"{base}.normalized.ogg", "audio/ogg", "ffmpeg"
+            _ffmpeg_normalize(source_path, path, sample_rate, bitrate, threshold_db, timeout, trim_leading)
+        elif container == "audio/wav":
+            path, mime_type, method = f"{base}.normalized.wav", "audio/wav", "python"
+            _python_normalize_wav(source_path, path, sample_rate, threshold_db, trim_leading)
+    except Exception as e:
+        # Send the original with its detected type rather than fail the evaluation
+        if path != source_path and os.path.exists(path):
+            os.unlink(path)
+        logger.warning(f"Audio normalization ({method}) failed, sending original: {e}")
+        path, mime_type, method = source_path, container or mime_hint, "passthrough"
+
+    return {
+        "path": path,
+        "mime_type": mime_type,
+        "container": container,
+        "method": method,
+        "input_bytes": input_bytes,
+        "output_bytes": os.path.getsize(path),
+        "seconds": time.monotonic() - started
+    }
+
+
+class AudioNormalizer:
+    """Runs normalize_file in a process pool so decoding never blocks the event loop"""
+
+    def __init__(self, workers: int = AUDIO_NORMALIZE_WORKERS, enabled: bool = AUDIO_NORMALIZE_ENABLED):
+        self.workers = workers
+        self.enabled = enabled
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_POOL_CONTEXT)
+        return self._pool
+
+    async def normalize(self, path: str, mime_hint: Optional[str], trim_leading: bool = True) -> NormalizedAudio:
+        if not self.enabled:
+            size = os.path.getsize(path)
+            return NormalizedAudio(path=path, mime_type=mime_hint, container=None, method="passthrough", input_bytes=size, output_bytes=size, seconds=0.0)
+
+        started = time.monotonic()
+        result = NormalizedAudio(**await asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), functools.partial(normalize_file, path, mime_hint, trim_leading=trim_leading)
+        ))
+        metrics.increment("audio_normalize", result.method)
+        metrics.observe("audio_normalize_input_bytes", result.input_bytes, result.method)
+        metrics.observe("audio_normalize_output_bytes", result.output_bytes, result.method)
+        metrics.observe("audio_normalize_seconds", result.seconds, result.method)
+        # Includes queueing for a free worker process
+        metrics.observe("audio_normalize_wall_seconds", time.monotonic() - started, result.method)
+        return result
+
+    @property
+    def can_cut(self) -> bool:
+        return FFMPEG_PATH is not None
+
+    async def cut(self, path: str, start_ms: int, end_ms: Optional[int] = None) -> str:
+        """Path of an Ogg Opus (CLIP_MIME_TYPE) file holding [start_ms, end_ms) of the recording; needs ffmpeg"""
+        if not self.can_cut:
+            raise RuntimeError("Cutting audio requires ffmpeg")
+        started = time.monotonic()
+        clip_path = await asyncio.get_running_loop().run_in_executor(self._get_pool(), cut_file, path, start_ms, end_ms)
+        metrics.increment("audio_clips")
+        metrics.observe("audio_clip_seconds", time.monotonic() - started)
+        return clip_path
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
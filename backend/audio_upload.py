@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import os
+import logging
+import tempfile
+import time
+import uuid
+from typing import AsyncIterator, Optional
+
+from pydantic import BaseModel
+
+import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Upload configuration for Part 5 recordings
+AUDIO_UPLOAD_MAX_BYTES = int(os.getenv("AUDIO_UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+AUDIO_UPLOAD_DIR = os.getenv("AUDIO_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "audio_uploads"))
+
+# Browser MediaRecorder default when the client doesn't say
+DEFAULT_AUDIO_MIME_TYPE = "audio/webm"
+
+AUDIO_EXTENSIONS = {
+    "audio/webm": ".webm",
+    "audio/ogg": ".ogg",
+    "audio/mp4": ".m4a",
+    "audio/mpeg": ".mp3",
+    "audio/mp3": ".mp3",
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/flac": ".flac",
+}
+
+
+class UploadTooLargeError(Exception):
+    """Raised as soon as an upload passes the size limit"""
+
+
+class SpooledAudio(BaseModel):
+    path: str
+    mime_type: str
+    size: int
+    sha256: str
+    peak_buffer_bytes: int
+
+
+def audio_mime_type(content_type: Optional[str]) -> str:
+    """Base audio MIME type from a Content-Type header, e.g. 'audio/webm;codecs=opus' -> 'audio/webm'"""
+    mime_type = (content_type or "").split(";")[0].strip().lower()
+    return mime_type if mime_type.startswith("audio/") else DEFAULT_AUDIO_MIME_TYPE
+
+
+async def spool_upload(chunks: AsyncIterator[bytes], mime_type: str, max_bytes: int = AUDIO_UPLOAD_MAX_BYTES) -> SpooledAudio:
+    """Write a streamed request body to disk chunk by chunk.
+
+    Only one network chunk is held in memory at a time; the size limit is checked
+    as bytes arrive, so an oversized upload is rejected without being read in full.
+    """
+    os.makedirs(AUDIO_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(AUDIO_UPLOAD_DIR, f"{uuid.uuid4().hex}{AUDIO_EXTENSIONS.get(mime_type, '.bin')}")
+    digest = hashlib.sha256()
+    size = 0
+    peak_buffer_bytes = 0
+    started = time.monotonic()
+
+    try:
+        with open(path, "wb") as spool:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"Audio upload exceeds {max_bytes} bytes")
+                peak_buffer_bytes = max(peak_buffer_bytes, len(chunk))
+                digest.update(chunk)
+                await asyncio.to_thread(spool.write, chunk)
+    except BaseException:
+        remove_spooled(path)
+        metrics.increment("audio_uploads", "rejected")
+        raise
+
+    metrics.increment("audio_uploads", "spooled")
+    metrics.observe("audio_upload_bytes", size)
+    metrics.observe("audio_upload_peak_buffer_bytes", peak_buffer_bytes)
+    metrics.observe("audio_upload_seconds", time.monotonic() - started)
+    return SpooledAudio(path=path, mime_type=mime_type, size=size, sha256=digest.hexdigest(), peak_buffer_bytes=peak_buffer_bytes)
+
+
+def remove_spooled(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove spooled audio {path}: {e}")
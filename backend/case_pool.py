@@ -0,0 +1,103 @@
+import asyncio
+import os
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+from db import execute
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Pool sizing configuration
+CASE_POOL_TARGET_SIZE = int(os.getenv("CASE_POOL_TARGET_SIZE", "10"))
+CASE_POOL_LOW_WATER = int(os.getenv("CASE_POOL_LOW_WATER", "5"))
+CASE_POOL_REFILL_CONCURRENCY = int(os.getenv("CASE_POOL_REFILL_CONCURRENCY", "2"))
+
+POOL_TABLE = "case_study_pool"
+
+
+class CaseStudyPool:
+    """Pool of pre-generated case studies persisted in the case_study_pool table.
+
+    The session endpoint claims a ready case study with one pop_case_study
+    call (see migrations/001_case_study_pool.sql); once the pool drops below
+    the low-water mark a background task tops it back up to the target size
+    using a bounded number of concurrent generations.
+    """
+
+    def __init__(
+        self,
+        supabase,
+        generate_fn: Callable[[], Awaitable[Optional[str]]],
+        target_size: int = CASE_POOL_TARGET_SIZE,
+        low_water: int = CASE_POOL_LOW_WATER,
+        refill_concurrency: int = CASE_POOL_REFILL_CONCURRENCY,
+    ):
+        self.supabase = supabase
+        self.generate_fn = generate_fn
+        self.target_size = target_size
+        self.low_water = min(low_water, target_size)
+        self.refill_concurrency = max(1, refill_concurrency)
+        self._refill_task: Optional[asyncio.Task] = None
+
+    async def size(self) -> int:
+        """Number of case studies currently waiting in the pool"""
+        result = await execute(
+            self.supabase.table(POOL_TABLE).select("id", count="exact", head=True)
+        )
+        return result.count or 0
+
+    async def pop(self) -> Optional[str]:
+        """Claim the oldest pooled case study, or return None if the pool is empty"""
+        if not self.supabase:
+            return None
+
+        try:
+            # Deletes and returns the oldest row not locked by a concurrent pop
+            claimed = await execute(self.supabase.rpc("pop_case_study", {}))
+            return claimed.data or None
+        except Exception as e:
+            logger.error(f"Error popping case study from pool: {e}")
+        finally:
+            self.schedule_refill()
+
+        return None
+
+    def schedule_refill(self):
+        """Start a background refill unless one is already running"""
+        if not self.supabase or self.target_size <= 0:
+            return
+        if self._refill_task and not self._refill_task.done():
+            return
+        self._refill_task = asyncio.create_task(self.refill())
+
+    async def refill(self):
+        """Top the pool back up to the target size if it is below the low-water mark"""
+        try:
+            current_size = await self.size()
+            if current_size >= self.low_water:
+                return
+
+            missing = self.target_size - current_size
+            logger.info(f"Refilling case study pool with {missing} case studies (current size {current_size})")
+            semaphore = asyncio.Semaphore(self.refill_concurrency)
+
+            async def add_one():
+                async with semaphore:
+                    case_study = await self.generate_fn()
+                    if not case_study:
+                        return False
+                    await execute(
+                        self.supabase.table(POOL_TABLE).insert({
+                            "case_study": case_study,
+                            "created_at": datetime.now(timezone.utc).isoformat()
+                        })
+                    )
+                    return True
+
+            results = await asyncio.gather(*(add_one() for _ in range(missing)), return_exceptions=True)
+            added = sum(1 for result in results if result is True)
+            logger.info(f"Case study pool refill added {added}/{missing} case studies")
+        except Exception as e:
+            logger.error(f"Error refilling case study pool: {e}")
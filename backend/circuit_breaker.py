@@ -0,0 +1,81 @@
+import os
+import logging
+import time
+
+import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Breaker configuration for model calls
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the model while the breaker is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls
+    fail immediately. Once `reset_seconds` have passed a single trial call is
+    let through; its success closes the breaker, its failure re-opens it.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD, reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead right now"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        metrics.increment("circuit_breaker_rejections", self.name)
+        return False
+
+    def check(self):
+        """Raise CircuitOpenError if the call must not go ahead"""
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit breaker '{self.name}' is open")
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != OPEN:
+                self._set_state(OPEN)
+
+    def record_cancelled(self):
+        """Neither success nor failure; only frees the half-open trial for the next call"""
+        self._trial_in_flight = False
+
+    def _set_state(self, state: str):
+        logger.warning(f"Circuit breaker '{self.name}' {self.state} -> {state}")
+        metrics.increment("circuit_breaker_transitions", f"{self.name}:{state}")
+        self.state = state
+
+    def status(self) -> dict:
+        return {"state": self.state, "consecutiveFailures": self.consecutive_failures}
@@ -0,0 +1,154 @@
+import os
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import google.genai as genai
+
+import metrics
+import llm_gateway
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# "gemini" uses explicit Gemini context caching, "local" keeps the prefix in
+# process (for tests and offline runs), "none" disables caching entirely.
+# With the fake LLM provider "gemini" falls back to "local".
+CONTEXT_CACHE_BACKEND = os.getenv("CONTEXT_CACHE_BACKEND", "gemini")
+
+# Sessions expire 24 hours after creation, so cached prefixes never need to outlive that
+SESSION_LIFETIME_SECONDS = 24 * 3600
+
+# Handles this close to expiry are not used, so a call never races the TTL
+EXPIRY_MARGIN_SECONDS = 300
+
+CACHED_CASE_STUDY_REFERENCE = "[The full case study is provided in the cached context above.]"
+
+SYSTEM_INSTRUCTION = (
+    "You are evaluating a candidate's work on the manufacturing case study provided below. "
+    "Every request in this session refers to this case study."
+)
+
+
+def _case_study_contents(case_study: str) -> List[genai.types.Content]:
+    return [genai.types.Content(role="user", parts=[genai.types.Part(text=f"CASE STUDY:\n{case_study}")])]
+
+
+class GeminiContextCache:
+    """Explicit Gemini context caching; requests reference the upload by name"""
+
+    async def create(self, case_study: str, ttl_seconds: int, display_name: str) -> Optional[str]:
+        return await llm_gateway.create_cached_content(
+            _case_study_contents(case_study), SYSTEM_INSTRUCTION, ttl_seconds, display_name
+        )
+
+    async def delete(self, handle: str):
+        await llm_gateway.delete_cached_content(handle)
+
+    def apply(self, handle: str, contents: list, config) -> Tuple[list, genai.types.GenerateContentConfig]:
+        return contents, config.model_copy(update={"cached_content": handle})
+
+
+class LocalContextCache:
+    """In-process stand-in for Gemini context caching.
+
+    Stores the prefix under a generated handle and prepends it to each request,
+    so the cached-prompt code path can be exercised without the real API.
+    """
+
+    def __init__(self):
+        self._prefixes: Dict[str, Tuple[float, list]] = {}
+
+    async def create(self, case_study: str, ttl_seconds: int, display_name: str) -> Optional[str]:
+        handle = f"local/{display_name}/{uuid.uuid4().hex[:8]}"
+        prefix = [f"{SYSTEM_INSTRUCTION}\n\nCASE STUDY:\n{case_study}"]
+        self._prefixes[handle] = (time.time() + ttl_seconds, prefix)
+        return handle
+
+    def has(self, handle: str) -> bool:
+        entry = self._prefixes.get(handle)
+        if entry is None:
+            return False
+        if entry[0] <= time.time():
+            del self._prefixes[handle]
+            return False
+        return True
+
+    async def delete(self, handle: str):
+        self._prefixes.pop(handle, None)
+
+    def apply(self, handle: str, contents: list, config) -> Tuple[list, genai.types.GenerateContentConfig]:
+        return self._prefixes[handle][1] + list(contents), config
+
+
+class SessionContextCache:
+    """Per-session context cache of the case study prefix.
+
+    The handle and its expiry are stored on the session row, so every part
+    evaluation, the audio evaluation and the final evaluation reference the
+    same upload instead of resending the case study.
+    """
+
+    def __init__(self, backend_name: str = CONTEXT_CACHE_BACKEND):
+        self.backend_name = backend_name
+        provider_name = llm_gateway.provider.name if llm_gateway.provider else None
+        if backend_name == "gemini" and provider_name == "gemini":
+            self.backend = GeminiContextCache()
+        elif backend_name == "local" or (backend_name == "gemini" and provider_name == "fake"):
+            self.backend = LocalContextCache()
+        else:
+            self.backend = None
+
+    async def create(self, session_id: str, case_study: str, ttl_seconds: int = SESSION_LIFETIME_SECONDS) -> Optional[Dict]:
+        """Upload the case study prefix, returning the session columns to store"""
+        if not self.backend or ttl_seconds <= EXPIRY_MARGIN_SECONDS:
+            return None
+        try:
+            handle = await self.backend.create(case_study, ttl_seconds, f"session-{session_id}")
+        except Exception as e:
+            # Explicit caching has a minimum prompt size; short case studies are sent inline
+            metrics.increment("context_cache", "create_failed")
+            logger.warning(f"Context cache not created for session {session_id}: {e}")
+            return None
+        metrics.increment("context_cache", "created")
+        return {
+            "context_cache_name": handle,
+            "context_cache_expires_at": time.time() + ttl_seconds
+        }
+
+    async def delete(self, handle: Optional[str]):
+        """Delete a session's cached prefix once nothing will reference it again.
+
+        Storage is billed until the TTL otherwise; a failed delete is only
+        logged, since the TTL still removes the entry.
+        """
+        if not self.backend or not handle:
+            return
+        try:
+            await self.backend.delete(handle)
+        except Exception as e:
+            metrics.increment("context_cache", "delete_failed")
+            logger.warning(f"Context cache {handle} not deleted: {e}")
+            return
+        metrics.increment("context_cache", "deleted")
+
+    def handle_for(self, session) -> Optional[str]:
+        """Usable cache handle for a session row, or None if the case study must be sent inline"""
+        handle = session.get("context_cache_name")
+        expires_at = session.get("context_cache_expires_at")
+        if not self.backend or not handle or not expires_at:
+            return None
+        if float(expires_at) - EXPIRY_MARGIN_SECONDS <= time.time():
+            return None
+        if isinstance(self.backend, LocalContextCache) and not self.backend.has(handle):
+            return None
+        return handle
+
+    def apply(self, handle: Optional[str], contents: list, config) -> Tuple[list, genai.types.GenerateContentConfig]:
+        """Attach the cached prefix to a request"""
+        if not handle:
+            metrics.increment("context_cache", "inline")
+            return contents, config
+        metrics.increment("context_cache", "referenced")
+        return self.backend.apply(handle, contents, config)
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Query
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-import os
+import asyncio
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Optional
-import json
-from supabase import create_client, Client
+from typing import Annotated, List, Dict, Optional
+from db import supabase, execute
+from session_archive import session_archive
+from session_listing import SessionListQuery, list_sessions
 from dotenv import load_dotenv
 import logging
 
@@ -15,23 +16,17 @@ load_dotenv()
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Initialize Supabase client
-try:
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_ANON_KEY")
-    if not supabase_url or not supabase_key:
-        raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set")
-    supabase: Client = create_client(supabase_url, supabase_key)
-except Exception as e:
-    logger.error(f"Failed to configure Supabase for dashboard: {e}")
-    supabase = None
-
 # Create router
 dashboard_router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 # Initialize templates
 templates = Jinja2Templates(directory="templates")
 
+# Analytics rollups (see migrations/014_analytics_rollups.sql and 016_analytics_rollup_deltas.sql)
+TREND_GRANULARITIES = ("hour", "day", "week")
+SCORE_RANGES = ("0-3", "3-5", "5-7", "7-8.5", "8.5-10")
+SKILLS = ("analytical_thinking", "problem_solving", "systematic_approach", "practical_application", "communication_skills")
+
 @dashboard_router.get("/", response_class=HTMLResponse)
 async def dashboard_home(request: Request):
     """Main dashboard home page with overview analytics"""
@@ -52,46 +47,21 @@ async def dashboard_home(request: Request):
         raise HTTPException(status_code=500, detail="Failed to load dashboard")
 
 @dashboard_router.get("/sessions", response_class=HTMLResponse)
-async def dashboard_sessions(request: Request):
-    """View all evaluation sessions with filters"""
-    if not supabase:
-        raise HTTPException(status_code=500, detail="Database not configured")
-    
-    try:
-        # Get all sessions with basic info
-        sessions = supabase.table("sessions").select(
-            "session_id, created_at, last_activity, is_complete, completed_parts"
-        ).order("created_at", desc=True).execute()
-        
-        # Get final evaluations for completed sessions
-        final_evals = supabase.table("final_evaluations").select(
-            "session_id, overall_performance, average_score"
-        ).execute()
-        
-        # Combine data
-        sessions_data = []
-        final_eval_dict = {fe["session_id"]: fe for fe in (final_evals.data or [])}
-        
-        for session in (sessions.data or []):
-            session_data = {
-                "session_id": session["session_id"],
-                "created_at": session["created_at"],
-                "last_activity": session["last_activity"],
-                "is_complete": session["is_complete"],
-                "completed_parts_count": len(session.get("completed_parts", [])),
-                "duration_minutes": calculate_duration_minutes(session["created_at"], session["last_activity"]),
-                "final_evaluation": final_eval_dict.get(session["session_id"])
-            }
-            sessions_data.append(session_data)
-        
-        return templates.TemplateResponse("dashboard/sessions.html", {
-            "request": request,
-            "sessions": sessions_data,
-            "page_title": "Evaluation Sessions"
-        })
-    except Exception as e:
-        logger.error(f"Error loading sessions: {e}")
-        raise HTTPException(status_code=500, detail="Failed to load sessions")
+async def dashboard_sessions(request: Request, query: Annotated[SessionListQuery, Query()]):
+    """View evaluation sessions, one filtered page at a time"""
+    page = await load_sessions_page(query)
+    return templates.TemplateResponse("dashboard/sessions.html", {
+        "request": request,
+        "sessions": page["sessions"],
+        "next_cursor": page["next_cursor"],
+        "filters": query.model_dump(exclude={"cursor"}),
+        "page_title": "Evaluation Sessions"
+    })
+
+@dashboard_router.get("/api/sessions")
+async def dashboard_sessions_api(query: Annotated[SessionListQuery, Query()]):
+    """Sessions listing as JSON; pass next_cursor back as cursor for the next page"""
+    return await load_sessions_page(query)
 
 @dashboard_router.get("/session/{session_id}", response_class=HTMLResponse)
 async def dashboard_session_detail(request: Request, session_id: str):
@@ -101,20 +71,31 @@ async def dashboard_session_detail(request: Request, session_id: str):
     
     try:
         # Get session info
-        session = supabase.table("sessions").select("*").eq("session_id", session_id).execute()
+        session = await execute(supabase.table("sessions").select("*").eq("session_id", session_id))
         if not session.data:
-            raise HTTPException(status_code=404, detail="Session not found")
+            # Sessions past the hot window live in the archive
+            archived = await session_archive.get_session(session_id) if session_archive else None
+            if not archived:
+                raise HTTPException(status_code=404, detail="Session not found")
+            return templates.TemplateResponse("dashboard/session_detail.html", {
+                "request": request,
+                "session": archived["session"],
+                "parts_data": organize_session_data(archived["responses"], archived["part_evaluations"]),
+                "final_evaluation": archived["final_evaluation"],
+                "archived": True,
+                "page_title": f"Session {session_id[:8]}"
+            })
         
         session_data = session.data[0]
         
         # Get all responses
-        responses = supabase.table("responses").select("*").eq("session_id", session_id).execute()
+        responses = await execute(supabase.table("responses").select("part_id, question_id, response_text, audio_key, audio_size").eq("session_id", session_id))
         
         # Get all evaluations
-        evaluations = supabase.table("part_evaluations").select("*").eq("session_id", session_id).execute()
+        evaluations = await execute(supabase.table("part_evaluations").select("*").eq("session_id", session_id))
         
         # Get final evaluation
-        final_eval = supabase.table("final_evaluations").select("*").eq("session_id", session_id).execute()
+        final_eval = await execute(supabase.table("final_evaluations").select("*").eq("session_id", session_id))
         
         # Organize data by parts
         parts_data = organize_session_data(responses.data, evaluations.data)
@@ -124,6 +105,7 @@ async def dashboard_session_detail(request: Request, session_id: str):
             "session": session_data,
             "parts_data": parts_data,
             "final_evaluation": final_eval.data[0] if final_eval.data else None,
+            "archived": False,
             "page_title": f"Session {session_id[:8]}"
         })
     except HTTPException:
@@ -139,12 +121,9 @@ async def dashboard_analytics(request: Request):
         raise HTTPException(status_code=500, detail="Database not configured")
     
     try:
-        # Get analytics data
-        analytics_data = await get_analytics_data()
-        
+        # Chart data is fetched by the page from /api/analytics
         return templates.TemplateResponse("dashboard/analytics.html", {
             "request": request,
-            "analytics": analytics_data,
             "page_title": "Performance Analytics"
         })
     except Exception as e:
@@ -159,38 +138,22 @@ async def get_dashboard_stats():
         raise HTTPException(status_code=500, detail="Database not configured")
     
     try:
-        # Total sessions
-        sessions_result = supabase.table("sessions").select("id, is_complete, created_at").execute()
-        sessions = sessions_result.data or []
-        
-        # Completed sessions
-        completed_sessions = [s for s in sessions if s.get("is_complete")]
-        
-        # Recent sessions (last 7 days)
+        # Read from the maintained analytics totals (live and archived sessions)
         week_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-        recent_sessions = [s for s in sessions if s["created_at"] > week_ago]
+        result = await execute(supabase.rpc("dashboard_stats", {"p_recent_since": week_ago}))
+        stats = result.data or {}
         
-        # Final evaluations
-        final_evals_result = supabase.table("final_evaluations").select("overall_performance, average_score").execute()
-        final_evals = final_evals_result.data or []
-        
-        # Performance distribution
-        performance_dist = {}
-        for eval in final_evals:
-            perf = eval.get("overall_performance", "Unknown")
-            performance_dist[perf] = performance_dist.get(perf, 0) + 1
-        
-        # Average score
-        scores = [fe.get("average_score", 0) for fe in final_evals if fe.get("average_score")]
-        avg_score = round(sum(scores) / len(scores), 1) if scores else 0
+        total_sessions = stats.get("total_sessions", 0)
+        completed_sessions = stats.get("completed_sessions", 0)
+        avg_score = stats.get("average_score")
         
         return {
-            "total_sessions": len(sessions),
-            "completed_sessions": len(completed_sessions),
-            "completion_rate": round(len(completed_sessions) / len(sessions) * 100, 1) if sessions else 0,
-            "recent_sessions": len(recent_sessions),
-            "average_score": avg_score,
-            "performance_distribution": performance_dist
+            "total_sessions": total_sessions,
+            "completed_sessions": completed_sessions,
+            "completion_rate": round(completed_sessions / total_sessions * 100, 1) if total_sessions else 0,
+            "recent_sessions": stats.get("recent_sessions", 0),
+            "average_score": round(float(avg_score), 1) if avg_score is not None else 0,
+            "performance_distribution": stats.get("performance_distribution") or {}
         }
     except Exception as e:
         logger.error(f"Error getting dashboard stats: {e}")
@@ -211,17 +174,17 @@ async def get_recent_sessions():
     
     try:
         # Get recent sessions (last 10)
-        sessions = supabase.table("sessions").select(
+        sessions = await execute(supabase.table("sessions").select(
             "session_id, created_at, last_activity, is_complete, completed_parts"
-        ).order("created_at", desc=True).limit(10).execute()
+        ).order("created_at", desc=True).limit(10))
         
         # Get final evaluations for recent sessions
         session_ids = [s["session_id"] for s in (sessions.data or [])]
         final_evals = []
         if session_ids:
-            final_evals_result = supabase.table("final_evaluations").select(
+            final_evals_result = await execute(supabase.table("final_evaluations").select(
                 "session_id, overall_performance, average_score"
-            ).in_("session_id", session_ids).execute()
+            ).in_("session_id", session_ids))
             final_evals = final_evals_result.data or []
         
         # Combine data
@@ -246,44 +209,29 @@ async def get_recent_sessions():
         return []
 
 @dashboard_router.get("/api/analytics")
-async def get_analytics_data():
-    """Get detailed analytics data for charts"""
+async def get_analytics_data(granularity: str = "day", start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Get detailed analytics data for charts, read from the hourly rollups.
+    
+    Trends are bucketed by hour, day or week over [start, end), the last 30 days
+    by default; the other sections cover the same range, or all time without start.
+    """
     if not supabase:
         raise HTTPException(status_code=500, detail="Database not configured")
+    if granularity not in TREND_GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(TREND_GRANULARITIES)}")
     
     try:
-        # Daily completion trends (last 30 days)
-        thirty_days_ago = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
-        
-        sessions = supabase.table("sessions").select("created_at, is_complete").gte("created_at", thirty_days_ago).execute()
-        sessions_data = sessions.data or []
-        
-        # Group by date
-        daily_data = {}
-        for session in sessions_data:
-            date = session["created_at"][:10]  # Extract date part
-            if date not in daily_data:
-                daily_data[date] = {"total": 0, "completed": 0}
-            daily_data[date]["total"] += 1
-            if session.get("is_complete"):
-                daily_data[date]["completed"] += 1
-        
-        # Performance by part analysis
-        part_evals = supabase.table("part_evaluations").select("part_id, average_score, scores").execute()
-        part_performance = analyze_part_performance(part_evals.data or [])
-        
-        # Score distribution
-        final_evals = supabase.table("final_evaluations").select("average_score, overall_scores").execute()
-        score_distribution = analyze_score_distribution(final_evals.data or [])
-        
-        # Tool recommendations analysis
-        tool_recommendations = analyze_tool_recommendations(final_evals.data or [])
+        trends_start = start or datetime.now(timezone.utc) - timedelta(days=30)
+        trend_rows, totals_rows = await asyncio.gather(
+            rollup_series(["sessions", "sessions_completed"], granularity, trends_start, end),
+            rollup_series(["part_score", "score_range", "skill_score", "tool_recommendation"], None, start, end)
+        )
         
         return {
-            "daily_trends": daily_data,
-            "part_performance": part_performance,
-            "score_distribution": score_distribution,
-            "tool_recommendations": tool_recommendations
+            "daily_trends": analyze_trends(trend_rows, granularity),
+            "part_performance": analyze_part_performance(totals_rows),
+            "score_distribution": analyze_score_distribution(totals_rows),
+            "tool_recommendations": analyze_tool_recommendations(totals_rows)
         }
     except Exception as e:
         logger.error(f"Error getting analytics data: {e}")
@@ -295,6 +243,48 @@ async def get_analytics_data():
         }
 
 # Helper functions
+async def load_sessions_page(query: SessionListQuery) -> Dict:
+    """One page of sessions in the shape the sessions page and API return"""
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Database not configured")
+    
+    try:
+        page = await list_sessions(supabase, query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error loading sessions: {e}")
+        raise HTTPException(status_code=500, detail="Failed to load sessions")
+    
+    sessions_data = []
+    for row in page.rows:
+        final_evaluation = None
+        if row.get("overall_performance") is not None:
+            final_evaluation = {
+                "overall_performance": row["overall_performance"],
+                "average_score": row["average_score"]
+            }
+        sessions_data.append({
+            "session_id": row["session_id"],
+            "created_at": row["created_at"],
+            "last_activity": row["last_activity"],
+            "is_complete": row["is_complete"],
+            "completed_parts_count": row["completed_parts_count"],
+            "duration_minutes": calculate_duration_minutes(row["created_at"], row["last_activity"]),
+            "final_evaluation": final_evaluation
+        })
+    return {"sessions": sessions_data, "next_cursor": page.next_cursor}
+
+async def rollup_series(metrics: List[str], granularity: Optional[str], start: Optional[datetime], end: Optional[datetime]) -> List[Dict]:
+    """Rollup rows summed per bucket (or over the whole range if granularity is None)"""
+    result = await execute(supabase.rpc("analytics_rollup_series", {
+        "p_metrics": metrics,
+        "p_granularity": granularity,
+        "p_from": start.isoformat() if start else None,
+        "p_to": end.isoformat() if end else None
+    }))
+    return result.data or []
+
 def calculate_duration_minutes(created_at: str, last_activity: str) -> int:
     """Calculate duration in minutes between two timestamps"""
     try:
@@ -324,81 +314,42 @@ def organize_session_data(responses_data: List, evaluations_data: List) -> Dict:
     
     return parts_data
 
-def analyze_part_performance(part_evaluations: List) -> Dict:
-    """Analyze performance across different parts"""
+def analyze_trends(rows: List[Dict], granularity: str) -> Dict:
+    """Total and completed sessions per bucket"""
+    trends = {}
+    for row in rows:
+        bucket = row["bucket"][:13] + ":00" if granularity == "hour" else row["bucket"][:10]
+        counts = trends.setdefault(bucket, {"total": 0, "completed": 0})
+        counts["total" if row["metric"] == "sessions" else "completed"] += row["count"]
+    return trends
+
+def analyze_part_performance(rows: List[Dict]) -> Dict:
+    """Evaluation count and average score per part"""
     part_stats = {}
-    
-    for eval in part_evaluations:
-        part_id = eval["part_id"]
-        if part_id not in part_stats:
-            part_stats[part_id] = {"scores": [], "count": 0}
-        
-        part_stats[part_id]["scores"].append(eval.get("average_score", 0))
-        part_stats[part_id]["count"] += 1
-    
-    # Calculate averages
-    for part_id, stats in part_stats.items():
-        if stats["scores"]:
-            stats["average"] = round(sum(stats["scores"]) / len(stats["scores"]), 1)
-        else:
-            stats["average"] = 0
-    
+    for row in rows:
+        if row["metric"] == "part_score":
+            part_stats[int(row["key"])] = {
+                "count": row["count"],
+                "average": round(float(row["total"]) / row["count"], 1) if row["count"] else 0
+            }
     return part_stats
 
-def analyze_score_distribution(final_evaluations: List) -> Dict:
-    """Analyze distribution of scores"""
-    score_ranges = {
-        "0-3": 0, "3-5": 0, "5-7": 0, "7-8.5": 0, "8.5-10": 0
-    }
-    
-    skill_averages = {
-        "analytical_thinking": [],
-        "problem_solving": [],
-        "systematic_approach": [],
-        "practical_application": [],
-        "communication_skills": []
-    }
+def analyze_score_distribution(rows: List[Dict]) -> Dict:
+    """Final evaluations per score range and average per skill"""
+    score_ranges = {score_range: 0 for score_range in SCORE_RANGES}
+    skill_averages = {skill: 0 for skill in SKILLS}
     
-    for eval in final_evaluations:
-        # Overall score distribution
-        avg_score = eval.get("average_score", 0)
-        if avg_score < 3:
-            score_ranges["0-3"] += 1
-        elif avg_score < 5:
-            score_ranges["3-5"] += 1
-        elif avg_score < 7:
-            score_ranges["5-7"] += 1
-        elif avg_score < 8.5:
-            score_ranges["7-8.5"] += 1
-        else:
-            score_ranges["8.5-10"] += 1
-        
-        # Skill-specific averages
-        overall_scores = eval.get("overall_scores", {})
-        for skill, scores_list in skill_averages.items():
-            if skill in overall_scores:
-                scores_list.append(overall_scores[skill])
-    
-    # Calculate skill averages
-    skill_avg_final = {}
-    for skill, scores in skill_averages.items():
-        if scores:
-            skill_avg_final[skill] = round(sum(scores) / len(scores), 1)
-        else:
-            skill_avg_final[skill] = 0
+    for row in rows:
+        if row["metric"] == "score_range" and row["key"] in score_ranges:
+            score_ranges[row["key"]] = row["count"]
+        elif row["metric"] == "skill_score" and row["key"] in skill_averages and row["count"]:
+            skill_averages[row["key"]] = round(float(row["total"]) / row["count"], 1)
     
     return {
         "score_ranges": score_ranges,
-        "skill_averages": skill_avg_final
+        "skill_averages": skill_averages
     }
 
-def analyze_tool_recommendations(final_evaluations: List) -> Dict:
-    """Analyze tool recommendations to identify common weaknesses"""
-    tool_frequency = {}
-    
-    for eval in final_evaluations:
-        recommendations = eval.get("tool_recommendations", {})
-        for tool_name in recommendations.keys():
-            tool_frequency[tool_name] = tool_frequency.get(tool_name, 0) + 1
-    
-    return tool_frequency 
\ No newline at end of file
+def analyze_tool_recommendations(rows: List[Dict]) -> Dict:
+    """How often each tool was recommended, to identify common weaknesses"""
+    return {row["key"]: row["count"] for row in rows if row["metric"] == "tool_recommendation"}
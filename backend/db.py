@@ -0,0 +1,71 @@
+import asyncio
+import os
+import logging
+import time
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+from supabase import AsyncClient, AsyncClientOptions
+
+import metrics
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Connection pool and timeout configuration for database calls
+DB_QUERY_TIMEOUT_SECONDS = float(os.getenv("DB_QUERY_TIMEOUT_SECONDS", "10"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "50"))
+DB_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("DB_MAX_KEEPALIVE_CONNECTIONS", "20"))
+
+
+def create_database_client() -> Optional[AsyncClient]:
+    """Async Supabase client sharing one pooled HTTP/2 connection pool, or None if not configured"""
+    try:
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_ANON_KEY")
+        if not supabase_url or not supabase_key:
+            raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables")
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=DB_MAX_CONNECTIONS, max_keepalive_connections=DB_MAX_KEEPALIVE_CONNECTIONS),
+            timeout=DB_QUERY_TIMEOUT_SECONDS,
+            follow_redirects=True,
+            http2=True
+        )
+        client = AsyncClient(
+            supabase_url,
+            supabase_key,
+            AsyncClientOptions(httpx_client=http_client, postgrest_client_timeout=DB_QUERY_TIMEOUT_SECONDS)
+        )
+        logger.info("Supabase client configured successfully")
+        return client
+    except Exception as e:
+        logger.error(f"Failed to configure Supabase: {e}")
+        return None
+
+
+# Shared by the evaluation API, the dashboard and the background workers
+supabase = create_database_client()
+
+
+async def execute(query, timeout: float = DB_QUERY_TIMEOUT_SECONDS):
+    """Run a query builder on the event loop, failing with asyncio.TimeoutError after `timeout` seconds"""
+    started = time.monotonic()
+    try:
+        return await asyncio.wait_for(query.execute(), timeout=timeout)
+    except asyncio.TimeoutError:
+        metrics.increment("db_timeouts")
+        logger.error(f"Database query timed out after {timeout}s")
+        raise
+    finally:
+        metrics.increment("db_queries")
+        metrics.observe("db_query_seconds", time.monotonic() - started)
+
+
+async def close_database():
+    """Close the pooled connections on shutdown"""
+    if supabase and supabase.options.httpx_client:
+        await supabase.options.httpx_client.aclose()
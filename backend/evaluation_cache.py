@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import metrics
+from db import execute
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cache sizing configuration
+EVALUATION_CACHE_MAX_ENTRIES = int(os.getenv("EVALUATION_CACHE_MAX_ENTRIES", "1024"))
+EVALUATION_CACHE_TTL_SECONDS = int(os.getenv("EVALUATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Expired rows are deleted by a scheduled job, in batches
+EVALUATION_CACHE_CLEANUP_INTERVAL_SECONDS = float(os.getenv("EVALUATION_CACHE_CLEANUP_INTERVAL_SECONDS", "3600"))
+EVALUATION_CACHE_CLEANUP_BATCH_SIZE = int(os.getenv("EVALUATION_CACHE_CLEANUP_BATCH_SIZE", "1000"))
+EVALUATION_CACHE_CLEANUP_MAX_BATCHES = int(os.getenv("EVALUATION_CACHE_CLEANUP_MAX_BATCHES", "10"))
+
+CACHE_TABLE = "evaluation_cache"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_response(text: str) -> str:
+    """Collapse whitespace so trivially different submissions share a cache entry"""
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def make_cache_key(case_study: str, responses: Dict[str, str], rubrics: Dict[str, str], prompt_version: str) -> str:
+    """Content hash of everything that determines a part evaluation"""
+    payload = {
+        "case_study": normalize_response(case_study),
+        "responses": {key: normalize_response(value) for key, value in sorted(responses.items())},
+        "rubrics": dict(sorted(rubrics.items())),
+        "prompt_version": prompt_version,
+    }
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class EvaluationCache:
+    """Two-level cache of part evaluations keyed by content hash.
+
+    Lookups hit an in-process LRU first and fall back to the evaluation_cache
+    table, so identical submissions (demos, QA replays) skip the model call.
+    Entries older than the TTL are ignored at both levels, and purge_expired
+    deletes them from the table.
+    """
+
+    def __init__(self, supabase, max_entries: int = EVALUATION_CACHE_MAX_ENTRIES, ttl_seconds: int = EVALUATION_CACHE_TTL_SECONDS):
+        self.supabase = supabase
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _get_local(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, evaluation = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return evaluation
+
+    def _put_local(self, key: str, evaluation: Dict):
+        self._entries[key] = (time.monotonic(), evaluation)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Dict]:
+        """Return a cached {"scores", "feedback"} evaluation or None"""
+        evaluation = self._get_local(key)
+        if evaluation is not None:
+            metrics.increment("evaluation_cache", "hit_memory")
+            return {"scores": dict(evaluation["scores"]), "feedback": evaluation["feedback"]}
+
+        if self.supabase:
+            try:
+                cutoff = (datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)).isoformat()
+                result = await execute(
+                    self.supabase.table(CACHE_TABLE).select("scores, feedback")
+                    .eq("cache_key", key).gte("created_at", cutoff).limit(1)
+                )
+                if result.data:
+                    evaluation = {"scores": result.data[0]["scores"], "feedback": result.data[0]["feedback"]}
+                    self._put_local(key, evaluation)
+                    metrics.increment("evaluation_cache", "hit_persistent")
+                    return {"scores": dict(evaluation["scores"]), "feedback": evaluation["feedback"]}
+            except Exception as e:
+                logger.error(f"Error reading evaluation cache: {e}")
+
+        metrics.increment("evaluation_cache", "miss")
+        return None
+
+    async def set(self, key: str, evaluation: Dict):
+        """Store an evaluation in both cache levels"""
+        entry = {"scores": dict(evaluation["scores"]), "feedback": evaluation["feedback"]}
+        self._put_local(key, entry)
+
+        if not self.supabase:
+            return
+        try:
+            await execute(
+                self.supabase.table(CACHE_TABLE).upsert({
+                    "cache_key": key,
+                    "scores": entry["scores"],
+                    "feedback": entry["feedback"],
+                    "created_at": datetime.now(timezone.utc).isoformat()
+                }, on_conflict="cache_key")
+            )
+        except Exception as e:
+            logger.error(f"Error writing evaluation cache: {e}")
+
+    async def purge_expired(self, batch_size: int = EVALUATION_CACHE_CLEANUP_BATCH_SIZE,
+                            max_batches: int = EVALUATION_CACHE_CLEANUP_MAX_BATCHES) -> int:
+        """Delete persisted entries past the TTL, returning how many were deleted"""
+        if not self.supabase:
+            return 0
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)).isoformat()
+        purged = 0
+        for _ in range(max_batches):
+            result = await execute(self.supabase.rpc("purge_evaluation_cache", {"p_cutoff": cutoff, "p_batch_size": batch_size}))
+            count = result.data or 0
+            purged += count
+            if count < batch_size:
+                break
+        metrics.observe("evaluation_cache_purged", purged)
+        if purged:
+            logger.info(f"Purged {purged} expired evaluation cache entries")
+        return purged
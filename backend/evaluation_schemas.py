@@ -0,0 +1,101 @@
+import google.genai as genai
+from typing import Dict, List
+
+# Response schemas for Gemini structured output. Each schema is derived from
+# the rubric definitions or response model fields, so the model can only
+# return JSON with exactly the keys the evaluation code validates.
+
+SCORE_MINIMUM = 1
+SCORE_MAXIMUM = 10
+
+# Dimensions scored in the final evaluation (keys of FinalEvaluationResponse.overallScores)
+FINAL_SCORE_DIMENSIONS = {
+    "analytical_thinking": "Data gathering, systematic analysis, structured approaches",
+    "problem_solving": "Root cause identification, solution development, creativity",
+    "systematic_approach": "Use of frameworks, methodical thinking, logical flow",
+    "practical_application": "Real-world feasibility, manufacturing knowledge, implementation focus",
+    "communication_skills": "Verbal explanation clarity, synthesis ability, professional presentation",
+}
+
+PERFORMANCE_RATINGS = ["Excellent", "Good", "Satisfactory", "Needs Improvement"]
+
+# FinalEvaluationResponse fields produced by the model; the rest are computed server-side
+FINAL_MODEL_FIELDS = {
+    "overallScores": "Overall performance scores (1-10) per dimension",
+    "detailedFeedback": "Comprehensive feedback paragraph (4-5 sentences)",
+    "overallPerformance": "Performance rating based on the overall average",
+}
+
+def _score_object(dimensions: Dict[str, str]) -> genai.types.Schema:
+    """Object schema with one required 1-10 number per dimension"""
+    return genai.types.Schema(
+        type=genai.types.Type.OBJECT,
+        properties={
+            key: genai.types.Schema(
+                type=genai.types.Type.NUMBER,
+                description=description,
+                minimum=SCORE_MINIMUM,
+                maximum=SCORE_MAXIMUM,
+            )
+            for key, description in dimensions.items()
+        },
+        required=list(dimensions.keys()),
+        property_ordering=list(dimensions.keys()),
+    )
+
+def _string(description: str) -> genai.types.Schema:
+    return genai.types.Schema(type=genai.types.Type.STRING, description=description)
+
+def _object(properties: Dict[str, genai.types.Schema], ordering: List[str]) -> genai.types.Schema:
+    return genai.types.Schema(
+        type=genai.types.Type.OBJECT,
+        properties=properties,
+        required=ordering,
+        property_ordering=ordering,
+    )
+
+def part_evaluation_schema(part) -> genai.types.Schema:
+    """Schema for a text part evaluation built from the part's rubrics"""
+    return _object(
+        {
+            "scores": _score_object(part["rubrics"]),
+            "feedback": _string("Detailed constructive feedback addressing strengths and areas for improvement"),
+        },
+        ["scores", "feedback"],
+    )
+
+def audio_evaluation_schema(part) -> genai.types.Schema:
+    """Schema for the verbal explanation evaluation, transcription first"""
+    return _object(
+        {
+            "transcription": _string("Full transcription of what the candidate said"),
+            "scores": _score_object(part["rubrics"]),
+            "feedback": _string("Detailed feedback about the verbal presentation"),
+        },
+        ["transcription", "scores", "feedback"],
+    )
+
+def final_evaluation_schema(response_model) -> genai.types.Schema:
+    """Schema for the model-generated fields of the final evaluation response"""
+    properties = {}
+    for field_name, description in FINAL_MODEL_FIELDS.items():
+        if field_name not in response_model.model_fields:
+            raise ValueError(f"{response_model.__name__} has no field {field_name}")
+        if field_name == "overallScores":
+            properties[field_name] = _score_object(FINAL_SCORE_DIMENSIONS)
+        elif field_name == "overallPerformance":
+            properties[field_name] = genai.types.Schema(
+                type=genai.types.Type.STRING,
+                description=description,
+                enum=PERFORMANCE_RATINGS,
+            )
+        else:
+            properties[field_name] = _string(description)
+    return _object(properties, list(FINAL_MODEL_FIELDS.keys()))
+
+def transcription_schema() -> genai.types.Schema:
+    """Schema for transcribing one segment of a recording"""
+    return _object(
+        {"transcription": _string("Verbatim transcription of the requested time range")},
+        ["transcription"],
+    )
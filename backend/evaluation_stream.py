@@ -0,0 +1,81 @@
+import json
+import re
+from typing import Dict, List, Tuple
+
+_FEEDBACK_KEY = re.compile(r'"feedback"\s*:\s*"')
+
+
+def sse_event(event: str, data) -> str:
+    """Format a server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _decode_partial_string(raw: str) -> Tuple[str, bool]:
+    """Decode the body of a JSON string that may still be arriving.
+
+    Returns the decoded text available so far and whether the closing quote
+    has been seen. A trailing incomplete escape sequence is held back until
+    the rest of it arrives.
+    """
+    index = 0
+    while index < len(raw):
+        char = raw[index]
+        if char == "\\":
+            index += 2
+            continue
+        if char == '"':
+            return json.loads(f'"{raw[:index]}"'), True
+        index += 1
+
+    safe = raw
+    # Hold back a dangling backslash or a partial \uXXXX escape
+    unicode_escape = re.search(r'\\u[0-9a-fA-F]{0,3}$', safe)
+    if unicode_escape:
+        safe = safe[:unicode_escape.start()]
+    elif (len(safe) - len(safe.rstrip("\\"))) % 2 == 1:
+        safe = safe[:-1]
+
+    try:
+        return json.loads(f'"{safe}"'), False
+    except json.JSONDecodeError:
+        return "", False
+
+
+class IncrementalEvaluationParser:
+    """Pull rubric scores and feedback text out of a streamed evaluation JSON.
+
+    Each call to feed() returns the events that became available with the new
+    chunk: one ("score", {...}) event per rubric as soon as its value is
+    complete, and ("feedback", {"delta": ...}) events as feedback text arrives.
+    """
+
+    def __init__(self, rubric_keys: List[str]):
+        self.rubric_keys = list(rubric_keys)
+        self.text = ""
+        self.scores: Dict[str, float] = {}
+        self.feedback = ""
+        self._score_patterns = {
+            key: re.compile(rf'"{re.escape(key)}"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}}\s]')
+            for key in self.rubric_keys
+        }
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict]]:
+        self.text += chunk
+        events = []
+
+        for key, pattern in self._score_patterns.items():
+            if key in self.scores:
+                continue
+            match = pattern.search(self.text)
+            if match:
+                self.scores[key] = float(match.group(1))
+                events.append(("score", {"rubric": key, "score": self.scores[key]}))
+
+        feedback_match = _FEEDBACK_KEY.search(self.text)
+        if feedback_match:
+            decoded, _ = _decode_partial_string(self.text[feedback_match.end():])
+            if len(decoded) > len(self.feedback) and decoded.startswith(self.feedback):
+                events.append(("feedback", {"delta": decoded[len(self.feedback):]}))
+                self.feedback = decoded
+
+        return events
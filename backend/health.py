@@ -0,0 +1,72 @@
+import asyncio
+import os
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+
+import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# How long a readiness result is reused, and how long each dependency check may take
+HEALTH_CHECK_CACHE_SECONDS = float(os.getenv("HEALTH_CHECK_CACHE_SECONDS", "15"))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "3"))
+
+# A check returns optional details to report, and raises if the dependency is unusable
+CheckFn = Callable[[], Awaitable[Optional[Dict]]]
+
+
+class ReadinessCheck:
+    """Dependency checks for the readiness probe, cached between probes.
+
+    However often load balancers and orchestrators probe, each dependency is
+    checked at most once per cache period, and concurrent probes share the
+    same run. Failing `optional` checks are reported without making the
+    service unready (the API still answers with fallbacks while the model is
+    unavailable).
+    """
+
+    def __init__(self, checks: Dict[str, CheckFn], optional: Iterable[str] = (),
+                 cache_seconds: float = HEALTH_CHECK_CACHE_SECONDS, timeout_seconds: float = HEALTH_CHECK_TIMEOUT_SECONDS):
+        self.checks = checks
+        self.optional = set(optional)
+        self.cache_seconds = cache_seconds
+        self.timeout_seconds = timeout_seconds
+        self._result: Optional[Dict] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._result is not None and time.monotonic() - self._checked_at < self.cache_seconds
+
+    async def _run_one(self, name: str, check: CheckFn) -> Dict:
+        started = time.monotonic()
+        try:
+            details = await asyncio.wait_for(check(), timeout=self.timeout_seconds)
+            result = {"ok": True, **(details or {})}
+        except Exception as e:
+            logger.warning(f"Readiness check '{name}' failed: {e!r}")
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        metrics.increment("readiness_checks", f"{name}_{'ok' if result['ok'] else 'failed'}")
+        result["latencyMs"] = round((time.monotonic() - started) * 1000, 1)
+        return result
+
+    async def run(self) -> Dict:
+        """The latest readiness result, re-checking dependencies if it has expired"""
+        if self._fresh():
+            return self._result
+        async with self._lock:
+            if self._fresh():
+                return self._result
+            names = list(self.checks)
+            results = await asyncio.gather(*(self._run_one(name, self.checks[name]) for name in names))
+            checks = dict(zip(names, results))
+            self._result = {
+                "ready": all(result["ok"] for name, result in checks.items() if name not in self.optional),
+                "checks": checks,
+                "checkedAt": datetime.now(timezone.utc).isoformat()
+            }
+            self._checked_at = time.monotonic()
+            return self._result
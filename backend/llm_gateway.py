@@ -0,0 +1,138 @@
+import asyncio
+import os
+import logging
+import google.genai as genai
+from dotenv import load_dotenv
+from llm_providers import create_provider
+from circuit_breaker import CircuitBreaker
+from retry_policy import classify_error, RATE_LIMIT, TIMEOUT, SERVER, BUDGET_EXHAUSTED
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Maximum number of model calls allowed in flight at once per worker
+MAX_CONCURRENT_CALLS = int(os.getenv("LLM_MAX_CONCURRENT_CALLS", "200"))
+
+# Model backend: "gemini" (default) or "fake" for offline load tests and benchmarks
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+
+# Initialize the model provider
+provider = create_provider(LLM_PROVIDER)
+model_name = provider.model_name if provider else None
+if provider:
+    logger.info(f"LLM provider '{provider.name}' configured with model {model_name}")
+
+# Opens after repeated rate-limit, timeout or server errors so callers fail over immediately
+breaker = CircuitBreaker("llm")
+
+# Error classes that indicate the model service itself is unhealthy
+_BREAKER_ERRORS = {RATE_LIMIT, TIMEOUT, SERVER}
+
+_semaphore: asyncio.Semaphore = None
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Create the concurrency limiter lazily so it binds to the running event loop"""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+    return _semaphore
+
+def _record_outcome(error: BaseException):
+    """Count service-level failures against the breaker; other errors don't say anything about its health"""
+    if isinstance(error, asyncio.CancelledError) and BUDGET_EXHAUSTED in error.args:
+        # Cut off by the call site's time budget: the service was too slow
+        breaker.record_failure()
+    elif isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+        # The caller went away (e.g. a client disconnect mid-stream), which says nothing about the service
+        breaker.record_cancelled()
+    elif isinstance(error, Exception) and classify_error(error) in _BREAKER_ERRORS:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+def default_config() -> genai.types.GenerateContentConfig:
+    """Generation config shared by all call sites (thinking disabled for latency)"""
+    return genai.types.GenerateContentConfig(
+        thinking_config=genai.types.ThinkingConfig(thinking_budget=0)
+    )
+
+def json_config(schema) -> genai.types.GenerateContentConfig:
+    """Generation config that constrains the output to JSON matching `schema`"""
+    return genai.types.GenerateContentConfig(
+        thinking_config=genai.types.ThinkingConfig(thinking_budget=0),
+        response_mime_type="application/json",
+        response_schema=schema
+    )
+
+async def generate_content(contents, config=None):
+    """Run a generation on the configured provider without blocking the event loop.
+
+    All generation in the backend goes through this function so the number of
+    concurrent model calls per worker stays bounded.
+    """
+    if not provider:
+        raise RuntimeError("AI model not configured")
+
+    breaker.check()
+    async with _get_semaphore():
+        try:
+            response = await provider.generate_content(contents, config or default_config())
+        except BaseException as e:
+            _record_outcome(e)
+            raise
+    breaker.record_success()
+    return response
+
+async def generate_content_stream(contents, config=None):
+    """Stream a generation chunk by chunk from the configured provider.
+
+    The concurrency slot is held until the stream has been fully consumed.
+    """
+    if not provider:
+        raise RuntimeError("AI model not configured")
+
+    breaker.check()
+    async with _get_semaphore():
+        try:
+            async for chunk in provider.generate_content_stream(contents, config or default_config()):
+                yield chunk
+        except BaseException as e:
+            _record_outcome(e)
+            raise
+    breaker.record_success()
+
+async def create_cached_content(contents, system_instruction: str, ttl_seconds: int, display_name: str) -> str:
+    """Upload a reusable prompt prefix to the provider's context cache, returning its handle"""
+    if not provider:
+        raise RuntimeError("AI model not configured")
+    return await provider.create_cached_content(contents, system_instruction, ttl_seconds, display_name)
+
+async def delete_cached_content(name: str):
+    """Delete a context cache entry before its TTL runs out"""
+    if not provider:
+        raise RuntimeError("AI model not configured")
+    await provider.delete_cached_content(name)
+
+async def upload_file(path: str, mime_type: str) -> genai.types.Part:
+    """Upload a media file to the provider, returning a Part that references it"""
+    if not provider:
+        raise RuntimeError("AI model not configured")
+
+    breaker.check()
+    async with _get_semaphore():
+        try:
+            part = await provider.upload_file(path, mime_type)
+        except BaseException as e:
+            _record_outcome(e)
+            raise
+    breaker.record_success()
+    return part
+
+async def delete_file(part: genai.types.Part):
+    """Delete a media file uploaded with upload_file once no request needs it"""
+    if not provider:
+        raise RuntimeError("AI model not configured")
+    await provider.delete_file(part)
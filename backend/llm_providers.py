@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import json
+import os
+import logging
+import random
+from typing import AsyncIterator, List, Optional
+
+import google.genai as genai
+from google.genai import errors as genai_errors
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+GEMINI_MODEL_NAME = 'gemini-2.5-flash-preview-05-20'
+
+# Fake provider configuration (LLM_PROVIDER=fake)
+FAKE_LLM_LATENCY_DISTRIBUTION = os.getenv("FAKE_LLM_LATENCY_DISTRIBUTION", "lognormal")  # fixed, uniform or lognormal
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+FAKE_LLM_LATENCY_SPREAD = float(os.getenv("FAKE_LLM_LATENCY_SPREAD", "0.5"))
+FAKE_LLM_FAILURE_RATE = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "42"))
+
+
+def _file_digest(path: str) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as uploaded:
+        for block in iter(lambda: uploaded.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class LLMProvider:
+    """Interface for the model backends used by llm_gateway.
+
+    Responses expose a `.text` attribute like Gemini's GenerateContentResponse.
+    """
+
+    name = "base"
+    model_name: Optional[str] = None
+
+    async def generate_content(self, contents: list, config: genai.types.GenerateContentConfig):
+        raise NotImplementedError
+
+    async def generate_content_stream(self, contents: list, config: genai.types.GenerateContentConfig) -> AsyncIterator:
+        raise NotImplementedError
+        yield
+
+    async def create_cached_content(self, contents: list, system_instruction: str, ttl_seconds: int, display_name: str) -> str:
+        raise NotImplementedError
+
+    async def delete_cached_content(self, name: str):
+        raise NotImplementedError
+
+    async def upload_file(self, path: str, mime_type: str) -> genai.types.Part:
+        raise NotImplementedError
+
+    async def delete_file(self, part: genai.types.Part):
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through the async google-genai client"""
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str], model_name: str = GEMINI_MODEL_NAME):
+        self.client = genai.Client(api_key=api_key)
+        self.model_name = model_name
+
+    async def generate_content(self, contents, config):
+        return await self.client.aio.models.generate_content(
+            model=self.model_name,
+            contents=contents,
+            config=config
+        )
+
+    async def generate_content_stream(self, contents, config):
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model_name,
+            contents=contents,
+            config=config
+        )
+        async for chunk in stream:
+            yield chunk
+
+    async def create_cached_content(self, contents, system_instruction, ttl_seconds, display_name):
+        cached = await self.client.aio.caches.create(
+            model=self.model_name,
+            config=genai.types.CreateCachedContentConfig(
+                contents=contents,
+                system_instruction=system_instruction,
+                ttl=f"{ttl_seconds}s",
+                display_name=display_name
+            )
+        )
+        return cached.name
+
+    async def delete_cached_content(self, name):
+        await self.client.aio.caches.delete(name=name)
+
+    async def upload_file(self, path, mime_type):
+        uploaded = await self.client.aio.files.upload(file=path, config=genai.types.UploadFileConfig(mime_type=mime_type))
+        # Media files are processed before they can be referenced in a request
+        while uploaded.state == genai.types.FileState.PROCESSING:
+            await asyncio.sleep(0.5)
+            uploaded = await self.client.aio.files.get(name=uploaded.name)
+        if uploaded.state == genai.types.FileState.FAILED:
+            raise RuntimeError(f"File processing failed for {uploaded.name}")
+        return genai.types.Part.from_uri(file_uri=uploaded.uri, mime_type=uploaded.mime_type or mime_type)
+
+    async def delete_file(self, part):
+        # File URIs end in the file's resource name, e.g. .../v1beta/files/abc123
+        await self.client.aio.files.delete(name="files/" + part.file_data.file_uri.rsplit("/files/", 1)[-1])
+
+
+class FakeResponse:
+    """Minimal stand-in for GenerateContentResponse"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeProvider(LLMProvider):
+    """Deterministic offline provider for load tests and benchmarks.
+
+    Output depends only on the request contents: schema-constrained calls get
+    JSON that satisfies the response_schema, free-text calls get a synthetic
+    case study. Latency follows the configured distribution and a fraction of
+    calls fail with rate-limit or server errors, like the real API.
+    """
+
+    name = "fake"
+    model_name = "fake-llm"
+
+    def __init__(
+        self,
+        latency_distribution: str = FAKE_LLM_LATENCY_DISTRIBUTION,
+        latency_ms: float = FAKE_LLM_LATENCY_MS,
+        latency_spread: float = FAKE_LLM_LATENCY_SPREAD,
+        failure_rate: float = FAKE_LLM_FAILURE_RATE,
+        seed: int = FAKE_LLM_SEED,
+    ):
+        self.latency_distribution = latency_distribution
+        self.latency_ms = latency_ms
+        self.latency_spread = latency_spread
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+
+    def _latency_seconds(self) -> float:
+        if self.latency_distribution == "fixed":
+            latency_ms = self.latency_ms
+        elif self.latency_distribution == "uniform":
+            spread = self.latency_ms * self.latency_spread
+            latency_ms = self.random.uniform(self.latency_ms - spread, self.latency_ms + spread)
+        else:
+            # Median of latency_ms with a long right tail, like real model latency
+            latency_ms = self.latency_ms * self.random.lognormvariate(0, self.latency_spread)
+        return max(0.0, latency_ms) / 1000
+
+    def _maybe_fail(self):
+        if self.failure_rate > 0 and self.random.random() < self.failure_rate:
+            if self.random.random() < 0.5:
+                raise genai_errors.ClientError(429, {"error": {"code": 429, "message": "Resource exhausted (fake provider)", "status": "RESOURCE_EXHAUSTED"}})
+            raise genai_errors.ServerError(503, {"error": {"code": 503, "message": "Service unavailable (fake provider)", "status": "UNAVAILABLE"}})
+
+    @staticmethod
+    def _seed_for(contents: list) -> int:
+        digest = hashlib.sha256(repr(contents).encode("utf-8", "replace")).hexdigest()
+        return int(digest[:16], 16)
+
+    def _value_for(self, schema: genai.types.Schema, rng: random.Random, name: str):
+        schema_type = schema.type.value if schema.type else "STRING"
+        if schema_type == "OBJECT":
+            return {key: self._value_for(value, rng, key) for key, value in (schema.properties or {}).items()}
+        if schema_type == "ARRAY":
+            return [self._value_for(schema.items, rng, name) for _ in range(2)] if schema.items else []
+        if schema_type in ("NUMBER", "INTEGER"):
+            low = schema.minimum if schema.minimum is not None else 0
+            high = schema.maximum if schema.maximum is not None else 10
+            value = rng.uniform(low, high)
+            return int(round(value)) if schema_type == "INTEGER" else round(value, 1)
+        if schema_type == "BOOLEAN":
+            return rng.random() < 0.5
+        if schema.enum:
+            return rng.choice(schema.enum)
+        return f"Synthetic {name.replace('_', ' ')} generated by the fake LLM provider."
+
+    def _render(self, contents: list, config) -> str:
+        rng = random.Random(self._seed_for(contents))
+        schema = getattr(config, "response_schema", None) if config else None
+        if schema is not None:
+            return json.dumps(self._value_for(schema, rng, "response"))
+        case_number = rng.randint(1000, 9999)
+        return (
+            f"Case Study #{case_number}: Rising Defect Rate on a Synthetic Assembly Line. "
+            "A mid-sized manufacturer has seen its defect rate climb over the past month after a "
+            "supplier change and a shift schedule update. Throughput is down, rework is up and a key "
+            "customer has raised a formal complaint. Analyze the problem systematically."
+        )
+
+    async def generate_content(self, contents, config):
+        await asyncio.sleep(self._latency_seconds())
+        self._maybe_fail()
+        return FakeResponse(self._render(contents, config))
+
+    async def generate_content_stream(self, contents, config):
+        total_latency = self._latency_seconds()
+        self._maybe_fail()
+        text = self._render(contents, config)
+        chunks: List[str] = [text[i:i + 64] for i in range(0, len(text), 64)] or [""]
+        for chunk in chunks:
+            await asyncio.sleep(total_latency / len(chunks))
+            yield FakeResponse(chunk)
+
+    # No context cache methods: with this provider SessionContextCache keeps the
+    # case study in LocalContextCache and never asks the provider to cache it
+
+    async def upload_file(self, path, mime_type):
+        digest = await asyncio.to_thread(_file_digest, path)
+        return genai.types.Part.from_uri(file_uri=f"fake://files/{digest[:16]}", mime_type=mime_type)
+
+    async def delete_file(self, part):
+        pass
+
+
+def create_provider(name: str) -> Optional[LLMProvider]:
+    """Build the provider selected by LLM_PROVIDER, or None if it can't be configured"""
+    try:
+        if name == "fake":
+            return FakeProvider()
+        if name == "gemini":
+            return GeminiProvider(api_key=os.getenv("GOOGLE_API_KEY"))
+        raise ValueError(f"Unknown LLM provider: {name}")
+    except Exception as e:
+        logger.error(f"Failed to configure LLM provider '{name}': {e}")
+        return None
@@ -1,17 +1,42 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
-import google.genai as genai
 import os
 import json
 import uuid
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import logging
-from typing import List, Dict, Optional
-from supabase import create_client, Client
+from typing import List, Dict, Optional, Tuple
+from db import supabase, execute, close_database
 from dashboard import dashboard_router
+from llm_gateway import generate_content, generate_content_stream, json_config, model_name
+from evaluation_schemas import part_evaluation_schema, audio_evaluation_schema, final_evaluation_schema, transcription_schema
+import metrics
+from evaluation_cache import EvaluationCache, make_cache_key, EVALUATION_CACHE_CLEANUP_INTERVAL_SECONDS
+from context_cache import SessionContextCache, CACHED_CASE_STUDY_REFERENCE
+import asyncio
+from retry_policy import call_with_retry, iterate_with_budget, policy_for
+from rescoring_queue import RescoringQueue, FINAL_EVALUATION_PART_ID
+from circuit_breaker import CLOSED, OPEN
+import llm_gateway
+from evaluation_stream import IncrementalEvaluationParser, sse_event
+from case_pool import CaseStudyPool
+from session_cache import SessionCache
+from health import ReadinessCheck, HEALTH_CHECK_TIMEOUT_SECONDS
+from scheduler import Scheduler
+from session_expiry import SessionExpiry, SESSION_EXPIRY_INTERVAL_SECONDS
+from analytics_rollups import RollupCompaction, ANALYTICS_COMPACTION_INTERVAL_SECONDS
+from session_archive import session_archive
+from session_summary import summarize_part, fit_summaries, truncate_to_tokens, estimate_tokens, token_report, FINAL_PROMPT_TOKEN_BUDGET
+from contextlib import asynccontextmanager
+from audio_upload import spool_upload, audio_mime_type, remove_spooled, UploadTooLargeError, AUDIO_UPLOAD_MAX_BYTES, DEFAULT_AUDIO_MIME_TYPE
+from object_store import create_object_store, store_audio_file
+from audio_ingest import AudioIngest, ChunkOrderError, IngestCapacityError, format_timestamp
+from audio_normalize import AudioNormalizer, NormalizedAudio, CLIP_MIME_TYPE
 
 # Load environment variables
 load_dotenv()
@@ -20,20 +45,28 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Supabase client
-try:
-    supabase_url = os.getenv("SUPABASE_URL")
-    supabase_key = os.getenv("SUPABASE_ANON_KEY")
-    if not supabase_url or not supabase_key:
-        raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY must be set in environment variables")
-    supabase: Client = create_client(supabase_url, supabase_key)
-    logger.info("Supabase client configured successfully")
-except Exception as e:
-    logger.error(f"Failed to configure Supabase: {e}")
-    supabase = None
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background work when the application starts"""
+    # Warm the case study pool so the first candidates don't wait on generation
+    case_pool.schedule_refill()
+    # Redo fallback evaluations once the model is healthy again
+    rescoring_task = run_in_background(
+        rescoring_queue.run(rescore_queued_evaluation, lambda: llm_gateway.breaker.state == CLOSED)
+    )
+    # Periodic maintenance, run by whichever worker holds each job's lease
+    scheduler.add_job("session_expiry", session_expiry.run, SESSION_EXPIRY_INTERVAL_SECONDS)
+    scheduler.add_job("analytics_rollups", rollup_compaction.run, ANALYTICS_COMPACTION_INTERVAL_SECONDS)
+    scheduler.add_job("evaluation_cache_cleanup", evaluation_cache.purge_expired, EVALUATION_CACHE_CLEANUP_INTERVAL_SECONDS)
+    scheduler.start()
+    yield
+    await scheduler.stop()
+    rescoring_task.cancel()
+    audio_normalizer.shutdown()
+    await close_database()
 
 # Initialize FastAPI app
-app = FastAPI(title="Catalyst Backend API", version="2.0.0")
+app = FastAPI(title="Catalyst Backend API", version="2.0.0", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -50,15 +83,6 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Include dashboard router
 app.include_router(dashboard_router)
 
-# Configure Google AI
-try:
-    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
-    model_name = 'gemini-2.5-flash-preview-05-20'
-    logger.info("Google AI configured successfully")
-except Exception as e:
-    logger.error(f"Failed to configure Google AI: {e}")
-    model_name = None
-
 
 # Enhanced Pydantic models for request/response validation
 class AnalysisRequest(BaseModel):
@@ -68,7 +92,6 @@ class PartSubmissionRequest(BaseModel):
     partId: int
     responses: Dict[str, str]  # questionId -> response
     sessionId: str
-    audioData: Optional[str] = None  # Base64 encoded audio for Part 5
 
 class EvaluationResponse(BaseModel):
     rootCauseScore: float
@@ -94,6 +117,13 @@ class FinalEvaluationResponse(BaseModel):
     completionTime: str
     toolRecommendations: Dict[str, Dict[str, str]]  # Tool mapping based on weaknesses
 
+class FinalEvaluationStatusResponse(BaseModel):
+    sessionId: str
+    status: str  # "pending", "running", "complete" or "failed"
+
+# Structured output schema for the model-generated part of the final evaluation
+FINAL_EVALUATION_SCHEMA = final_evaluation_schema(FinalEvaluationResponse)
+
 class CaseStudyResponse(BaseModel):
     caseStudy: str
 
@@ -117,20 +147,6 @@ class HealthResponse(BaseModel):
     version: str
 
 # Database helper functions
-def cleanup_old_sessions():
-    """Remove sessions older than 24 hours"""
-    if not supabase:
-        return
-    
-    try:
-        from datetime import timezone
-        cutoff_time = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
-        result = supabase.table("sessions").delete().lt("created_at", cutoff_time).execute()
-        if result.data:
-            logger.info(f"Cleaned up {len(result.data)} expired sessions")
-    except Exception as e:
-        logger.error(f"Error cleaning up old sessions: {e}")
-
 def get_current_part(completed_parts):
     """Determine the current part based on completed parts"""
     for part_id in range(1, 5):
@@ -138,20 +154,36 @@ def get_current_part(completed_parts):
             return part_id
     return 5  # All parts completed
 
-def get_session_from_db(session_id: str):
-    """Get session data from database"""
+async def get_session_from_db(session_id: str, use_cache: bool = True):
+    """Get session data from the session cache or the database.
+
+    Pass use_cache=False for columns other workers may have changed, such as
+    the final evaluation status.
+    """
     if not supabase:
         raise HTTPException(status_code=500, detail="Database not configured")
     
+    if use_cache:
+        session = session_cache.get(session_id)
+        if session is not None:
+            return session
+    
     try:
-        result = supabase.table("sessions").select("*").eq("session_id", session_id).execute()
+        result = await execute(supabase.table("sessions").select("*").eq("session_id", session_id))
         if not result.data:
+            session_cache.invalidate(session_id)
             return None
+        session_cache.put(result.data[0])
         return result.data[0]
     except Exception as e:
         logger.error(f"Error fetching session {session_id}: {e}")
         return None
 
+async def update_session(session_id: str, columns: Dict):
+    """Update the session row and write the change through to the session cache"""
+    await execute(supabase.table("sessions").update(columns).eq("session_id", session_id))
+    session_cache.update(session_id, columns)
+
 def calculate_average_score(scores):
     """Calculate average score from a scores dictionary"""
     if not scores:
@@ -166,6 +198,180 @@ def validate_part_responses(part, responses):
             missing_questions.append(question["question"][:50] + "...")
     return missing_questions
 
+def process_text_responses(part, responses):
+    """Fill in placeholder text for unanswered questions so the evaluator can see them"""
+    processed_responses = {}
+    for question in part["questions"]:
+        response_text = responses.get(question["id"], "").strip()
+        if not response_text:
+            response_text = f"[No response provided for: {question['question'][:100]}...]"
+        processed_responses[question["id"]] = response_text
+    return processed_responses
+
+def build_part_evaluation_prompt(part, case_study: str, processed_responses):
+    """Create the evaluation prompt for a text part"""
+    responses_text = ""
+    for i, question in enumerate(part["questions"], 1):
+        response = processed_responses.get(question["id"], "No response")
+        responses_text += f"\nQuestion {i}: {question['question']}\nStudent Response: {response}\n"
+    
+    rubrics_text = ""
+    for key, description in part["rubrics"].items():
+        rubrics_text += f"\n Rubric Text:  {key.replace('_', ' ').title()}: {description}"
+        rubrics_text += f"\n Rubric Label: {key}"
+    
+    # Enhanced evaluation prompt that accounts for placeholder responses
+    return f"""
+You are evaluating a student's responses to a manufacturing problem-solving exercise.
+
+CASE STUDY:
+{case_study}
+
+STUDENT RESPONSES:
+{responses_text}
+
+EVALUATION RUBRICS:
+{rubrics_text}
+
+IMPORTANT EVALUATION GUIDELINES:
+- If a response starts with "[No response provided for:", this means the student left this question blank
+- For blank responses, assign scores based on the overall quality of other responses, but generally score lower (3-5 range)
+- For substantive responses, evaluate based on the rubric criteria (1-10 scale)
+- Consider the overall effort and engagement across all questions
+- Provide constructive feedback that addresses both answered and unanswered questions
+
+Evaluate this student's performance across all rubric dimensions. Each score should be between 1-10.
+
+Provide your evaluation as JSON in this exact format:
+{{
+    "scores": {{
+        "{list(part['rubrics'].keys())[0]}": score,
+        "{list(part['rubrics'].keys())[1] if len(part['rubrics']) > 1 else list(part['rubrics'].keys())[0]}": score,
+        "{list(part['rubrics'].keys())[2] if len(part['rubrics']) > 2 else list(part['rubrics'].keys())[0]}": score
+    }},
+    "feedback": "Detailed constructive feedback addressing both strengths and areas for improvement, including guidance on unanswered questions"
+}}
+
+Respond only with valid JSON.
+            """
+
+def extract_json_text(text: str) -> str:
+    """Strip markdown fences and any text around the outermost JSON object"""
+    cleaned_text = text.replace("```json", "").replace("```", "").strip()
+    # Remove any text before the first { or after the last }
+    start_idx = cleaned_text.find('{')
+    end_idx = cleaned_text.rfind('}') + 1
+    if start_idx != -1 and end_idx != 0:
+        cleaned_text = cleaned_text[start_idx:end_idx]
+    return cleaned_text
+
+def parse_part_evaluation(text: str, part):
+    """Parse and validate a text part evaluation, raising ValueError if it is unusable"""
+    evaluation_data = json.loads(extract_json_text(text))
+    
+    # Validate response structure
+    required_keys = ["scores", "feedback"]
+    if not all(key in evaluation_data for key in required_keys):
+        raise ValueError("Missing required keys in evaluation response")
+    
+    # Validate scores are numeric and in range, convert to float
+    for rubric_key in part["rubrics"].keys():
+        if rubric_key not in evaluation_data["scores"]:
+            raise ValueError(f"Missing score for rubric: {rubric_key}")
+        score = evaluation_data["scores"][rubric_key]
+        if not isinstance(score, (int, float)) or not (1 <= score <= 10):
+            raise ValueError(f"Invalid score for {rubric_key}: {score}")
+        # Ensure score is a float for consistency
+        evaluation_data["scores"][rubric_key] = float(score)
+    
+    return evaluation_data
+
+def parse_final_evaluation(text: str):
+    """Parse and validate the final evaluation, raising ValueError if it is unusable"""
+    final_data = json.loads(extract_json_text(text))
+    
+    # Validate structure and convert scores to floats
+    required_keys = ["overallScores", "detailedFeedback", "overallPerformance"]
+    if not all(key in final_data for key in required_keys):
+        raise ValueError("Missing required keys in final evaluation")
+    
+    # Ensure all scores are floats for consistency
+    for key, score in final_data["overallScores"].items():
+        if isinstance(score, (int, float)):
+            final_data["overallScores"][key] = float(score)
+    
+    return final_data
+
+def fallback_part_evaluation(part):
+    """Neutral evaluation used when the model output can't be used"""
+    return {
+        "scores": {key: 5 for key in part["rubrics"].keys()},
+        "feedback": "Your submission has been received. Some questions may not have been fully answered, which affects the evaluation. Please ensure you provide detailed responses to all questions for the best assessment. You may continue to the next part.",
+        "canProceed": True,
+        "fallback": True
+    }
+
+async def record_part_evaluation(session, part_id: int, evaluation_data, responses: Optional[Dict[str, str]] = None,
+                                 response_rows: Optional[List[Dict]] = None):
+    """Store a part's responses and evaluation, mark the part as completed and update the session summary.
+
+    Everything is written by the submit_part_evaluation database function in a
+    single round trip and transaction. `response_rows` defaults to one row per
+    entry of `responses`. Raises a 400 if the part was already evaluated.
+    """
+    # Calculate average score
+    average_score = calculate_average_score(evaluation_data["scores"])
+    
+    # Determine if student can proceed
+    can_proceed = True  # average_score >= part["passingScore"]
+    evaluation_data["canProceed"] = can_proceed
+
+    if response_rows is None:
+        response_rows = [
+            {"question_id": question_id, "response_text": response_text}
+            for question_id, response_text in (responses or {}).items()
+        ]
+    
+    # Keep a compact running summary so the final evaluation prompt stays small
+    part_summary = summarize_part(EVALUATION_PARTS[part_id - 1], responses, evaluation_data)
+
+    result = await execute(supabase.rpc("submit_part_evaluation", {
+        "p_session_id": session["session_id"],
+        "p_part_id": part_id,
+        "p_responses": response_rows,
+        "p_evaluation": {
+            "scores": evaluation_data["scores"],
+            "feedback": evaluation_data["feedback"],
+            "can_proceed": can_proceed,
+            "average_score": average_score,
+            "transcription": evaluation_data.get("transcription", None)
+        },
+        "p_part_summary": part_summary
+    }))
+    outcome = result.data or {}
+    if outcome.get("status") == "conflict":
+        metrics.increment("part_submissions", "conflict")
+        raise HTTPException(status_code=400, detail="Part already completed")
+    if outcome.get("status") != "stored":
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    metrics.increment("part_submissions", "stored")
+
+    session["completed_parts"] = outcome.get("completed_parts") or []
+    session["part_summaries"] = {**(session.get("part_summaries") or {}), str(part_id): part_summary}
+    session["last_activity"] = datetime.now(timezone.utc).isoformat()
+    session_cache.update(session["session_id"], {
+        "completed_parts": session["completed_parts"],
+        "part_summaries": session["part_summaries"],
+        "last_activity": session["last_activity"]
+    })
+    
+    # Determine next part
+    next_part_id = None
+    if can_proceed and part_id < len(EVALUATION_PARTS):
+        next_part_id = part_id + 1
+    
+    return average_score, can_proceed, next_part_id
+
 # Enhanced evaluation parts with better question structure
 EVALUATION_PARTS = [
     {
@@ -315,24 +521,176 @@ EVALUATION_PARTS = [
     }
 ]
 
+# Bump when the part evaluation prompt changes so cached evaluations are not reused
+PART_EVALUATION_PROMPT_VERSION = "1"
+
+# Structured output schemas generated from each part's rubrics
+PART_EVALUATION_SCHEMAS = {
+    part["id"]: part_evaluation_schema(part) for part in EVALUATION_PARTS if part["id"] != 5
+}
+AUDIO_EVALUATION_SCHEMA = audio_evaluation_schema(EVALUATION_PARTS[4])
+TRANSCRIPTION_SCHEMA = transcription_schema()
+
+FALLBACK_CASE_STUDY = (
+    "Case Study: Critical Quality Crisis at Advanced Electronics Manufacturing. "
+    "TechFlow Industries, a 500-employee electronics manufacturer, is experiencing a severe quality crisis "
+    "affecting their primary product line. Over the past 6 weeks, customer returns have increased by 35%, "
+    "with defects ranging from intermittent connection failures (40% of returns) to complete component "
+    "malfunctions (25% of returns). The defects are discovered at various stages: 30% during final testing, "
+    "45% during customer burn-in testing, and 25% in field use within 30 days. This has resulted in "
+    "$2.3M in warranty costs, 15% reduction in production throughput due to increased rework, and "
+    "two major customers threatening to switch suppliers. The manufacturing process involves 12 automated "
+    "assembly stations, 3 manual inspection points, and employs 85 production workers across 3 shifts. "
+    "Recent changes include a new supplier for critical components (implemented 8 weeks ago) and "
+    "upgraded software on 4 assembly machines (implemented 10 weeks ago). Your task is to analyze "
+    "this problem systematically through a structured approach."
+)
+
+async def generate_case_study_text() -> Optional[str]:
+    """Generate a new case study with retry logic, returning None if all attempts fail"""
+    # Enhanced case study generation prompt
+    with open('promptforcasestudy.md', 'r') as file:
+        prompt = file.read()
+
+    async def attempt():
+        response = await generate_content([prompt])
+        case_study = response.text.strip()
+
+        # Validate case study length
+        if len(case_study) < 100:
+            raise ValueError("Generated case study too short")
+        return case_study
+
+    try:
+        return await call_with_retry("generate_case_study", attempt)
+    except Exception as e:
+        logger.error(f"All case study generation attempts failed: {e}")
+
+    return None
+
+# Pool of pre-generated case studies served by generate_multipart_case
+case_pool = CaseStudyPool(supabase, generate_case_study_text)
+
+# Content-addressed cache of text part evaluations
+evaluation_cache = EvaluationCache(supabase)
+
+# Per-session model context cache of the case study
+context_cache = SessionContextCache()
+
+# Recently read sessions rows, kept current by this worker's own writes
+session_cache = SessionCache()
+
+# Evaluations answered with fallback scores, redone once the model recovers
+rescoring_queue = RescoringQueue(supabase)
+
+# Part 5 recordings (responses rows keep only the key, size and checksum)
+object_store = create_object_store()
+
+# Recordings are downmixed, resampled and trimmed in worker processes before upload
+audio_normalizer = AudioNormalizer()
+
+def forget_sessions(session_ids: List[str]):
+    for session_id in session_ids:
+        session_cache.invalidate(session_id)
+
+# Sessions past their TTL are archived (or deleted) in batches by the scheduler, not on request paths
+session_expiry = SessionExpiry(supabase, object_store, forget_sessions, session_archive, context_cache)
+# Folds the analytics deltas appended on evaluation writes into the hourly rollups
+rollup_compaction = RollupCompaction(supabase)
+scheduler = Scheduler(supabase)
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected
+background_tasks = set()
+
+def run_in_background(coro):
+    """Schedule a coroutine without awaiting it"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def attach_context_cache(session_id: str, case_study: str):
+    """Upload the case study to the model context cache and record the handle on the session"""
+    columns = await context_cache.create(session_id, case_study)
+    if not columns:
+        return
+    try:
+        await update_session(session_id, columns)
+    except Exception as e:
+        logger.error(f"Error storing context cache handle for session {session_id}: {e}")
+
+async def release_context_cache(session_id: str, handle: Optional[str]):
+    """Delete the session's cached case study once its final evaluation is stored.
+
+    The handle is cleared on the session first, so later re-scoring sends the
+    case study inline instead of referencing a deleted cache.
+    """
+    if not handle:
+        return
+    try:
+        await update_session(session_id, {"context_cache_name": None, "context_cache_expires_at": None})
+    except Exception as e:
+        logger.error(f"Error clearing context cache handle for session {session_id}: {e}")
+        return
+    await context_cache.delete(handle)
+
+def case_study_context(session):
+    """Return the case study text to embed in prompts and the context cache handle, if any"""
+    handle = context_cache.handle_for(session)
+    if handle:
+        return CACHED_CASE_STUDY_REFERENCE, handle
+    return session["case_study"], None
+
+async def check_database():
+    if not supabase:
+        raise RuntimeError("Database not configured")
+    # Head request: Postgres counts the rows, none are transferred
+    result = await execute(supabase.table("sessions").select("id", count="exact", head=True), timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+    return {"sessions": result.count or 0}
+
+async def check_model():
+    if not model_name:
+        raise RuntimeError("AI model not configured")
+    if llm_gateway.breaker.state == OPEN:
+        raise RuntimeError("Model circuit breaker is open")
+    return {"breaker": llm_gateway.breaker.state}
+
+async def check_object_store():
+    if not object_store:
+        raise RuntimeError("Audio storage not configured")
+    await object_store.ping(HEALTH_CHECK_TIMEOUT_SECONDS)
+    return {"backend": object_store.name}
+
+# Dependency checks behind /health/ready and /, cached between probes
+readiness = ReadinessCheck(
+    {"database": check_database, "model": check_model, "objectStore": check_object_store},
+    optional=["model"]
+)
+
+# Liveness probe: answers from memory so a busy or degraded dependency never restarts the process
+@app.get("/health/live")
+async def liveness():
+    """Whether the process is up and serving requests"""
+    return {"status": "alive"}
+
+# Readiness probe for load balancers
+@app.get("/health/ready")
+async def readiness_probe():
+    """Whether the database and storage are reachable; 503 if not"""
+    result = await readiness.run()
+    return JSONResponse(status_code=200 if result["ready"] else 503, content=result)
+
 # Health check endpoint with enhanced info
 @app.get("/", response_model=HealthResponse)
 async def health_check():
     """Enhanced health check endpoint with system status"""
-    cleanup_old_sessions()  # Clean up old sessions on health check
-    
-    # Get active sessions count from database
-    active_sessions_count = 0
-    if supabase:
-        try:
-            result = supabase.table("sessions").select("id").execute()
-            active_sessions_count = len(result.data) if result.data else 0
-        except Exception as e:
-            logger.error(f"Error counting active sessions: {e}")
+    # Served from the cached readiness checks rather than querying the sessions table
+    result = await readiness.run()
+    database = result["checks"]["database"]
     
     return HealthResponse(
         message="Catalyst Backend API is running!",
-        activeSessionsCount=active_sessions_count,
+        activeSessionsCount=database.get("sessions", 0),
         version="2.0.0"
     )
 
@@ -341,71 +699,27 @@ async def health_check():
 async def generate_multipart_case():
     """Generate a comprehensive manufacturing case study for multi-part evaluation"""
     try:
-        cleanup_old_sessions()  # Clean up before creating new session
-        
         if not model_name:
             raise HTTPException(status_code=500, detail="AI model not configured")
         
         if not supabase:
             raise HTTPException(status_code=500, detail="Database not configured")
         
-        # Enhanced case study generation prompt
-        with open('promptforcasestudy.md', 'r') as file:
-            prompt = file.read()
-        
-        # Generate response with retry logic
-        max_retries = 3
-        case_study = None
-        for attempt in range(max_retries):
-            try:
-                response = client.models.generate_content(
-                    model=model_name,
-                    contents=[prompt],
-                    config = genai.types.GenerateContentConfig(
-                        thinking_config=genai.types.ThinkingConfig(thinking_budget=0)
-                    )
-                )
-                case_study = response.text.strip()
-                
-                # Validate case study length
-                if len(case_study) < 100:
-                    if attempt < max_retries - 1:
-                        continue
-                    else:
-                        raise ValueError("Generated case study too short")
-                break
-                
-            except Exception as e:
-                if attempt < max_retries - 1:
-                    logger.warning(f"Attempt {attempt + 1} failed: {e}")
-                    continue
-                else:
-                    logger.error(f"All case study generation attempts failed: {e}")
-                    case_study = None
+        # Serve a pre-generated case study when one is available
+        case_study = await case_pool.pop()
+        if not case_study:
+            logger.info("Case study pool empty, generating case study on demand")
+            case_study = await generate_case_study_text()
 
         # Use fallback if generation failed
         if not case_study:
-            case_study = (
-                "Case Study: Critical Quality Crisis at Advanced Electronics Manufacturing. "
-                "TechFlow Industries, a 500-employee electronics manufacturer, is experiencing a severe quality crisis "
-                "affecting their primary product line. Over the past 6 weeks, customer returns have increased by 35%, "
-                "with defects ranging from intermittent connection failures (40% of returns) to complete component "
-                "malfunctions (25% of returns). The defects are discovered at various stages: 30% during final testing, "
-                "45% during customer burn-in testing, and 25% in field use within 30 days. This has resulted in "
-                "$2.3M in warranty costs, 15% reduction in production throughput due to increased rework, and "
-                "two major customers threatening to switch suppliers. The manufacturing process involves 12 automated "
-                "assembly stations, 3 manual inspection points, and employs 85 production workers across 3 shifts. "
-                "Recent changes include a new supplier for critical components (implemented 8 weeks ago) and "
-                "upgraded software on 4 assembly machines (implemented 10 weeks ago). Your task is to analyze "
-                "this problem systematically through a structured approach."
-            )
+            case_study = FALLBACK_CASE_STUDY
 
         # Generate session ID and store in database
         session_id = str(uuid.uuid4())
         total_questions = sum(len(part["questions"]) for part in EVALUATION_PARTS)
         
         # Store session in database
-        from datetime import timezone
         current_time = datetime.now(timezone.utc).isoformat()
         session_data = {
             "session_id": session_id,
@@ -417,9 +731,13 @@ async def generate_multipart_case():
             "is_complete": False
         }
         
-        result = supabase.table("sessions").insert(session_data).execute()
+        result = await execute(supabase.table("sessions").insert(session_data))
         if not result.data:
             raise HTTPException(status_code=500, detail="Failed to create session")
+        session_cache.put(result.data[0])
+
+        # Upload the case study once so later evaluations reference it by handle
+        run_in_background(attach_context_cache(session_id, case_study))
 
         return MultiPartCaseStudyResponse(
             caseStudy=case_study,
@@ -447,7 +765,7 @@ async def submit_part(request: PartSubmissionRequest):
             raise HTTPException(status_code=500, detail="Database not configured")
 
         # Validate session exists
-        session = get_session_from_db(request.sessionId)
+        session = await get_session_from_db(request.sessionId)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found or expired")
         
@@ -455,193 +773,47 @@ async def submit_part(request: PartSubmissionRequest):
         if not part:
             raise HTTPException(status_code=400, detail="Invalid part ID")
 
-        # Check if part already completed
-        existing_evaluation = supabase.table("part_evaluations").select("*").eq("session_id", request.sessionId).eq("part_id", request.partId).execute()
-        if existing_evaluation.data:
+        # Check if part already completed (submit_part_evaluation re-checks atomically when storing)
+        if request.partId in (session.get("completed_parts") or []):
             raise HTTPException(status_code=400, detail="Part already completed")
 
-        # Special handling for Part 5 (audio recording)
+        # The Part 5 recording is streamed as a raw body to /api/submit-part/audio
         if request.partId == 5:
-            if not request.audioData:
-                raise HTTPException(status_code=400, detail="Audio recording is required for Part 5")
-            
-            # Store audio response in database
-            response_data = {
-                "session_id": request.sessionId,
-                "part_id": request.partId,
-                "question_id": "q5_verbal",
-                "response_text": "Audio recording submitted",
-                "audio_data": request.audioData
-            }
-            supabase.table("responses").insert(response_data).execute()
-            
-            # Evaluate audio recording
-            evaluation_data = await evaluate_audio_response(request.audioData, session["case_study"])
-            
-        else:
-            # Regular text-based part validation and processing
-            # Store responses in database
-            for question in part["questions"]:
-                response_text = request.responses.get(question["id"], "").strip()
-                if not response_text:
-                    response_text = f"[No response provided for: {question['question'][:100]}...]"
-                
-                response_data = {
-                    "session_id": request.sessionId,
-                    "part_id": request.partId,
-                    "question_id": question["id"],
-                    "response_text": response_text
-                }
-                supabase.table("responses").insert(response_data).execute()
-            
-            # Get processed responses for evaluation
-            processed_responses = {}
-            for question in part["questions"]:
-                response_text = request.responses.get(question["id"], "").strip()
-                if not response_text:
-                    processed_responses[question["id"]] = f"[No response provided for: {question['question'][:100]}...]"
-                else:
-                    processed_responses[question["id"]] = response_text
-            
-            # Create enhanced evaluation prompt for text responses
-            case_study = session["case_study"]
-            responses_text = ""
-            for i, question in enumerate(part["questions"], 1):
-                response = processed_responses.get(question["id"], "No response")
-                responses_text += f"\nQuestion {i}: {question['question']}\nStudent Response: {response}\n"
-            
-            rubrics_text = ""
-            for key, description in part["rubrics"].items():
-                rubrics_text += f"\n Rubric Text:  {key.replace('_', ' ').title()}: {description}"
-                rubrics_text += f"\n Rubric Label: {key}"
-            
-            # Enhanced evaluation prompt that accounts for placeholder responses
-            evaluation_prompt = f"""
-You are evaluating a student's responses to a manufacturing problem-solving exercise.
-
-CASE STUDY:
-{case_study}
-
-STUDENT RESPONSES:
-{responses_text}
-
-EVALUATION RUBRICS:
-{rubrics_text}
-
-IMPORTANT EVALUATION GUIDELINES:
-- If a response starts with "[No response provided for:", this means the student left this question blank
-- For blank responses, assign scores based on the overall quality of other responses, but generally score lower (3-5 range)
-- For substantive responses, evaluate based on the rubric criteria (1-10 scale)
-- Consider the overall effort and engagement across all questions
-- Provide constructive feedback that addresses both answered and unanswered questions
-
-Evaluate this student's performance across all rubric dimensions. Each score should be between 1-10.
-
-Provide your evaluation as JSON in this exact format:
-{{
-    "scores": {{
-        "{list(part['rubrics'].keys())[0]}": score,
-        "{list(part['rubrics'].keys())[1] if len(part['rubrics']) > 1 else list(part['rubrics'].keys())[0]}": score,
-        "{list(part['rubrics'].keys())[2] if len(part['rubrics']) > 2 else list(part['rubrics'].keys())[0]}": score
-    }},
-    "feedback": "Detailed constructive feedback addressing both strengths and areas for improvement, including guidance on unanswered questions"
-}}
+            raise HTTPException(status_code=400, detail="Submit the Part 5 recording to /api/submit-part/audio")
 
-Respond only with valid JSON.
-            """
-            
-            # Generate evaluation with retry logic
-            max_retries = 3
-            evaluation_data = None
-            
-            for attempt in range(max_retries):
-                try:
-                    response = client.models.generate_content(
-                        model=model_name,
-                        contents=[evaluation_prompt],
-                        config = genai.types.GenerateContentConfig(
-                            thinking_config=genai.types.ThinkingConfig(thinking_budget=0)
-                        )
-                    )
-                    text = response.text
-                    print(text)
-                    # Clean and parse JSON
-                    cleaned_text = text.replace("```json", "").replace("```", "").strip()
-                    # Remove any text before the first { or after the last }
-                    start_idx = cleaned_text.find('{')
-                    end_idx = cleaned_text.rfind('}') + 1
-                    if start_idx != -1 and end_idx != 0:
-                        cleaned_text = cleaned_text[start_idx:end_idx]
-                    
-                    evaluation_data = json.loads(cleaned_text)
-                    
-                    # Validate response structure
-                    required_keys = ["scores", "feedback"]
-                    if not all(key in evaluation_data for key in required_keys):
-                        raise ValueError("Missing required keys in evaluation response")
-                    
-                    # Validate scores are numeric and in range, convert to float
-                    for rubric_key in part["rubrics"].keys():
-                        if rubric_key not in evaluation_data["scores"]:
-                            raise ValueError(f"Missing score for rubric: {rubric_key}")
-                        score = evaluation_data["scores"][rubric_key]
-                        if not isinstance(score, (int, float)) or not (1 <= score <= 10):
-                            raise ValueError(f"Invalid score for {rubric_key}: {score}")
-                        # Ensure score is a float for consistency
-                        evaluation_data["scores"][rubric_key] = float(score)
-                    
-                    break
-                    
-                except (json.JSONDecodeError, ValueError) as e:
-                    if attempt < max_retries - 1:
-                        logger.warning(f"Evaluation attempt {attempt + 1} failed: {e}")
-                        continue
-                    else:
-                        logger.error(f"All evaluation attempts failed: {e}")
-                        raise e
-            
-            # Fallback response if all attempts failed
-            if evaluation_data is None:
-                evaluation_data = {
-                    "scores": {key: 5 for key in part["rubrics"].keys()},
-                    "feedback": "Your submission has been received. Some questions may not have been fully answered, which affects the evaluation. Please ensure you provide detailed responses to all questions for the best assessment. You may continue to the next part.",
-                    "canProceed": True
-                }
-
-        # Calculate average score
-        average_score = calculate_average_score(evaluation_data["scores"])
+        # Regular text-based part validation and processing
+        processed_responses = process_text_responses(part, request.responses)
+        prompt_case_study, context_handle = case_study_context(session)
+        evaluation_prompt = build_part_evaluation_prompt(part, prompt_case_study, processed_responses)
         
-        # Determine if student can proceed
-        can_proceed = True  # average_score >= part["passingScore"]
-        evaluation_data["canProceed"] = can_proceed
-
-        # Store evaluation in database
-        evaluation_record = {
-            "session_id": request.sessionId,
-            "part_id": request.partId,
-            "scores": evaluation_data["scores"],
-            "feedback": evaluation_data["feedback"],
-            "can_proceed": can_proceed,
-            "average_score": average_score,
-            "transcription": evaluation_data.get("transcription", None)
-        }
-        supabase.table("part_evaluations").insert(evaluation_record).execute()
-        
-        # Update session completed_parts and last_activity
-        completed_parts = session.get("completed_parts", [])
-        if request.partId not in completed_parts:
-            completed_parts.append(request.partId)
+        # Reuse a stored evaluation for identical inputs
+        cache_key = make_cache_key(session["case_study"], processed_responses, part["rubrics"], PART_EVALUATION_PROMPT_VERSION)
+        evaluation_data = await evaluation_cache.get(cache_key)
         
-        from datetime import timezone
-        supabase.table("sessions").update({
-            "completed_parts": completed_parts,
-            "last_activity": datetime.now(timezone.utc).isoformat()
-        }).eq("session_id", request.sessionId).execute()
+        # Generate evaluation with retry logic
+        if evaluation_data is None:
+            async def attempt():
+                contents, config = context_cache.apply(context_handle, [evaluation_prompt], json_config(PART_EVALUATION_SCHEMAS[part["id"]]))
+                response = await generate_content(contents, config)
+                return parse_part_evaluation(response.text, part)
+
+            try:
+                evaluation_data = await call_with_retry("submit_part", attempt)
+                await evaluation_cache.set(cache_key, evaluation_data)
+            except Exception as e:
+                # Breaker open, budget exhausted or retries used up: answer now, re-score later
+                logger.warning(f"Model evaluation unavailable for part {request.partId}, using fallback: {e}")
         
-        # Determine next part
-        next_part_id = None
-        if can_proceed and request.partId < len(EVALUATION_PARTS):
-            next_part_id = request.partId + 1
+        # Fallback response if all attempts failed
+        if evaluation_data is None:
+            evaluation_data = fallback_part_evaluation(part)
+
+        average_score, can_proceed, next_part_id = await record_part_evaluation(session, request.partId, evaluation_data, processed_responses)
+        if evaluation_data.get("fallback"):
+            run_in_background(rescoring_queue.enqueue(request.sessionId, request.partId, "fallback evaluation"))
+        if len(session.get("completed_parts", [])) >= len(EVALUATION_PARTS):
+            # Last part stored: compute the final evaluation before the candidate asks for it
+            start_final_evaluation(request.sessionId)
 
         try:
             return PartEvaluationResponse(
@@ -659,33 +831,8 @@ Respond only with valid JSON.
             fallback_scores = {key: float(5.0) for key in part["rubrics"].keys()}
             fallback_average = 5.0
             
-            # Store fallback evaluation in database
-            try:
-                fallback_evaluation = {
-                    "session_id": request.sessionId,
-                    "part_id": request.partId,
-                    "scores": fallback_scores,
-                    "feedback": "Your submission has been received and evaluated. Some technical issues occurred during detailed analysis, but your responses show engagement with the problem-solving process. You may continue to the next part.",
-                    "can_proceed": True,
-                    "average_score": fallback_average,
-                    "transcription": evaluation_data.get("transcription", None) if 'evaluation_data' in locals() else None
-                }
-                supabase.table("part_evaluations").insert(fallback_evaluation).execute()
-                
-                # Update session completed_parts
-                session = get_session_from_db(request.sessionId)
-                completed_parts = session.get("completed_parts", [])
-                if request.partId not in completed_parts:
-                    completed_parts.append(request.partId)
-                
-                from datetime import timezone
-                supabase.table("sessions").update({
-                    "completed_parts": completed_parts,
-                    "last_activity": datetime.now(timezone.utc).isoformat()
-                }).eq("session_id", request.sessionId).execute()
-                
-            except Exception as db_error:
-                logger.error(f"Database fallback error: {db_error}")
+            # Building the response failed after record_part_evaluation returned, so the
+            # evaluation and the completed part are stored; only the response needs replacing
             
             fallback_next_part_id = request.partId + 1 if request.partId < len(EVALUATION_PARTS) else None
             
@@ -703,52 +850,372 @@ Respond only with valid JSON.
         raise
     except Exception as e:
         logger.error(f"Error in submit_part: {e}")
-        
-        # Emergency fallback: ensure part is marked as completed even in error scenarios
-        # This prevents the final evaluation from failing due to missing parts
+        # Nothing is marked completed unless submit_part_evaluation stored the
+        # evaluation, so the candidate can resubmit the part
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+# Streaming variant of part submission for text parts
+@app.post("/api/submit-part/stream")
+async def submit_part_stream(request: PartSubmissionRequest):
+    """Submit a text part and stream evaluation scores and feedback as server-sent events.
+
+    Emits a "score" event per rubric as soon as it is parsed, "feedback" events with
+    text deltas as they arrive, and a final "result" event carrying the same payload
+    as /api/submit-part once the evaluation has been stored. If the streamed
+    evaluation can't be used (the stream failed, ran out of the submit_part time
+    budget or didn't validate), it is redone without streaming in what is left of
+    the budget, or replaced by fallback scores; a "final" event with the scores
+    and feedback that are stored then replaces whatever was streamed.
+    """
+    if not model_name:
+        raise HTTPException(status_code=500, detail="AI model not configured")
+    
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Database not configured")
+
+    session = await get_session_from_db(request.sessionId)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    
+    part = next((p for p in EVALUATION_PARTS if p["id"] == request.partId), None)
+    if not part:
+        raise HTTPException(status_code=400, detail="Invalid part ID")
+    if part["id"] == 5:
+        raise HTTPException(status_code=400, detail="Audio parts must be submitted to /api/submit-part")
+
+    if request.partId in (session.get("completed_parts") or []):
+        raise HTTPException(status_code=400, detail="Part already completed")
+
+    processed_responses = process_text_responses(part, request.responses)
+    prompt_case_study, context_handle = case_study_context(session)
+    evaluation_prompt = build_part_evaluation_prompt(part, prompt_case_study, processed_responses)
+
+    cache_key = make_cache_key(session["case_study"], processed_responses, part["rubrics"], PART_EVALUATION_PROMPT_VERSION)
+
+    async def event_stream():
+        # Identical submissions are answered from the cache without calling the model
+        evaluation_data = await evaluation_cache.get(cache_key)
+        if evaluation_data:
+            for rubric_key, score in evaluation_data["scores"].items():
+                yield sse_event("score", {"rubric": rubric_key, "score": score})
+            yield sse_event("feedback", {"delta": evaluation_data["feedback"]})
+        else:
+            # The stream and a non-streaming retry share the submit_part time budget
+            started = time.monotonic()
+            parser = IncrementalEvaluationParser(part["rubrics"].keys())
+            contents, config = context_cache.apply(context_handle, [evaluation_prompt], json_config(PART_EVALUATION_SCHEMAS[part["id"]]))
+            try:
+                stream = generate_content_stream(contents, config)
+                async for chunk in iterate_with_budget("submit_part_stream", stream, started, policy_for("submit_part")):
+                    if not chunk.text:
+                        continue
+                    for event, data in parser.feed(chunk.text):
+                        yield sse_event(event, data)
+                evaluation_data = parse_part_evaluation(parser.text, part)
+            except (json.JSONDecodeError, ValueError) as e:
+                metrics.increment("llm_parse_failures", "submit_part_stream")
+                logger.warning(f"Streamed evaluation for part {request.partId} could not be parsed: {e}")
+            except Exception as e:
+                logger.warning(f"Streaming evaluation for part {request.partId} failed: {e}")
+
+            if evaluation_data is None:
+                async def attempt():
+                    response = await generate_content(contents, config)
+                    return parse_part_evaluation(response.text, part)
+
+                try:
+                    evaluation_data = await call_with_retry("submit_part", attempt, started=started)
+                except Exception as e:
+                    # Breaker open, budget exhausted or retries used up: answer now, re-score later
+                    logger.warning(f"Model evaluation unavailable for part {request.partId}, using fallback: {e}")
+                    evaluation_data = fallback_part_evaluation(part)
+                # Replaces the scores and feedback streamed so far
+                yield sse_event("final", {
+                    "scores": evaluation_data["scores"],
+                    "feedback": evaluation_data["feedback"],
+                    "fallback": bool(evaluation_data.get("fallback"))
+                })
+            if not evaluation_data.get("fallback"):
+                await evaluation_cache.set(cache_key, evaluation_data)
+
         try:
-            session = get_session_from_db(request.sessionId)
-            if session:
-                completed_parts = session.get("completed_parts", [])
-                if request.partId not in completed_parts:
-                    completed_parts.append(request.partId)
-                    from datetime import timezone
-                    supabase.table("sessions").update({
-                        "completed_parts": completed_parts,
-                        "last_activity": datetime.now(timezone.utc).isoformat()
-                    }).eq("session_id", request.sessionId).execute()
-                    logger.warning(f"Emergency completion marking for part {request.partId} due to error: {e}")
-        except Exception as emergency_error:
-            logger.error(f"Emergency fallback failed: {emergency_error}")
-        
+            average_score, can_proceed, next_part_id = await record_part_evaluation(session, request.partId, evaluation_data, processed_responses)
+        except HTTPException as e:
+            yield sse_event("error", {"detail": e.detail})
+            return
+        except Exception as e:
+            logger.error(f"Error storing streamed evaluation: {e}")
+            yield sse_event("error", {"detail": "Failed to store evaluation"})
+            return
+        if evaluation_data.get("fallback"):
+            run_in_background(rescoring_queue.enqueue(request.sessionId, request.partId, "fallback evaluation"))
+        if len(session.get("completed_parts", [])) >= len(EVALUATION_PARTS):
+            start_final_evaluation(request.sessionId)
+
+        result = PartEvaluationResponse(
+            partId=request.partId,
+            scores=evaluation_data["scores"],
+            feedback=evaluation_data["feedback"],
+            canProceed=can_proceed,
+            averageScore=average_score,
+            nextPartId=next_part_id
+        )
+        yield sse_event("result", result.model_dump())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Streaming audio upload for Part 5
+@app.post("/api/submit-part/audio", response_model=PartEvaluationResponse)
+async def submit_audio_part(http_request: Request, sessionId: str):
+    """Submit the Part 5 recording as a raw request body instead of base64 JSON.
+
+    The body is spooled to disk as it arrives (size limit enforced while
+    streaming), copied to the object store, and the model gets a reference
+    to the uploaded file.
+    """
+    if not model_name:
+        raise HTTPException(status_code=500, detail="AI model not configured")
+    
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Database not configured")
+
+    if not object_store:
+        raise HTTPException(status_code=500, detail="Audio storage not configured")
+
+    session = await get_session_from_db(sessionId)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
+    if 5 in (session.get("completed_parts") or []):
+        raise HTTPException(status_code=400, detail="Part already completed")
+
+    # Reject declared oversize bodies before reading anything
+    content_length = http_request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > AUDIO_UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Audio upload exceeds {AUDIO_UPLOAD_MAX_BYTES} bytes")
+
+    try:
+        spooled = await spool_upload(http_request.stream(), audio_mime_type(http_request.headers.get("content-type")))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if spooled.size == 0:
+        remove_spooled(spooled.path)
+        raise HTTPException(status_code=400, detail="Audio recording is required for Part 5")
+
+    try:
+        return await evaluate_recording(session, spooled.path, spooled.mime_type, spooled.sha256)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in submit_audio_part: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        # The object store holds the recording now
+        remove_spooled(spooled.path)
+
+async def store_recording(session_id: str, audio_path: str, mime_type: str, sha256: Optional[str] = None,
+                          trim_leading_silence: bool = True) -> Tuple[NormalizedAudio, Dict]:
+    """Normalize a Part 5 recording and store it.
+
+    Returns the normalized file to send to the model, which the caller removes
+    once evaluated if it differs from `audio_path`, and the responses row to
+    pass to record_part_evaluation.
+    """
+    normalized = await audio_normalizer.normalize(audio_path, mime_type, trim_leading=trim_leading_silence)
+    if normalized.path != audio_path:
+        sha256 = None
+    stored = await store_audio_file(object_store, session_id, 5, normalized.path, normalized.mime_type, os.path.splitext(normalized.path)[1], sha256)
+    response_row = {
+        "question_id": "q5_verbal",
+        "response_text": "Audio recording submitted",
+        "audio_key": stored.key,
+        "audio_size": stored.size,
+        "audio_sha256": stored.sha256,
+        "audio_mime_type": normalized.mime_type
+    }
+    return normalized, response_row
+
+async def evaluate_recording(session, audio_path: str, mime_type: str, sha256: Optional[str] = None,
+                             prior_transcription: Optional[str] = None, transcribed_until_ms: int = 0) -> PartEvaluationResponse:
+    """Store a Part 5 recording, evaluate it and record the evaluation"""
+    session_id = session["session_id"]
+    # Early transcripts are timed on the original recording, so keep its start
+    normalized, response_row = await store_recording(session_id, audio_path, mime_type, sha256, trim_leading_silence=not prior_transcription)
+    tail_path = None
+    try:
+        model_path, model_mime_type = normalized.path, normalized.mime_type
+        if prior_transcription:
+            # Only the audio after the early-transcribed segments goes to the model
+            try:
+                tail_path = await audio_normalizer.cut(normalized.path, transcribed_until_ms)
+                model_path, model_mime_type = tail_path, CLIP_MIME_TYPE
+            except Exception as e:
+                logger.warning(f"Could not cut the untranscribed tail for session {session_id}, sending the whole recording: {e}")
+                prior_transcription, transcribed_until_ms = None, 0
+        prompt_case_study, context_handle = case_study_context(session)
+        evaluation_data = await evaluate_audio_response(
+            model_path, model_mime_type, prompt_case_study, context_handle, prior_transcription, transcribed_until_ms
+        )
+    finally:
+        if normalized.path != audio_path:
+            remove_spooled(normalized.path)
+        if tail_path:
+            remove_spooled(tail_path)
+
+    average_score, can_proceed, next_part_id = await record_part_evaluation(session, 5, evaluation_data, response_rows=[response_row])
+    if evaluation_data.get("fallback"):
+        run_in_background(rescoring_queue.enqueue(session_id, 5, "fallback evaluation"))
+    if len(session.get("completed_parts", [])) >= len(EVALUATION_PARTS):
+        start_final_evaluation(session_id)
+
+    return PartEvaluationResponse(
+        partId=5,
+        scores=evaluation_data["scores"],
+        feedback=evaluation_data["feedback"],
+        canProceed=can_proceed,
+        averageScore=average_score,
+        nextPartId=next_part_id,
+        transcription=evaluation_data.get("transcription", None)
+    )
+
+async def delete_uploaded_file(part):
+    """Delete a media file uploaded for one evaluation (the provider keeps it for 48 hours otherwise)"""
+    try:
+        await llm_gateway.delete_file(part)
+    except Exception as e:
+        logger.warning(f"Could not delete uploaded file {part.file_data.file_uri}: {e}")
+
+async def transcribe_audio_segment(audio_path: str, mime_type: str, start_ms: int, end_ms: int) -> str:
+    """Transcribe one time range of a recording (used while the candidate is still recording)"""
+    # Upload and transcription share the call site's time budget
+    started = time.monotonic()
+    clip_path = await audio_normalizer.cut(audio_path, start_ms, end_ms)
+    try:
+        audio_part = await call_with_retry(
+            "transcribe_audio_segment", lambda: llm_gateway.upload_file(clip_path, CLIP_MIME_TYPE), started=started
+        )
+    finally:
+        remove_spooled(clip_path)
+    prompt = "Transcribe verbatim what is said in this recording."
+
+    async def attempt():
+        response = await generate_content([prompt, audio_part], json_config(TRANSCRIPTION_SCHEMA))
+        return json.loads(extract_json_text(response.text))["transcription"]
+
+    try:
+        return await call_with_retry("transcribe_audio_segment", attempt, started=started)
+    finally:
+        run_in_background(delete_uploaded_file(audio_part))
+
+# Part 5 recordings being uploaded chunk by chunk, transcribed as they grow
+audio_ingest = AudioIngest(transcribe_audio_segment if audio_normalizer.can_cut else None)
+
+# Incremental recording upload: ordered chunks sent while the candidate records
+@app.post("/api/audio-chunks")
+async def upload_audio_chunk(http_request: Request, sessionId: str, recordingId: str, seq: int, elapsedMs: int):
+    """Append one recorder chunk to the session's recording; seq 0 of a new recordingId starts a new recording"""
+    if not model_name:
+        raise HTTPException(status_code=500, detail="AI model not configured")
+
+    if seq == 0:
+        if not supabase:
+            raise HTTPException(status_code=500, detail="Database not configured")
+        if not await get_session_from_db(sessionId):
+            raise HTTPException(status_code=404, detail="Session not found or expired")
+
+    try:
+        return await audio_ingest.append(
+            sessionId, recordingId, seq, http_request.stream(), audio_mime_type(http_request.headers.get("content-type")), elapsedMs
+        )
+    except ChunkOrderError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except IngestCapacityError as e:
+        # The client uploads the whole recording on submit instead
+        raise HTTPException(status_code=503, detail=str(e))
+
+# Submit the recording assembled from chunks
+@app.post("/api/submit-part/audio/complete", response_model=PartEvaluationResponse)
+async def complete_audio_part(sessionId: str):
+    """Finish a chunked recording and evaluate it, transcribing only what wasn't transcribed during recording"""
+    if not model_name:
+        raise HTTPException(status_code=500, detail="AI model not configured")
+    
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Database not configured")
+
+    if not object_store:
+        raise HTTPException(status_code=500, detail="Audio storage not configured")
+
+    session = await get_session_from_db(sessionId)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
+    if 5 in (session.get("completed_parts") or []):
+        audio_ingest.discard(sessionId)
+        raise HTTPException(status_code=400, detail="Part already completed")
+
+    recording = await audio_ingest.finish(sessionId)
+    if not recording:
+        # Chunks went to another worker or never arrived; the client uploads the whole recording instead
+        raise HTTPException(status_code=404, detail="No recording in progress for this session")
+
+    try:
+        return await evaluate_recording(
+            session, recording["path"], recording["mime_type"],
+            prior_transcription=recording["prior_transcription"],
+            transcribed_until_ms=recording["transcribed_until_ms"]
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error in complete_audio_part: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    finally:
+        remove_spooled(recording["path"])
 
 # New function to evaluate audio responses
-async def evaluate_audio_response(audio_data: str, case_study: str):
-    """Evaluate audio response using Gemini AI with actual audio analysis"""
+async def evaluate_audio_response(audio_path: str, audio_mime: str, case_study: str, context_handle: Optional[str] = None,
+                                  prior_transcription: Optional[str] = None, transcribed_until_ms: int = 0):
+    """Evaluate audio response using Gemini AI with actual audio analysis.
+
+    The recording at `audio_path` is uploaded and passed to the model by
+    reference. With `prior_transcription` (the first `transcribed_until_ms` of
+    the recording, transcribed while recording) `audio_path` holds only the
+    rest of the recording.
+    """
+    audio_part = None
     try:
-        import base64
-        import tempfile
-        import os
-        
-        # Decode base64 audio data
-        audio_bytes = base64.b64decode(audio_data)
+        # Upload and evaluation share the call site's time budget
+        started = time.monotonic()
+        audio_part = await call_with_retry(
+            "evaluate_audio_response", lambda: llm_gateway.upload_file(audio_path, audio_mime), started=started
+        )
         
-        # Create temporary file for audio
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as temp_audio:
-            temp_audio.write(audio_bytes)
-            temp_audio_path = temp_audio.name
+        if prior_transcription:
+            resume_at = format_timestamp(transcribed_until_ms)
+            transcription_instruction = (
+                f"1. The recording up to {resume_at} has already been transcribed:\n\"{prior_transcription}\"\n"
+                f"   The attached audio is the rest of the recording, from {resume_at}. Transcribe it (it may be empty), "
+                "then evaluate the whole explanation from the earlier transcription and the attached audio"
+            )
+        else:
+            transcription_instruction = "1. First, provide a transcription of the audio"
         
-        try:
-            # Create comprehensive audio evaluation prompt
-            audio_prompt = f"""
+        # Create comprehensive audio evaluation prompt
+        audio_prompt = f"""
 You are evaluating a 2-minute verbal explanation from a candidate solving a manufacturing problem.
 
 ORIGINAL CASE STUDY:
 {case_study}
 
 INSTRUCTIONS:
-1. First, provide a transcription of the audio
+{transcription_instruction}
 2. Then evaluate the candidate's verbal explanation based on the criteria below
 
 EVALUATION CRITERIA (score 1-10 for each):
@@ -777,52 +1244,38 @@ Provide your evaluation in this exact JSON format:
 }}
 
 Respond only with valid JSON.
-            """
-            audio_part = genai.types.Part.from_bytes(
-                data=audio_bytes,
-                mime_type='audio/mp3',
-            )
-            # Generate content with audio
-            response = client.models.generate_content(
-                model=model_name,
-                contents=[audio_prompt, audio_part],
-                config = genai.types.GenerateContentConfig(
-                    thinking_config=genai.types.ThinkingConfig(thinking_budget=0)
-                )
-            )
-            
+        """
+        # Generate content with audio
+        async def attempt():
+            contents, config = context_cache.apply(context_handle, [audio_prompt, audio_part], json_config(AUDIO_EVALUATION_SCHEMA))
+            response = await generate_content(contents, config)
             
             # Parse response
-            text = response.text
-            cleaned_text = text.replace("```json", "").replace("```", "").strip()
-            start_idx = cleaned_text.find('{')
-            end_idx = cleaned_text.rfind('}') + 1
-            if start_idx != -1 and end_idx != 0:
-                cleaned_text = cleaned_text[start_idx:end_idx]
-            
-            evaluation_data = json.loads(cleaned_text)
+            evaluation_data = json.loads(extract_json_text(response.text))
             
             # Validate response structure
             required_keys = ["scores", "feedback"]
             if not all(key in evaluation_data for key in required_keys):
                 raise ValueError("Missing required keys in evaluation response")
+            return evaluation_data
+
+        evaluation_data = await call_with_retry("evaluate_audio_response", attempt, started=started)
+        
+        if prior_transcription:
+            evaluation_data["transcription"] = f"{prior_transcription} {evaluation_data.get('transcription', '')}".strip()
+        
+        # Log transcription for debugging
+        if "transcription" in evaluation_data:
+            logger.info(f"Audio transcription: {evaluation_data['transcription'][:200]}...")
+        
+        return {
+            "scores": evaluation_data["scores"],
+            "feedback": evaluation_data["feedback"],
+            "transcription": evaluation_data.get("transcription", "Transcription not available")
+        }
             
-            # Log transcription for debugging
-            if "transcription" in evaluation_data:
-                logger.info(f"Audio transcription: {evaluation_data['transcription'][:200]}...")
-            
-            return {
-                "scores": evaluation_data["scores"],
-                "feedback": evaluation_data["feedback"],
-                "transcription": evaluation_data.get("transcription", "Transcription not available")
-            }
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_audio_path):
-                os.unlink(temp_audio_path)
-                
     except Exception as e:
+        metrics.increment("llm_failures", "evaluate_audio_response")
         logger.error(f"Error in audio evaluation: {e}")
         # Enhanced fallback with more realistic scores
         return {
@@ -833,8 +1286,12 @@ Respond only with valid JSON.
                 "depth_of_understanding": 2
             },
             "feedback": "Thank you for completing the verbal explanation. Your audio submission has been received and evaluated. The recording demonstrates your engagement with the problem-solving process. To improve future presentations, focus on clearly articulating your analytical approach, connecting insights across different parts of your analysis, and speaking with confidence about your manufacturing knowledge.",
-            "transcription": "Audio processing unavailable - technical evaluation used"
+            "transcription": "Audio processing unavailable - technical evaluation used",
+            "fallback": True
         }
+    finally:
+        if audio_part is not None:
+            run_in_background(delete_uploaded_file(audio_part))
 
 def map_weaknesses_to_tools(overall_scores, part_evaluations):
     """Map student weaknesses to specific quality management tools from promptforcasestudy.md"""
@@ -1020,7 +1477,7 @@ async def get_session_status(session_id: str):
     if not supabase:
         raise HTTPException(status_code=500, detail="Database not configured")
     
-    session = get_session_from_db(session_id)
+    session = await get_session_from_db(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -1042,13 +1499,13 @@ async def debug_session_status(session_id: str):
     if not supabase:
         raise HTTPException(status_code=500, detail="Database not configured")
     
-    session = get_session_from_db(session_id)
+    session = await get_session_from_db(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
     # Get responses and evaluations from database
-    responses = supabase.table("responses").select("part_id, question_id").eq("session_id", session_id).execute()
-    evaluations = supabase.table("part_evaluations").select("part_id").eq("session_id", session_id).execute()
+    responses = await execute(supabase.table("responses").select("part_id, question_id").eq("session_id", session_id))
+    evaluations = await execute(supabase.table("part_evaluations").select("part_id").eq("session_id", session_id))
     
     completed_parts = session.get("completed_parts", [])
     
@@ -1069,10 +1526,238 @@ async def debug_session_status(session_id: str):
         "sessionKeys": list(session.keys())
     }
 
+# Metrics endpoint for in-process counters (LLM attempts, retries, ...)
+@app.get("/api/metrics")
+async def get_metrics():
+    """Get in-process counters and timing summaries for this worker"""
+    return {**metrics.snapshot(), "circuitBreakers": {"llm": llm_gateway.breaker.status()}, "sessionCache": session_cache.stats()}
+
+# In-flight background final evaluations in this worker, by session
+final_evaluation_tasks: Dict[str, asyncio.Task] = {}
+
+# How often to check for a final evaluation that another worker is computing
+FINAL_EVALUATION_POLL_SECONDS = float(os.getenv("FINAL_EVALUATION_POLL_SECONDS", "0.5"))
+
+# How long a worker's claim on a final evaluation lasts unless renewed
+FINAL_EVALUATION_LEASE_SECONDS = float(os.getenv("FINAL_EVALUATION_LEASE_SECONDS", "30"))
+
+async def set_final_evaluation_status(session_id: str, status: str):
+    """Record the final evaluation status on the session row and release its lease"""
+    try:
+        await update_session(session_id, {
+            "final_evaluation_status": status,
+            "final_evaluation_updated_at": datetime.now(timezone.utc).isoformat(),
+            "final_evaluation_holder": None,
+            "final_evaluation_lease_expires_at": None
+        })
+    except Exception as e:
+        logger.error(f"Error updating final evaluation status for session {session_id}: {e}")
+
+async def claim_final_evaluation(session_id: str, holder: str, renew: bool = False) -> str:
+    """Take or renew the lease on the session's final evaluation: claimed, running or not_found"""
+    try:
+        result = await execute(supabase.rpc("claim_final_evaluation", {
+            "p_session_id": session_id,
+            "p_holder": holder,
+            "p_lease_seconds": FINAL_EVALUATION_LEASE_SECONDS,
+            "p_renew": renew
+        }))
+    except Exception as e:
+        # Computing twice is better than not at all, so carry on as if claimed
+        logger.error(f"Error claiming final evaluation for session {session_id}: {e}")
+        return "claimed"
+    if result.data == "claimed":
+        session_cache.update(session_id, {
+            "final_evaluation_status": "running",
+            "final_evaluation_holder": holder,
+            "final_evaluation_lease_expires_at": (datetime.now(timezone.utc) + timedelta(seconds=FINAL_EVALUATION_LEASE_SECONDS)).isoformat()
+        })
+    return result.data
+
+async def renew_final_evaluation_lease(session_id: str, holder: str):
+    """Renew the lease every third of its length until cancelled or lost"""
+    while True:
+        await asyncio.sleep(FINAL_EVALUATION_LEASE_SECONDS / 3)
+        if await claim_final_evaluation(session_id, holder, renew=True) != "claimed":
+            metrics.increment("final_evaluation", "lease_lost")
+            logger.warning(f"Lost the final evaluation lease for session {session_id}")
+            return
+
+async def run_final_evaluation(session_id: str):
+    """Compute and store the final evaluation under a lease, or wait for the worker holding it"""
+    holder = uuid.uuid4().hex
+    while True:
+        claim = await claim_final_evaluation(session_id, holder)
+        if claim == "claimed":
+            break
+        if claim == "not_found":
+            raise HTTPException(status_code=404, detail="Session not found or expired")
+        # Another worker holds a live lease; take over only if it lapses without a result
+        metrics.increment("final_evaluation", "waited")
+        session = await get_session_from_db(session_id, use_cache=False)
+        stored = await wait_for_stored_final_evaluation(session) if session else None
+        if stored:
+            return stored
+
+    heartbeat = asyncio.create_task(renew_final_evaluation_lease(session_id, holder))
+    try:
+        final_evaluation, used_fallback = await compute_final_evaluation(session_id)
+    except Exception:
+        heartbeat.cancel()
+        await set_final_evaluation_status(session_id, "failed")
+        raise
+    finally:
+        # Also stops the heartbeat if this task is cancelled
+        heartbeat.cancel()
+    await set_final_evaluation_status(session_id, "complete")
+    if used_fallback:
+        run_in_background(rescoring_queue.enqueue(session_id, FINAL_EVALUATION_PART_ID, "fallback final evaluation"))
+    return final_evaluation
+
+def finish_final_evaluation(session_id: str, task: asyncio.Task):
+    """Forget a finished final evaluation task, logging its error if nobody awaited it"""
+    final_evaluation_tasks.pop(session_id, None)
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None and not (isinstance(error, HTTPException) and error.status_code == 404):
+        logger.error(f"Final evaluation failed for session {session_id}: {error!r}")
+
+def start_final_evaluation(session_id: str) -> asyncio.Task:
+    """Start computing the final evaluation in the background unless it is already running"""
+    task = final_evaluation_tasks.get(session_id)
+    if task and not task.done():
+        return task
+    metrics.increment("final_evaluation", "started")
+    task = run_in_background(run_final_evaluation(session_id))
+    final_evaluation_tasks[session_id] = task
+    task.add_done_callback(lambda done: finish_final_evaluation(session_id, done))
+    return task
+
+async def load_final_evaluation(session) -> Optional[FinalEvaluationResponse]:
+    """Build the final evaluation response from the stored final_evaluations row, if there is one"""
+    session_id = session["session_id"]
+    final_result = await execute(supabase.table("final_evaluations").select("*").eq("session_id", session_id))
+    if not final_result.data:
+        return None
+    record = final_result.data[0]
+
+    evaluations_result = await execute(supabase.table("part_evaluations").select("part_id, scores, average_score, feedback").eq("session_id", session_id))
+    evaluations_by_part = {e["part_id"]: e for e in (evaluations_result.data or [])}
+    part_scores = []
+    for part in EVALUATION_PARTS:
+        evaluation = evaluations_by_part.get(part["id"], {})
+        scores = evaluation.get("scores") or {}
+        part_scores.append({
+            "partId": part["id"],
+            "title": part["title"],
+            "scores": scores,
+            "averageScore": evaluation.get("average_score", calculate_average_score(scores)),
+            "feedback": evaluation.get("feedback", "")
+        })
+
+    return FinalEvaluationResponse(
+        overallScores=record["overall_scores"],
+        partScores=part_scores,
+        detailedFeedback=record["detailed_feedback"],
+        overallPerformance=record["overall_performance"],
+        totalQuestions=session.get("total_questions", 13),
+        averageScore=record["average_score"],
+        completionTime=record["completion_time"],
+        toolRecommendations=record["tool_recommendations"] or {}
+    )
+
+def running_in_other_worker(session) -> bool:
+    """Whether the session row says a worker holds a live lease on its final evaluation"""
+    if session.get("final_evaluation_status") != "running" or not session.get("final_evaluation_lease_expires_at"):
+        return False
+    try:
+        expires_at = datetime.fromisoformat(str(session["final_evaluation_lease_expires_at"]).replace('Z', '+00:00'))
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+    except ValueError:
+        return False
+    # A lapsed lease means the holder stopped renewing it, so the result is recomputed here
+    return datetime.now(timezone.utc) < expires_at
+
+async def wait_for_stored_final_evaluation(session) -> Optional[FinalEvaluationResponse]:
+    """Poll for the row of a final evaluation another worker is computing"""
+    session_id = session["session_id"]
+    while running_in_other_worker(session):
+        await asyncio.sleep(FINAL_EVALUATION_POLL_SECONDS)
+        stored = await load_final_evaluation(session)
+        if stored:
+            return stored
+        session = await get_session_from_db(session_id, use_cache=False) or {}
+    return None
+
+# Final evaluation status endpoint for polling clients
+@app.get("/api/final-evaluation/{session_id}/status", response_model=FinalEvaluationStatusResponse)
+async def get_final_evaluation_status(session_id: str):
+    """Get whether the final evaluation is pending, running, complete or failed"""
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Database not configured")
+    
+    # Another worker may have moved the status on, so only trust the cache while it runs here
+    session = await get_session_from_db(session_id, use_cache=session_id in final_evaluation_tasks)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    if session_id in final_evaluation_tasks:
+        status = "running"
+    else:
+        status = session.get("final_evaluation_status") or "pending"
+    return FinalEvaluationStatusResponse(sessionId=session_id, status=status)
+
+# Final evaluation prompt size report
+@app.get("/api/final-evaluation/{session_id}/tokens")
+async def get_final_evaluation_tokens(session_id: str):
+    """Get the estimated token counts of the session's final evaluation prompt"""
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Database not configured")
+    
+    session = await get_session_from_db(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if not session.get("final_prompt_tokens"):
+        raise HTTPException(status_code=404, detail="Final evaluation not computed yet")
+    return {"sessionId": session_id, **session["final_prompt_tokens"]}
+
 # Enhanced final evaluation endpoint
 @app.get("/api/final-evaluation/{session_id}", response_model=FinalEvaluationResponse)
 async def get_final_evaluation(session_id: str):
-    """Get comprehensive evaluation across all completed parts"""
+    """Get comprehensive evaluation across all completed parts.
+
+    Usually returns the evaluation precomputed after the last part was submitted.
+    Concurrent requests for a session share one in-flight computation, and across
+    workers the one holding the session's lease computes it while the rest wait.
+    """
+    if not supabase:
+        raise HTTPException(status_code=500, detail="Database not configured")
+
+    task = final_evaluation_tasks.get(session_id)
+    session = await get_session_from_db(session_id, use_cache=task is not None)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
+    if task is not None:
+        metrics.increment("final_evaluation", "coalesced")
+    else:
+        try:
+            stored = await load_final_evaluation(session)
+        except Exception as e:
+            logger.error(f"Error loading stored final evaluation for session {session_id}: {e}")
+            stored = None
+        if stored:
+            metrics.increment("final_evaluation", "stored")
+            return stored
+        task = start_final_evaluation(session_id)
+
+    # Shield so a client disconnect doesn't cancel the shared computation
+    return await asyncio.shield(task)
+
+async def compute_final_evaluation(session_id: str):
+    """Build and store the final evaluation, returning it and whether fallback scores were used"""
     try:
         if not model_name:
             raise HTTPException(status_code=500, detail="AI model not configured")
@@ -1080,13 +1765,13 @@ async def get_final_evaluation(session_id: str):
         if not supabase:
             raise HTTPException(status_code=500, detail="Database not configured")
 
-        session = get_session_from_db(session_id)
+        session = await get_session_from_db(session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found or expired")
         
         # Get all responses and evaluations from database
-        responses_result = supabase.table("responses").select("*").eq("session_id", session_id).execute()
-        evaluations_result = supabase.table("part_evaluations").select("*").eq("session_id", session_id).execute()
+        responses_result = await execute(supabase.table("responses").select("part_id, question_id, response_text").eq("session_id", session_id))
+        evaluations_result = await execute(supabase.table("part_evaluations").select("*").eq("session_id", session_id))
         
         responses_data = responses_result.data if responses_result.data else []
         evaluations_data = evaluations_result.data if evaluations_result.data else []
@@ -1139,10 +1824,10 @@ async def get_final_evaluation(session_id: str):
                     evaluations_data.append(placeholder_evaluation)
                 
                 # Update completed parts in database
-                supabase.table("sessions").update({
+                await update_session(session_id, {
                     "completed_parts": list(range(1, total_parts + 1)),
                     "is_complete": True
-                }).eq("session_id", session_id).execute()
+                })
                 
                 logger.info(f"Successfully created placeholder data for session {session_id}")
 
@@ -1200,6 +1885,22 @@ async def get_final_evaluation(session_id: str):
             })
 
         overall_average = round(total_score / total_criteria, 1) if total_criteria > 0 else 0
+        prompt_case_study, context_handle = case_study_context(session)
+        if not context_handle:
+            prompt_case_study = truncate_to_tokens(prompt_case_study, FINAL_PROMPT_TOKEN_BUDGET // 2)
+            if prompt_case_study != session["case_study"]:
+                metrics.increment("final_prompt_truncated", "case_study")
+                logger.warning(
+                    f"Case study for session {session_id} cut from {estimate_tokens(session['case_study'])} "
+                    f"to {estimate_tokens(prompt_case_study)} estimated tokens for the final evaluation prompt"
+                )
+
+        # Running summaries written by submit_part; rebuilt for placeholder or older parts
+        stored_summaries = session.get("part_summaries") or {}
+        part_summaries = [
+            stored_summaries.get(str(part["id"])) or summarize_part(part, responses_by_part.get(part["id"]), evaluations_by_part.get(part["id"], {}))
+            for part in EVALUATION_PARTS
+        ]
 
         # Enhanced comprehensive evaluation prompt including verbal component
         prompt = f"""
@@ -1211,13 +1912,10 @@ EVALUATION SUMMARY:
 - All Parts Completed Successfully (including 2-minute verbal explanation)
 
 ORIGINAL CASE STUDY:
-{session["case_study"]}
-
-COMPLETE STUDENT RESPONSES:
-{all_responses}
+{prompt_case_study}
 
-DETAILED PART EVALUATIONS:
-{json.dumps(all_evaluations, indent=2)}
+PART SUMMARIES (scores, condensed answers and evaluator feedback):
+{{part_summaries}}
 
 COMPREHENSIVE FINAL EVALUATION REQUIRED:
 
@@ -1260,59 +1958,50 @@ Format as JSON:
 Respond only with valid JSON.
         """
 
+        # Fill the part summaries into whatever is left of the token budget
+        summary_budget = FINAL_PROMPT_TOKEN_BUDGET - estimate_tokens(prompt)
+        summary_block = fit_summaries(part_summaries, summary_budget)
+        if summary_block != "\n\n".join(part_summaries):
+            metrics.increment("final_prompt_truncated", "part_summaries")
+            logger.warning(f"Part summaries for session {session_id} clipped to fit {summary_budget} estimated tokens")
+        baseline_tokens = (
+            estimate_tokens(prompt) - estimate_tokens(prompt_case_study) + estimate_tokens(session["case_study"])
+            + estimate_tokens(all_responses) + estimate_tokens(json.dumps(all_evaluations, indent=2))
+        )
+        prompt = prompt.replace("{part_summaries}", summary_block)
+        report = token_report(prompt, summary_block, baseline_tokens, context_handle is not None)
+        metrics.observe("final_prompt_tokens", report["promptTokens"], "prompt")
+        metrics.observe("final_prompt_tokens", report["baselinePromptTokens"], "baseline")
+        try:
+            await update_session(session_id, {"final_prompt_tokens": report})
+        except Exception as e:
+            logger.warning(f"Could not store token report for session {session_id}: {e}")
+
         # Generate final evaluation with retry logic
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = client.models.generate_content(
-                    model=model_name,
-                    contents=[prompt],
-                    config = genai.types.GenerateContentConfig(
-                        thinking_config=genai.types.ThinkingConfig(thinking_budget=0)
-                    )
-                )
-                text = response.text
-
-                # Clean and parse JSON
-                cleaned_text = text.replace("```json", "").replace("```", "").strip()
-                start_idx = cleaned_text.find('{')
-                end_idx = cleaned_text.rfind('}') + 1
-                if start_idx != -1 and end_idx != 0:
-                    cleaned_text = cleaned_text[start_idx:end_idx]
-                
-                final_data = json.loads(cleaned_text)
-                
-                # Validate structure and convert scores to floats
-                required_keys = ["overallScores", "detailedFeedback", "overallPerformance"]
-                if not all(key in final_data for key in required_keys):
-                    raise ValueError("Missing required keys in final evaluation")
-                
-                # Ensure all scores are floats for consistency
-                if "overallScores" in final_data:
-                    for key, score in final_data["overallScores"].items():
-                        if isinstance(score, (int, float)):
-                            final_data["overallScores"][key] = float(score)
-                
-                break
-                
-            except (json.JSONDecodeError, ValueError) as e:
-                if attempt < max_retries - 1:
-                    logger.warning(f"Final evaluation attempt {attempt + 1} failed: {e}")
-                    continue
-                else:
-                    # Fallback response
-                    fallback_scores = {
-                        "analytical_thinking": float(min(8.0, max(5.0, overall_average))),
-                        "problem_solving": float(min(8.0, max(5.0, overall_average))),
-                        "systematic_approach": float(min(7.0, max(5.0, overall_average - 0.5))),
-                        "practical_application": float(min(8.0, max(5.0, overall_average))),
-                        "communication_skills": float(min(7.0, max(5.0, overall_average)))
-                    }
-                    final_data = {
-                        "overallScores": fallback_scores,
-                        "detailedFeedback": f"You completed all parts of the evaluation including the verbal explanation with an overall average of {overall_average}/10, demonstrating solid problem-solving and communication capabilities. Your systematic approach to manufacturing challenges shows good foundational skills. The verbal explanation component added valuable insight into your thought process. Continue developing your analytical depth and practical application of problem-solving frameworks in real manufacturing environments.",
-                        "overallPerformance": "Good" if overall_average >= 6.5 else "Satisfactory"
-                    }
+        async def attempt():
+            contents, config = context_cache.apply(context_handle, [prompt], json_config(FINAL_EVALUATION_SCHEMA))
+            response = await generate_content(contents, config)
+            return parse_final_evaluation(response.text)
+
+        used_fallback = False
+        try:
+            final_data = await call_with_retry("get_final_evaluation", attempt)
+        except Exception as e:
+            used_fallback = True
+            logger.warning(f"Using fallback final evaluation for session {session_id}: {e}")
+            # Fallback response
+            fallback_scores = {
+                "analytical_thinking": float(min(8.0, max(5.0, overall_average))),
+                "problem_solving": float(min(8.0, max(5.0, overall_average))),
+                "systematic_approach": float(min(7.0, max(5.0, overall_average - 0.5))),
+                "practical_application": float(min(8.0, max(5.0, overall_average))),
+                "communication_skills": float(min(7.0, max(5.0, overall_average)))
+            }
+            final_data = {
+                "overallScores": fallback_scores,
+                "detailedFeedback": f"You completed all parts of the evaluation including the verbal explanation with an overall average of {overall_average}/10, demonstrating solid problem-solving and communication capabilities. Your systematic approach to manufacturing challenges shows good foundational skills. The verbal explanation component added valuable insight into your thought process. Continue developing your analytical depth and practical application of problem-solving frameworks in real manufacturing environments.",
+                "overallPerformance": "Good" if overall_average >= 6.5 else "Satisfactory"
+            }
 
         # Calculate completion time
         try:
@@ -1322,7 +2011,6 @@ Respond only with valid JSON.
                 created_at = datetime.fromisoformat(created_at_str.replace('Z', '+00:00'))
                 if created_at.tzinfo is not None:
                     # If timezone-aware, use timezone-aware now()
-                    from datetime import timezone
                     completion_time = datetime.now(timezone.utc) - created_at
                 else:
                     # If timezone-naive, use timezone-naive now()
@@ -1350,14 +2038,9 @@ Respond only with valid JSON.
             "tool_recommendations": tool_recommendations
         }
         
-        # Check if final evaluation already exists
-        existing_final = supabase.table("final_evaluations").select("id").eq("session_id", session_id).execute()
-        if existing_final.data:
-            # Update existing record
-            supabase.table("final_evaluations").update(final_evaluation_record).eq("session_id", session_id).execute()
-        else:
-            # Insert new record
-            supabase.table("final_evaluations").insert(final_evaluation_record).execute()
+        # One row per session, so a recomputation replaces the earlier result
+        await execute(supabase.table("final_evaluations").upsert(final_evaluation_record, on_conflict="session_id"))
+        run_in_background(release_context_cache(session_id, session.get("context_cache_name")))
 
         # Create response with error handling
         try:
@@ -1370,9 +2053,10 @@ Respond only with valid JSON.
                 averageScore=overall_average,
                 completionTime=completion_str,
                 toolRecommendations=tool_recommendations
-            )
+            ), used_fallback
         except Exception as validation_error:
             logger.error(f"Validation error in final evaluation response: {validation_error}")
+            used_fallback = True
             # Fallback response with guaranteed valid data types
             fallback_scores = {
                 "analytical_thinking": float(min(8.0, max(5.0, overall_average))),
@@ -1392,14 +2076,76 @@ Respond only with valid JSON.
                 averageScore=float(overall_average),
                 completionTime=completion_str,
                 toolRecommendations=fallback_tool_recommendations
-            )
+            ), used_fallback
 
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error in get_final_evaluation: {e}")
+        logger.error(f"Error in compute_final_evaluation: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+async def rescore_queued_evaluation(item):
+    """Redo an evaluation from the re-scoring queue now that the model is available"""
+    session_id = item["session_id"]
+    part_id = item["part_id"]
+    session = await get_session_from_db(session_id)
+    if not session:
+        # Session expired, nothing left to re-score
+        return
+
+    if part_id == FINAL_EVALUATION_PART_ID:
+        _, used_fallback = await compute_final_evaluation(session_id)
+        if used_fallback:
+            raise RuntimeError("Final evaluation still used fallback scores")
+        return
+
+    part = EVALUATION_PARTS[part_id - 1]
+    responses = await execute(supabase.table("responses").select("question_id, response_text, audio_key, audio_mime_type").eq("session_id", session_id).eq("part_id", part_id))
+    prompt_case_study, context_handle = case_study_context(session)
+    processed_responses = None
+
+    if part_id == 5:
+        recording = next((r for r in (responses.data or []) if r.get("audio_key")), None)
+        if not recording or not object_store:
+            raise ValueError("No stored audio recording to re-score")
+        async with object_store.local_copy(recording["audio_key"]) as audio_path:
+            evaluation_data = await evaluate_audio_response(
+                audio_path, recording.get("audio_mime_type") or DEFAULT_AUDIO_MIME_TYPE, prompt_case_study, context_handle
+            )
+        if evaluation_data.get("fallback"):
+            raise RuntimeError("Audio evaluation still used fallback scores")
+    else:
+        processed_responses = {r["question_id"]: r["response_text"] for r in (responses.data or [])}
+        evaluation_prompt = build_part_evaluation_prompt(part, prompt_case_study, processed_responses)
+
+        async def attempt():
+            contents, config = context_cache.apply(context_handle, [evaluation_prompt], json_config(PART_EVALUATION_SCHEMAS[part_id]))
+            response = await generate_content(contents, config)
+            return parse_part_evaluation(response.text, part)
+
+        evaluation_data = await call_with_retry("submit_part", attempt)
+
+    await execute(supabase.table("part_evaluations").update({
+        "scores": evaluation_data["scores"],
+        "feedback": evaluation_data["feedback"],
+        "average_score": calculate_average_score(evaluation_data["scores"]),
+        "transcription": evaluation_data.get("transcription", None)
+    }).eq("session_id", session_id).eq("part_id", part_id))
+    # Merged in the database: the cached session may predate other parts' summaries
+    merged = await execute(supabase.rpc("merge_part_summary", {
+        "p_session_id": session_id,
+        "p_part_id": part_id,
+        "p_part_summary": summarize_part(part, processed_responses, evaluation_data)
+    }))
+    if merged.data is not None:
+        session_cache.update(session_id, {"part_summaries": merged.data})
+    logger.info(f"Re-scored session {session_id} part {part_id}")
+
+    # A stored final evaluation was built from the fallback scores
+    existing_final = await execute(supabase.table("final_evaluations").select("id").eq("session_id", session_id))
+    if existing_final.data:
+        await rescoring_queue.enqueue(session_id, FINAL_EVALUATION_PART_ID, f"part {part_id} re-scored")
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 4000))
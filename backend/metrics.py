@@ -0,0 +1,44 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+# In-process counters and timing summaries exposed through /api/metrics.
+# Values are per worker and reset on restart.
+
+_lock = threading.Lock()
+_counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+_summaries: Dict[str, Dict[str, Dict[str, float]]] = defaultdict(dict)
+
+def increment(name: str, label: str = "total", amount: int = 1):
+    """Increase the counter `name` for the given label"""
+    with _lock:
+        _counters[name][label] += amount
+
+def observe(name: str, value: float, label: str = "total"):
+    """Record a measurement (latency, bytes, ...) for the summary `name`"""
+    with _lock:
+        summary = _summaries[name].get(label)
+        if summary is None:
+            _summaries[name][label] = {"count": 1, "sum": value, "min": value, "max": value}
+        else:
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["min"] = min(summary["min"], value)
+            summary["max"] = max(summary["max"], value)
+
+def get_counter(name: str, label: str = "total") -> int:
+    with _lock:
+        return _counters[name][label] if name in _counters else 0
+
+def snapshot() -> Dict:
+    """Copy of all counters and summaries, with averages filled in"""
+    with _lock:
+        counters = {name: dict(labels) for name, labels in _counters.items()}
+        summaries = {
+            name: {
+                label: {**summary, "avg": round(summary["sum"] / summary["count"], 3)}
+                for label, summary in labels.items()
+            }
+            for name, labels in _summaries.items()
+        }
+    return {"counters": counters, "summaries": summaries}
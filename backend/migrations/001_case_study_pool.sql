@@ -0,0 +1,25 @@
+-- Pool of pre-generated case studies served by /api/generate-multipart-case
+create table if not exists case_study_pool (
+    id bigserial primary key,
+    case_study text not null,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists case_study_pool_created_at_idx on case_study_pool (created_at);
+
+-- Claim the oldest pooled case study in one statement. Concurrent callers skip
+-- rows another transaction has locked, so each gets a different row and none
+-- comes back empty while the pool still has rows.
+create or replace function pop_case_study()
+returns text
+language sql
+as $$
+    delete from case_study_pool
+    where id = (
+        select id from case_study_pool
+        order by created_at
+        limit 1
+        for update skip locked
+    )
+    returning case_study;
+$$;
@@ -0,0 +1,9 @@
+-- Content-addressed cache of text part evaluations used by /api/submit-part
+create table if not exists evaluation_cache (
+    cache_key text primary key,
+    scores jsonb not null,
+    feedback text not null,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists evaluation_cache_created_at_idx on evaluation_cache (created_at);
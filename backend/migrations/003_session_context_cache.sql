@@ -0,0 +1,4 @@
+-- Gemini context cache handle for the session's case study
+alter table sessions add column if not exists context_cache_name text;
+-- Unix timestamp (seconds) at which the cached context expires
+alter table sessions add column if not exists context_cache_expires_at double precision;
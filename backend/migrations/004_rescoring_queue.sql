@@ -0,0 +1,15 @@
+-- Evaluations answered with fallback scores while the model was unavailable.
+-- part_id 0 refers to the final evaluation.
+create table if not exists rescoring_queue (
+    id bigserial primary key,
+    session_id text not null,
+    part_id integer not null,
+    reason text,
+    status text not null default 'pending',
+    attempts integer not null default 0,
+    created_at timestamptz not null default now(),
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists rescoring_queue_status_created_at_idx on rescoring_queue (status, created_at);
+create index if not exists rescoring_queue_session_part_idx on rescoring_queue (session_id, part_id);
@@ -0,0 +1,45 @@
+-- Status of the eagerly computed final evaluation: running, complete or failed
+alter table sessions add column if not exists final_evaluation_status text;
+alter table sessions add column if not exists final_evaluation_updated_at timestamptz;
+
+-- The worker computing the final evaluation holds a lease it renews while it runs,
+-- so other workers wait for its result and take over only once the lease lapses
+alter table sessions add column if not exists final_evaluation_holder text;
+alter table sessions add column if not exists final_evaluation_lease_expires_at timestamptz;
+
+-- Take the lease on a session's final evaluation and mark it running, or with
+-- p_renew extend a lease p_holder still holds (so a late renewal can't reopen a
+-- finished evaluation). Returns 'claimed' if p_holder now holds it, 'running' if
+-- it can't take it, or 'not_found' if the session is gone.
+create or replace function claim_final_evaluation(
+    p_session_id sessions.session_id%type,
+    p_holder text,
+    p_lease_seconds double precision,
+    p_renew boolean default false
+) returns text
+language plpgsql
+as $$
+begin
+    update sessions
+    set final_evaluation_status = 'running',
+        final_evaluation_holder = p_holder,
+        final_evaluation_lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        final_evaluation_updated_at = now()
+    where session_id = p_session_id
+      and case when p_renew then
+              final_evaluation_status = 'running' and final_evaluation_holder = p_holder
+          else
+              final_evaluation_status is distinct from 'running'
+              or final_evaluation_holder = p_holder
+              or final_evaluation_lease_expires_at is null
+              or final_evaluation_lease_expires_at < now()
+          end;
+    if found then
+        return 'claimed';
+    end if;
+    if exists (select 1 from sessions where session_id = p_session_id) then
+        return 'running';
+    end if;
+    return 'not_found';
+end;
+$$;
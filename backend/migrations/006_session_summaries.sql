@@ -0,0 +1,5 @@
+-- Running per-part summaries used to build the final evaluation prompt
+alter table sessions add column if not exists part_summaries jsonb not null default '{}'::jsonb;
+
+-- Estimated token counts of the final evaluation prompt versus the full-transcript prompt
+alter table sessions add column if not exists final_prompt_tokens jsonb;
@@ -0,0 +1,3 @@
+-- Part 5 recordings uploaded through /api/submit-part/audio are streamed to disk
+-- instead of sent as base64 audio_data; the row records their format
+alter table responses add column if not exists audio_mime_type text;
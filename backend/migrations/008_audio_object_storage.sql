@@ -0,0 +1,4 @@
+-- Recordings live in the object store; rows keep only a reference to the blob
+alter table responses add column if not exists audio_key text;
+alter table responses add column if not exists audio_size bigint;
+alter table responses add column if not exists audio_sha256 text;
@@ -0,0 +1,65 @@
+-- Store a part submission in one round trip and one transaction: the responses,
+-- the evaluation, the completed_parts append and the part summary.
+--
+-- p_responses is an array of responses rows without session_id/part_id, e.g.
+--   [{"question_id": "q1_1", "response_text": "..."}]
+-- p_evaluation carries the part_evaluations columns (scores, feedback,
+-- can_proceed, average_score, transcription).
+--
+-- Returns {"status": "stored", "completed_parts": [...]}, or
+-- {"status": "conflict"} if the part was already evaluated (nothing is written), or
+-- {"status": "not_found"} if the session doesn't exist.
+create or replace function submit_part_evaluation(
+    p_session_id sessions.session_id%type,
+    p_part_id integer,
+    p_responses jsonb,
+    p_evaluation jsonb,
+    p_part_summary text default null
+) returns jsonb
+language plpgsql
+as $$
+declare
+    v_completed_parts sessions.completed_parts%type;
+begin
+    -- Serialize submissions for the same session so the duplicate check and the append can't race
+    perform 1 from sessions where session_id = p_session_id for update;
+    if not found then
+        return jsonb_build_object('status', 'not_found');
+    end if;
+
+    if exists (select 1 from part_evaluations where session_id = p_session_id and part_id = p_part_id) then
+        return jsonb_build_object('status', 'conflict');
+    end if;
+
+    insert into responses (session_id, part_id, question_id, response_text, audio_key, audio_size, audio_sha256, audio_mime_type)
+    select p_session_id, p_part_id, r.question_id, r.response_text, r.audio_key, r.audio_size, r.audio_sha256, r.audio_mime_type
+    from jsonb_to_recordset(coalesce(p_responses, '[]'::jsonb))
+        as r(question_id text, response_text text, audio_key text, audio_size bigint, audio_sha256 text, audio_mime_type text);
+
+    insert into part_evaluations (session_id, part_id, scores, feedback, can_proceed, average_score, transcription)
+    values (
+        p_session_id,
+        p_part_id,
+        p_evaluation -> 'scores',
+        p_evaluation ->> 'feedback',
+        (p_evaluation ->> 'can_proceed')::boolean,
+        (p_evaluation ->> 'average_score')::numeric,
+        p_evaluation ->> 'transcription'
+    );
+
+    update sessions set
+        completed_parts = case
+            when p_part_id = any(coalesce(completed_parts, '{}')) then completed_parts
+            else array_append(coalesce(completed_parts, '{}'), p_part_id)
+        end,
+        part_summaries = case
+            when p_part_summary is null then part_summaries
+            else coalesce(part_summaries, '{}'::jsonb) || jsonb_build_object(p_part_id::text, p_part_summary)
+        end,
+        last_activity = now()
+    where session_id = p_session_id
+    returning completed_parts into v_completed_parts;
+
+    return jsonb_build_object('status', 'stored', 'completed_parts', to_jsonb(v_completed_parts));
+end;
+$$;
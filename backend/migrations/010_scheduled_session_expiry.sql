@@ -0,0 +1,64 @@
+-- Leases that elect one worker to run each scheduled job
+create table if not exists scheduler_leases (
+    name text primary key,
+    holder text not null,
+    expires_at timestamptz not null
+);
+
+-- Take or renew the lease on a job. Returns true if p_holder now holds it,
+-- null if another holder's lease hasn't expired yet.
+create or replace function acquire_scheduler_lease(p_name text, p_holder text, p_ttl_seconds double precision)
+returns boolean
+language sql
+as $$
+    insert into scheduler_leases (name, holder, expires_at)
+    values (p_name, p_holder, now() + make_interval(secs => p_ttl_seconds))
+    on conflict (name) do update
+        set holder = excluded.holder, expires_at = excluded.expires_at
+        where scheduler_leases.holder = excluded.holder or scheduler_leases.expires_at < now()
+    returning true;
+$$;
+
+-- Expiry walks sessions oldest first
+create index if not exists sessions_created_at_idx on sessions (created_at);
+
+-- Delete up to p_batch_size sessions created before p_cutoff together with their
+-- responses, part evaluations, final evaluation and queued re-scoring. Returns the
+-- number of rows removed per table, the expired session ids and the object store
+-- keys of their recordings (which the caller deletes).
+create or replace function expire_sessions(p_cutoff timestamptz, p_batch_size integer)
+returns jsonb
+language sql
+as $$
+    with expired as (
+        select session_id from sessions
+        where created_at < p_cutoff
+        order by created_at
+        limit p_batch_size
+        for update skip locked
+    ),
+    deleted_responses as (
+        delete from responses where session_id in (select session_id from expired) returning audio_key
+    ),
+    deleted_part_evaluations as (
+        delete from part_evaluations where session_id in (select session_id from expired) returning 1
+    ),
+    deleted_final_evaluations as (
+        delete from final_evaluations where session_id in (select session_id from expired) returning 1
+    ),
+    deleted_rescoring as (
+        delete from rescoring_queue where session_id in (select session_id::text from expired) returning 1
+    ),
+    deleted_sessions as (
+        delete from sessions where session_id in (select session_id from expired) returning session_id
+    )
+    select jsonb_build_object(
+        'sessions', (select count(*) from deleted_sessions),
+        'responses', (select count(*) from deleted_responses),
+        'part_evaluations', (select count(*) from deleted_part_evaluations),
+        'final_evaluations', (select count(*) from deleted_final_evaluations),
+        'rescoring_queue', (select count(*) from deleted_rescoring),
+        'session_ids', (select coalesce(jsonb_agg(session_id), '[]'::jsonb) from deleted_sessions),
+        'audio_keys', (select coalesce(jsonb_agg(audio_key), '[]'::jsonb) from deleted_responses where audio_key is not null)
+    );
+$$;
@@ -0,0 +1,21 @@
+-- Index of archive batches: gzipped JSON Lines objects in the object store, one
+-- session (with its responses, part evaluations and final evaluation) per line
+create table if not exists session_archive_batches (
+    key text primary key,
+    session_count integer not null,
+    first_created_at timestamptz not null,
+    last_created_at timestamptz not null,
+    size_bytes bigint not null,
+    archived_at timestamptz not null default now()
+);
+
+create index if not exists session_archive_batches_created_idx on session_archive_batches (last_created_at, first_created_at);
+
+-- Which batch holds each archived session
+create table if not exists archived_sessions (
+    session_id text primary key,
+    batch_key text not null references session_archive_batches (key),
+    created_at timestamptz not null
+);
+
+create index if not exists archived_sessions_created_at_idx on archived_sessions (created_at);
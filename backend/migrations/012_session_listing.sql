@@ -0,0 +1,19 @@
+-- Dashboard sessions listing: one row per session with its final evaluation, so
+-- filters, sorting and keyset pagination all run in one query
+create or replace view session_listing as
+select
+    s.session_id,
+    s.created_at,
+    s.last_activity,
+    s.is_complete,
+    coalesce(cardinality(s.completed_parts), 0) as completed_parts_count,
+    f.overall_performance,
+    f.average_score
+from sessions s
+left join final_evaluations f on f.session_id = s.session_id;
+
+-- Keyset pagination orders by (sort column, session_id)
+create index if not exists sessions_created_at_session_id_idx on sessions (created_at, session_id);
+create index if not exists sessions_last_activity_session_id_idx on sessions (last_activity, session_id);
+create index if not exists final_evaluations_session_id_idx on final_evaluations (session_id);
+create index if not exists final_evaluations_performance_score_idx on final_evaluations (overall_performance, average_score);
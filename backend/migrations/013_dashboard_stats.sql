@@ -0,0 +1,43 @@
+-- Archived sessions keep the columns the dashboard aggregates, so overview stats
+-- never have to read archive batches (sessions archived before this migration
+-- count as incomplete and unscored)
+alter table archived_sessions
+    add column if not exists is_complete boolean not null default false,
+    add column if not exists overall_performance text,
+    add column if not exists average_score numeric;
+
+-- Dashboard overview counts, completion, mean score and performance distribution
+-- over live and archived sessions, computed in one aggregate query
+create or replace function dashboard_stats(p_recent_since timestamptz)
+returns jsonb
+language sql
+stable
+as $$
+    with all_sessions as (
+        select created_at, is_complete, overall_performance, average_score from session_listing
+        union all
+        select created_at, is_complete, overall_performance, average_score from archived_sessions
+    ),
+    totals as (
+        select
+            count(*) as total_sessions,
+            count(*) filter (where is_complete) as completed_sessions,
+            count(*) filter (where created_at > p_recent_since) as recent_sessions,
+            avg(average_score) filter (where average_score > 0) as average_score
+        from all_sessions
+    ),
+    performance as (
+        select overall_performance, count(*) as sessions
+        from all_sessions
+        where overall_performance is not null
+        group by overall_performance
+    )
+    select jsonb_build_object(
+        'total_sessions', totals.total_sessions,
+        'completed_sessions', totals.completed_sessions,
+        'recent_sessions', totals.recent_sessions,
+        'average_score', totals.average_score,
+        'performance_distribution', coalesce((select jsonb_object_agg(overall_performance, sessions) from performance), '{}'::jsonb)
+    )
+    from totals;
+$$;
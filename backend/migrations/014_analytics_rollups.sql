@@ -0,0 +1,199 @@
+-- Hourly analytics rollups, bucketed by the hour the session started. Triggers
+-- keep them current on every session, part evaluation and final evaluation
+-- write, so analytics read a few rows per hour instead of every evaluation.
+-- Rows later expired or archived stay counted.
+--
+-- metric / key:
+--   sessions, sessions_completed  ''
+--   part_score                    part id       (total = sum of average_score)
+--   final_score                   ''            (total = sum of average_score)
+--   score_range                   score band of the final average_score
+--   skill_score                   overall_scores key (total = sum of scores)
+--   tool_recommendation           tool name
+create table if not exists analytics_rollups (
+    metric text not null,
+    bucket timestamptz not null,
+    key text not null default '',
+    count bigint not null default 0,
+    total numeric not null default 0,
+    primary key (metric, bucket, key)
+);
+
+create or replace function bump_analytics_rollup(
+    p_created_at timestamptz,
+    p_metric text,
+    p_key text,
+    p_count integer,
+    p_total numeric default 0
+) returns void
+language sql
+as $$
+    insert into analytics_rollups (metric, bucket, key, count, total)
+    values (p_metric, date_trunc('hour', p_created_at, 'UTC'), coalesce(p_key, ''), p_count, coalesce(p_total, 0))
+    on conflict (metric, bucket, key) do update set
+        count = analytics_rollups.count + excluded.count,
+        total = analytics_rollups.total + excluded.total;
+$$;
+
+create or replace function score_range(p_score numeric) returns text
+language sql
+immutable
+as $$
+    select case
+        when coalesce(p_score, 0) < 3 then '0-3'
+        when p_score < 5 then '3-5'
+        when p_score < 7 then '5-7'
+        when p_score < 8.5 then '7-8.5'
+        else '8.5-10'
+    end;
+$$;
+
+-- Add (p_sign = 1) or remove (p_sign = -1) one final evaluation from the rollups
+create or replace function bump_final_evaluation_rollups(
+    p_created_at timestamptz,
+    p_average_score numeric,
+    p_overall_scores jsonb,
+    p_tool_recommendations jsonb,
+    p_sign integer
+) returns void
+language plpgsql
+as $$
+begin
+    perform bump_analytics_rollup(p_created_at, 'final_score', '', p_sign, p_sign * coalesce(p_average_score, 0));
+    perform bump_analytics_rollup(p_created_at, 'score_range', score_range(p_average_score), p_sign);
+
+    if jsonb_typeof(p_overall_scores) = 'object' then
+        perform bump_analytics_rollup(p_created_at, 'skill_score', skill.key, p_sign, p_sign * (skill.value #>> '{}')::numeric)
+        from jsonb_each(p_overall_scores) as skill
+        where jsonb_typeof(skill.value) = 'number';
+    end if;
+
+    if jsonb_typeof(p_tool_recommendations) = 'object' then
+        perform bump_analytics_rollup(p_created_at, 'tool_recommendation', tool, p_sign)
+        from jsonb_object_keys(p_tool_recommendations) as tool;
+    end if;
+end;
+$$;
+
+create or replace function sessions_rollup() returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'INSERT' then
+        perform bump_analytics_rollup(new.created_at, 'sessions', '', 1);
+        if coalesce(new.is_complete, false) then
+            perform bump_analytics_rollup(new.created_at, 'sessions_completed', '', 1);
+        end if;
+    elsif coalesce(new.is_complete, false) <> coalesce(old.is_complete, false) then
+        perform bump_analytics_rollup(new.created_at, 'sessions_completed', '', case when new.is_complete then 1 else -1 end);
+    end if;
+    return null;
+end;
+$$;
+
+create or replace function part_evaluations_rollup() returns trigger
+language plpgsql
+as $$
+declare
+    v_created_at timestamptz;
+begin
+    select created_at into v_created_at from sessions where session_id = new.session_id;
+    v_created_at := coalesce(v_created_at, now());
+
+    if tg_op = 'UPDATE' then
+        perform bump_analytics_rollup(v_created_at, 'part_score', old.part_id::text, -1, -coalesce(old.average_score, 0));
+    end if;
+    perform bump_analytics_rollup(v_created_at, 'part_score', new.part_id::text, 1, coalesce(new.average_score, 0));
+    return null;
+end;
+$$;
+
+create or replace function final_evaluations_rollup() returns trigger
+language plpgsql
+as $$
+declare
+    v_created_at timestamptz;
+begin
+    select created_at into v_created_at from sessions where session_id = new.session_id;
+    v_created_at := coalesce(v_created_at, now());
+
+    if tg_op = 'UPDATE' then
+        perform bump_final_evaluation_rollups(v_created_at, old.average_score, old.overall_scores::jsonb, old.tool_recommendations::jsonb, -1);
+    end if;
+    perform bump_final_evaluation_rollups(v_created_at, new.average_score, new.overall_scores::jsonb, new.tool_recommendations::jsonb, 1);
+    return null;
+end;
+$$;
+
+drop trigger if exists sessions_rollup on sessions;
+create trigger sessions_rollup
+    after insert or update of is_complete on sessions
+    for each row execute function sessions_rollup();
+
+drop trigger if exists part_evaluations_rollup on part_evaluations;
+create trigger part_evaluations_rollup
+    after insert or update of part_id, average_score on part_evaluations
+    for each row execute function part_evaluations_rollup();
+
+drop trigger if exists final_evaluations_rollup on final_evaluations;
+create trigger final_evaluations_rollup
+    after insert or update of average_score, overall_scores, tool_recommendations on final_evaluations
+    for each row execute function final_evaluations_rollup();
+
+-- When each one-off backfill ran, so later migrations can tell rows it counted
+-- from rows the triggers counted afterwards
+create table if not exists analytics_backfills (
+    name text primary key,
+    backfilled_at timestamptz not null default now()
+);
+
+-- Backfill once from the rows already stored. Archived sessions count towards the
+-- session totals; their evaluations live in archive batches and are not backfilled.
+do $$
+begin
+    if exists (select 1 from analytics_rollups) then
+        return;
+    end if;
+    insert into analytics_backfills (name) values ('analytics_rollups') on conflict (name) do nothing;
+
+    perform bump_analytics_rollup(s.created_at, 'sessions', '', 1)
+    from (select created_at from sessions union all select created_at from archived_sessions) s;
+
+    perform bump_analytics_rollup(s.created_at, 'sessions_completed', '', 1)
+    from (
+        select created_at from sessions where is_complete
+        union all
+        select created_at from archived_sessions where is_complete
+    ) s;
+
+    perform bump_analytics_rollup(s.created_at, 'part_score', p.part_id::text, 1, coalesce(p.average_score, 0))
+    from part_evaluations p
+    join sessions s on s.session_id = p.session_id;
+
+    perform bump_final_evaluation_rollups(s.created_at, f.average_score, f.overall_scores::jsonb, f.tool_recommendations::jsonb, 1)
+    from final_evaluations f
+    join sessions s on s.session_id = f.session_id;
+end;
+$$;
+
+-- Rollups summed per metric, key and bucket over [p_from, p_to) (either bound may
+-- be null). p_granularity is hour, day or week; null sums the whole range into
+-- one row per metric and key with a null bucket.
+create or replace function analytics_rollup_series(
+    p_metrics text[],
+    p_granularity text,
+    p_from timestamptz default null,
+    p_to timestamptz default null
+) returns table (metric text, bucket timestamptz, key text, count bigint, total numeric)
+language sql
+stable
+as $$
+    select r.metric, date_trunc(p_granularity, r.bucket, 'UTC') as series_bucket, r.key, sum(r.count)::bigint, sum(r.total)
+    from analytics_rollups r
+    where r.metric = any(p_metrics)
+        and (p_from is null or r.bucket >= p_from)
+        and (p_to is null or r.bucket < p_to)
+    group by r.metric, series_bucket, r.key
+    having sum(r.count) <> 0
+    order by series_bucket, r.metric, r.key;
+$$;
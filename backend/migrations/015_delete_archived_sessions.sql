@@ -0,0 +1,108 @@
+-- Every write to a session or to its responses, part evaluations or final
+-- evaluation bumps sessions.row_version, so the archive can tell whether a
+-- session changed after it was copied
+alter table sessions add column if not exists row_version bigint not null default 0;
+
+create or replace function bump_session_row_version() returns trigger
+language plpgsql
+as $$
+begin
+    if tg_table_name = 'sessions' then
+        if new.row_version = old.row_version then
+            new.row_version := old.row_version + 1;
+        end if;
+        return new;
+    end if;
+    update sessions set row_version = row_version + 1
+    where session_id = case when tg_op = 'DELETE' then old.session_id else new.session_id end;
+    return null;
+end;
+$$;
+
+drop trigger if exists sessions_row_version on sessions;
+create trigger sessions_row_version
+    before update on sessions
+    for each row execute function bump_session_row_version();
+
+drop trigger if exists responses_row_version on responses;
+create trigger responses_row_version
+    after insert or update or delete on responses
+    for each row execute function bump_session_row_version();
+
+drop trigger if exists part_evaluations_row_version on part_evaluations;
+create trigger part_evaluations_row_version
+    after insert or update or delete on part_evaluations
+    for each row execute function bump_session_row_version();
+
+drop trigger if exists final_evaluations_row_version on final_evaluations;
+create trigger final_evaluations_row_version
+    after insert or update or delete on final_evaluations
+    for each row execute function bump_session_row_version();
+
+-- Remove archived sessions from the hot tables in one transaction: each session
+-- with its responses, part evaluations, final evaluation and queued re-scoring.
+--
+-- p_sessions is the archived copy of each session, e.g.
+--   [{"session_id": "...", "row_version": 3}]
+-- A session is deleted only if archived_sessions indexes it and its row_version
+-- hasn't moved since it was read for the archive. A session that changed in between
+-- is left in place and un-indexed, so the next run archives it again.
+--
+-- Returns the number of rows removed per table and the deleted session ids.
+create or replace function delete_archived_sessions(p_sessions jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_entry record;
+    v_session_id sessions.session_id%type;
+    v_row_version sessions.row_version%type;
+    v_rows integer;
+    v_deleted jsonb := '[]'::jsonb;
+    v_responses integer := 0;
+    v_part_evaluations integer := 0;
+    v_final_evaluations integer := 0;
+    v_rescoring integer := 0;
+begin
+    for v_entry in
+        select x.session_id, x.row_version
+        from jsonb_to_recordset(coalesce(p_sessions, '[]'::jsonb)) as x(session_id text, row_version bigint)
+    loop
+        continue when not exists (select 1 from archived_sessions where session_id = v_entry.session_id);
+        v_session_id := v_entry.session_id;
+
+        -- Serializes with submit_part_evaluation, which locks the same row
+        select row_version into v_row_version from sessions where session_id = v_session_id for update;
+        continue when not found;
+        if v_row_version is distinct from v_entry.row_version then
+            delete from archived_sessions where session_id = v_entry.session_id;
+            continue;
+        end if;
+
+        delete from responses where session_id = v_session_id;
+        get diagnostics v_rows = row_count;
+        v_responses := v_responses + v_rows;
+        delete from part_evaluations where session_id = v_session_id;
+        get diagnostics v_rows = row_count;
+        v_part_evaluations := v_part_evaluations + v_rows;
+        delete from final_evaluations where session_id = v_session_id;
+        get diagnostics v_rows = row_count;
+        v_final_evaluations := v_final_evaluations + v_rows;
+        delete from rescoring_queue where session_id = v_entry.session_id;
+        get diagnostics v_rows = row_count;
+        v_rescoring := v_rescoring + v_rows;
+        delete from sessions where session_id = v_session_id;
+
+        v_deleted := v_deleted || to_jsonb(v_entry.session_id);
+    end loop;
+
+    return jsonb_build_object(
+        'sessions', jsonb_array_length(v_deleted),
+        'responses', v_responses,
+        'part_evaluations', v_part_evaluations,
+        'final_evaluations', v_final_evaluations,
+        'rescoring_queue', v_rescoring,
+        'session_ids', v_deleted
+    );
+end;
+$$;
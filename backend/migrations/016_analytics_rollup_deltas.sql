@@ -0,0 +1,80 @@
+-- Rollup triggers append deltas instead of upserting analytics_rollups. Before,
+-- every part submission updated the same (part_score, hour, part) row inside the
+-- submit_part_evaluation transaction, so concurrent submissions for sessions
+-- started in the same hour queued on that row lock until commit. Appends take
+-- no row locks; the analytics_rollups scheduler job folds them into
+-- analytics_rollups, and reads add the deltas not compacted yet.
+create table if not exists analytics_rollup_deltas (
+    id bigserial primary key,
+    metric text not null,
+    bucket timestamptz not null,
+    key text not null default '',
+    count bigint not null,
+    total numeric not null default 0
+);
+
+create or replace function bump_analytics_rollup(
+    p_created_at timestamptz,
+    p_metric text,
+    p_key text,
+    p_count integer,
+    p_total numeric default 0
+) returns void
+language sql
+as $$
+    insert into analytics_rollup_deltas (metric, bucket, key, count, total)
+    values (p_metric, date_trunc('hour', p_created_at, 'UTC'), coalesce(p_key, ''), p_count, coalesce(p_total, 0));
+$$;
+
+-- Fold up to p_limit of the oldest deltas into analytics_rollups, returning how
+-- many were folded. Concurrent runs skip each other's rows.
+create or replace function compact_analytics_rollups(p_limit integer)
+returns integer
+language sql
+as $$
+    with folded as (
+        delete from analytics_rollup_deltas
+        where id in (
+            select id from analytics_rollup_deltas
+            order by id
+            limit p_limit
+            for update skip locked
+        )
+        returning metric, bucket, key, count, total
+    ),
+    merged as (
+        insert into analytics_rollups (metric, bucket, key, count, total)
+        select metric, bucket, key, sum(count), sum(total)
+        from folded
+        group by metric, bucket, key
+        on conflict (metric, bucket, key) do update set
+            count = analytics_rollups.count + excluded.count,
+            total = analytics_rollups.total + excluded.total
+    )
+    -- Data-modifying CTEs always run to completion, so merged needs no reference
+    select count(*)::integer from folded;
+$$;
+
+-- Same contract as before; pending deltas are included
+create or replace function analytics_rollup_series(
+    p_metrics text[],
+    p_granularity text,
+    p_from timestamptz default null,
+    p_to timestamptz default null
+) returns table (metric text, bucket timestamptz, key text, count bigint, total numeric)
+language sql
+stable
+as $$
+    select r.metric, date_trunc(p_granularity, r.bucket, 'UTC') as series_bucket, r.key, sum(r.count)::bigint, sum(r.total)
+    from (
+        select metric, bucket, key, count, total from analytics_rollups
+        union all
+        select metric, bucket, key, count, total from analytics_rollup_deltas
+    ) r
+    where r.metric = any(p_metrics)
+        and (p_from is null or r.bucket >= p_from)
+        and (p_to is null or r.bucket < p_to)
+    group by r.metric, series_bucket, r.key
+    having sum(r.count) <> 0
+    order by series_bucket, r.metric, r.key;
+$$;
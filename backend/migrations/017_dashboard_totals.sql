@@ -0,0 +1,213 @@
+-- All-time analytics totals per metric and key, so dashboard overview stats read a
+-- handful of rows instead of aggregating every live and archived session.
+-- Maintained by compact_analytics_rollups together with analytics_rollups.
+create table if not exists analytics_totals (
+    metric text not null,
+    key text not null default '',
+    count bigint not null default 0,
+    total numeric not null default 0,
+    primary key (metric, key)
+);
+
+-- Keep deltas and rollups still while totals are seeded from them
+lock table analytics_rollup_deltas, analytics_rollups in share row exclusive mode;
+
+create or replace function compact_analytics_rollups(p_limit integer)
+returns integer
+language sql
+as $$
+    with folded as (
+        delete from analytics_rollup_deltas
+        where id in (
+            select id from analytics_rollup_deltas
+            order by id
+            limit p_limit
+            for update skip locked
+        )
+        returning metric, bucket, key, count, total
+    ),
+    merged as (
+        insert into analytics_rollups (metric, bucket, key, count, total)
+        select metric, bucket, key, sum(count), sum(total)
+        from folded
+        group by metric, bucket, key
+        on conflict (metric, bucket, key) do update set
+            count = analytics_rollups.count + excluded.count,
+            total = analytics_rollups.total + excluded.total
+    ),
+    totals as (
+        insert into analytics_totals (metric, key, count, total)
+        select metric, key, sum(count), sum(total)
+        from folded
+        group by metric, key
+        on conflict (metric, key) do update set
+            count = analytics_totals.count + excluded.count,
+            total = analytics_totals.total + excluded.total
+    )
+    -- Data-modifying CTEs always run to completion, so merged and totals need no reference
+    select count(*)::integer from folded;
+$$;
+
+-- Like the dashboard's mean score before the totals, final_score leaves out
+-- evaluations without a positive average_score
+create or replace function bump_final_evaluation_rollups(
+    p_created_at timestamptz,
+    p_average_score numeric,
+    p_overall_scores jsonb,
+    p_tool_recommendations jsonb,
+    p_sign integer
+) returns void
+language plpgsql
+as $$
+begin
+    if p_average_score > 0 then
+        perform bump_analytics_rollup(p_created_at, 'final_score', '', p_sign, p_sign * p_average_score);
+    end if;
+    perform bump_analytics_rollup(p_created_at, 'score_range', score_range(p_average_score), p_sign);
+
+    if jsonb_typeof(p_overall_scores) = 'object' then
+        perform bump_analytics_rollup(p_created_at, 'skill_score', skill.key, p_sign, p_sign * (skill.value #>> '{}')::numeric)
+        from jsonb_each(p_overall_scores) as skill
+        where jsonb_typeof(skill.value) = 'number';
+    end if;
+
+    if jsonb_typeof(p_tool_recommendations) = 'object' then
+        perform bump_analytics_rollup(p_created_at, 'tool_recommendation', tool, p_sign)
+        from jsonb_object_keys(p_tool_recommendations) as tool;
+    end if;
+end;
+$$;
+
+-- Final evaluations also count towards a performance metric (key: overall_performance)
+create or replace function bump_final_evaluation_rollups(
+    p_created_at timestamptz,
+    p_average_score numeric,
+    p_overall_performance text,
+    p_overall_scores jsonb,
+    p_tool_recommendations jsonb,
+    p_sign integer
+) returns void
+language plpgsql
+as $$
+begin
+    if p_overall_performance is not null then
+        perform bump_analytics_rollup(p_created_at, 'performance', p_overall_performance, p_sign);
+    end if;
+    perform bump_final_evaluation_rollups(p_created_at, p_average_score, p_overall_scores, p_tool_recommendations, p_sign);
+end;
+$$;
+
+create or replace function final_evaluations_rollup() returns trigger
+language plpgsql
+as $$
+declare
+    v_created_at timestamptz;
+begin
+    select created_at into v_created_at from sessions where session_id = new.session_id;
+    v_created_at := coalesce(v_created_at, now());
+
+    if tg_op = 'UPDATE' then
+        perform bump_final_evaluation_rollups(
+            v_created_at, old.average_score, old.overall_performance, old.overall_scores::jsonb, old.tool_recommendations::jsonb, -1
+        );
+    end if;
+    perform bump_final_evaluation_rollups(
+        v_created_at, new.average_score, new.overall_performance, new.overall_scores::jsonb, new.tool_recommendations::jsonb, 1
+    );
+    return null;
+end;
+$$;
+
+drop trigger if exists final_evaluations_rollup on final_evaluations;
+create trigger final_evaluations_rollup
+    after insert or update of average_score, overall_performance, overall_scores, tool_recommendations on final_evaluations
+    for each row execute function final_evaluations_rollup();
+
+do $$
+declare
+    v_rollups_backfilled_at timestamptz;
+begin
+    if exists (select 1 from analytics_totals) then
+        return;
+    end if;
+
+    -- Performance of the live final evaluations
+    perform bump_analytics_rollup(s.created_at, 'performance', f.overall_performance, 1)
+    from final_evaluations f
+    join sessions s on s.session_id = f.session_id
+    where f.overall_performance is not null;
+
+    -- Take back the unscored final evaluations final_score counted until now
+    -- (those of expired sessions can no longer be told apart and stay counted)
+    perform bump_analytics_rollup(s.created_at, 'final_score', '', -1)
+    from final_evaluations f
+    join sessions s on s.session_id = f.session_id
+    where not coalesce(f.average_score > 0, false);
+
+    -- Sessions archived since migration 014 were counted by the triggers while
+    -- live; only those archived before it still need their final score. Without
+    -- a backfill time none are added, rather than risk counting them twice.
+    select backfilled_at into v_rollups_backfilled_at from analytics_backfills where name = 'analytics_rollups';
+
+    perform bump_analytics_rollup(a.created_at, 'final_score', '', 1, a.average_score)
+    from archived_sessions a
+    join session_archive_batches b on b.key = a.batch_key
+    where a.average_score > 0
+        and b.archived_at < v_rollups_backfilled_at
+        and not exists (select 1 from sessions s where s.session_id::text = a.session_id);
+    perform bump_analytics_rollup(a.created_at, 'final_score', '', -1)
+    from archived_sessions a
+    join session_archive_batches b on b.key = a.batch_key
+    where a.average_score <= 0
+        and b.archived_at >= v_rollups_backfilled_at
+        and not exists (select 1 from sessions s where s.session_id::text = a.session_id);
+    perform bump_analytics_rollup(a.created_at, 'performance', a.overall_performance, 1)
+    from archived_sessions a
+    where a.overall_performance is not null
+        and not exists (select 1 from sessions s where s.session_id::text = a.session_id);
+
+    -- Totals of what is already folded; pending deltas reach them when folded
+    insert into analytics_totals (metric, key, count, total)
+    select metric, key, sum(count), sum(total)
+    from analytics_rollups
+    group by metric, key;
+end;
+$$;
+
+-- Dashboard overview counts, completion, mean final score and performance
+-- distribution from the totals, plus the last week's sessions from the hourly
+-- rollups. Pending deltas are included; the cost doesn't depend on history size.
+create or replace function dashboard_stats(p_recent_since timestamptz)
+returns jsonb
+language sql
+stable
+as $$
+    with totals as (
+        select t.metric, t.key, sum(t.count) as count, sum(t.total) as total
+        from (
+            select metric, key, count, total from analytics_totals
+            union all
+            select metric, key, count, total from analytics_rollup_deltas
+        ) t
+        where t.metric in ('sessions', 'sessions_completed', 'final_score', 'performance')
+        group by t.metric, t.key
+    ),
+    recent as (
+        select coalesce(sum(r.count), 0) as sessions
+        from (
+            select bucket, count from analytics_rollups where metric = 'sessions'
+            union all
+            select bucket, count from analytics_rollup_deltas where metric = 'sessions'
+        ) r
+        where r.bucket >= date_trunc('hour', p_recent_since, 'UTC')
+    )
+    select jsonb_build_object(
+        'total_sessions', coalesce((select count from totals where metric = 'sessions'), 0),
+        'completed_sessions', coalesce((select count from totals where metric = 'sessions_completed'), 0),
+        'recent_sessions', (select sessions from recent),
+        'average_score', (select total / nullif(count, 0) from totals where metric = 'final_score'),
+        'performance_distribution', coalesce(
+            (select jsonb_object_agg(key, count) from totals where metric = 'performance' and count <> 0), '{}'::jsonb
+        )
+    );
+$$;
@@ -0,0 +1,15 @@
+-- Add or replace one part's summary in sessions.part_summaries without touching
+-- the others, so a re-score never writes back summaries from a stale copy of the
+-- session. Returns the merged part_summaries, or null if the session is gone.
+create or replace function merge_part_summary(
+    p_session_id sessions.session_id%type,
+    p_part_id integer,
+    p_part_summary text
+) returns jsonb
+language sql
+as $$
+    update sessions
+    set part_summaries = coalesce(part_summaries, '{}'::jsonb) || jsonb_build_object(p_part_id::text, p_part_summary)
+    where session_id = p_session_id
+    returning part_summaries;
+$$;
@@ -0,0 +1,42 @@
+-- expire_sessions also returns the model context cache handles of the expired
+-- sessions, so the caller can delete them instead of paying for them until
+-- their TTL runs out. Otherwise unchanged from 010.
+create or replace function expire_sessions(p_cutoff timestamptz, p_batch_size integer)
+returns jsonb
+language sql
+as $$
+    with expired as (
+        select session_id from sessions
+        where created_at < p_cutoff
+        order by created_at
+        limit p_batch_size
+        for update skip locked
+    ),
+    deleted_responses as (
+        delete from responses where session_id in (select session_id from expired) returning audio_key
+    ),
+    deleted_part_evaluations as (
+        delete from part_evaluations where session_id in (select session_id from expired) returning 1
+    ),
+    deleted_final_evaluations as (
+        delete from final_evaluations where session_id in (select session_id from expired) returning 1
+    ),
+    deleted_rescoring as (
+        delete from rescoring_queue where session_id in (select session_id::text from expired) returning 1
+    ),
+    deleted_sessions as (
+        delete from sessions where session_id in (select session_id from expired) returning session_id, context_cache_name
+    )
+    select jsonb_build_object(
+        'sessions', (select count(*) from deleted_sessions),
+        'responses', (select count(*) from deleted_responses),
+        'part_evaluations', (select count(*) from deleted_part_evaluations),
+        'final_evaluations', (select count(*) from deleted_final_evaluations),
+        'rescoring_queue', (select count(*) from deleted_rescoring),
+        'session_ids', (select coalesce(jsonb_agg(session_id), '[]'::jsonb) from deleted_sessions),
+        'audio_keys', (select coalesce(jsonb_agg(audio_key), '[]'::jsonb) from deleted_responses where audio_key is not null),
+        'context_caches', (
+            select coalesce(jsonb_agg(context_cache_name), '[]'::jsonb) from deleted_sessions where context_cache_name is not null
+        )
+    );
+$$;
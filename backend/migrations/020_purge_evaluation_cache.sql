@@ -0,0 +1,20 @@
+-- Delete up to p_batch_size evaluation_cache entries created before p_cutoff,
+-- oldest first, returning how many were deleted. Lookups already ignore these
+-- entries; this keeps the table from growing without bound.
+create or replace function purge_evaluation_cache(p_cutoff timestamptz, p_batch_size integer)
+returns integer
+language sql
+as $$
+    with purged as (
+        delete from evaluation_cache
+        where cache_key in (
+            select cache_key from evaluation_cache
+            where created_at < p_cutoff
+            order by created_at
+            limit p_batch_size
+            for update skip locked
+        )
+        returning 1
+    )
+    select count(*)::integer from purged;
+$$;
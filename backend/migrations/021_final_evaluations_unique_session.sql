@@ -0,0 +1,12 @@
+-- One final evaluation per session, so it can be written with a single upsert on
+-- session_id instead of a select followed by an insert or update. Earlier
+-- duplicates from racing inserts are dropped, keeping the latest row.
+delete from final_evaluations f
+using final_evaluations newer
+where newer.session_id = f.session_id
+  and newer.id > f.id;
+
+create unique index if not exists final_evaluations_session_id_key on final_evaluations (session_id);
+
+-- The unique index also serves lookups by session
+drop index if exists final_evaluations_session_id_idx;
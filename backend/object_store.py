@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import os
+import logging
+import shutil
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from pydantic import BaseModel
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# "local" keeps objects on the filesystem, "azure" uses Azure Blob Storage
+# (the Azurite emulator by default, see AzuriteConfig in the repo root)
+OBJECT_STORE_BACKEND = os.getenv("OBJECT_STORE_BACKEND", "local")
+OBJECT_STORE_LOCAL_DIR = os.getenv("OBJECT_STORE_LOCAL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "storage"))
+
+# Azurite's well-known development account unless a real connection string is set
+AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING", "UseDevelopmentStorage=true")
+AZURE_STORAGE_CONTAINER = os.getenv("AZURE_STORAGE_CONTAINER", "audio-recordings")
+
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class StoredObject(BaseModel):
+    key: str
+    size: int
+    sha256: str
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(_COPY_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class LocalObjectStore:
+    """Objects as files under a base directory, keyed by relative path"""
+
+    name = "local"
+
+    def __init__(self, base_dir: str = OBJECT_STORE_LOCAL_DIR):
+        self.base_dir = base_dir
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.base_dir, key))
+        if not path.startswith(os.path.abspath(self.base_dir) + os.sep):
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    def _put_file(self, key: str, source_path: str):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(source_path, path)
+
+    async def put_file(self, key: str, source_path: str, content_type: str):
+        await asyncio.to_thread(self._put_file, key, source_path)
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str):
+        def write():
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as target:
+                target.write(data)
+        await asyncio.to_thread(write)
+
+    async def get_bytes(self, key: str) -> bytes:
+        def read():
+            with open(self._path(key), "rb") as source:
+                return source.read()
+        return await asyncio.to_thread(read)
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        # Already on disk, no copy needed
+        yield self._path(key)
+
+    async def delete(self, key: str):
+        try:
+            await asyncio.to_thread(os.unlink, self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def ping(self, timeout: float):
+        """Raise unless the base directory can be written to"""
+        def check():
+            os.makedirs(self.base_dir, exist_ok=True)
+            if not os.access(self.base_dir, os.W_OK | os.X_OK):
+                raise RuntimeError(f"Object store directory {self.base_dir} is not writable")
+        await asyncio.wait_for(asyncio.to_thread(check), timeout=timeout)
+
+
+class AzureBlobObjectStore:
+    """Objects as block blobs in one Azure Storage (or Azurite) container"""
+
+    name = "azure"
+
+    def __init__(self, connection_string: str = AZURE_STORAGE_CONNECTION_STRING, container: str = AZURE_STORAGE_CONTAINER):
+        from azure.storage.blob import BlobServiceClient
+
+        self.container = BlobServiceClient.from_connection_string(connection_string).get_container_client(container)
+        self._container_ready = False
+
+    def _ensure_container(self):
+        if self._container_ready:
+            return
+        from azure.core.exceptions import ResourceExistsError
+
+        try:
+            self.container.create_container()
+        except ResourceExistsError:
+            pass
+        self._container_ready = True
+
+    def _put_file(self, key: str, source_path: str, content_type: str):
+        from azure.storage.blob import ContentSettings
+
+        self._ensure_container()
+        with open(source_path, "rb") as source:
+            self.container.upload_blob(key, source, overwrite=True, content_settings=ContentSettings(content_type=content_type))
+
+    async def put_file(self, key: str, source_path: str, content_type: str):
+        await asyncio.to_thread(self._put_file, key, source_path, content_type)
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str):
+        def upload():
+            from azure.storage.blob import ContentSettings
+
+            self._ensure_container()
+            self.container.upload_blob(key, data, overwrite=True, content_settings=ContentSettings(content_type=content_type))
+        await asyncio.to_thread(upload)
+
+    async def get_bytes(self, key: str) -> bytes:
+        return await asyncio.to_thread(lambda: self.container.download_blob(key).readall())
+
+    @asynccontextmanager
+    async def local_copy(self, key: str) -> AsyncIterator[str]:
+        fd, path = tempfile.mkstemp(suffix=os.path.splitext(key)[1])
+
+        def download():
+            with os.fdopen(fd, "wb") as target:
+                self.container.download_blob(key).readinto(target)
+        try:
+            await asyncio.to_thread(download)
+            yield path
+        finally:
+            os.unlink(path)
+
+    async def delete(self, key: str):
+        from azure.core.exceptions import ResourceNotFoundError
+
+        try:
+            await asyncio.to_thread(self.container.delete_blob, key)
+        except ResourceNotFoundError:
+            pass
+
+    async def ping(self, timeout: float):
+        """Raise unless the storage account answers a HEAD on the container"""
+        from azure.core.exceptions import ResourceNotFoundError
+
+        def head():
+            try:
+                # One attempt, bounded on the wire too so the thread doesn't outlive the check
+                self.container.get_container_properties(
+                    retry_total=0, connection_timeout=timeout, read_timeout=timeout, timeout=max(1, int(timeout))
+                )
+            except ResourceNotFoundError:
+                # Reachable; the container is created on the first write
+                pass
+        await asyncio.wait_for(asyncio.to_thread(head), timeout=timeout)
+
+
+def create_object_store(name: str = OBJECT_STORE_BACKEND, azure_container: str = AZURE_STORAGE_CONTAINER):
+    """Build the configured object store, or None if it can't be configured"""
+    try:
+        if name == "local":
+            return LocalObjectStore()
+        if name == "azure":
+            return AzureBlobObjectStore(container=azure_container)
+        raise ValueError(f"Unknown object store backend: {name}")
+    except Exception as e:
+        logger.error(f"Failed to configure object store '{name}': {e}")
+        return None
+
+
+def audio_key(session_id: str, part_id: int, sha256: str, extension: str) -> str:
+    """Content-addressed key for a session's recording"""
+    return f"audio/{session_id}/part{part_id}-{sha256[:16]}{extension}"
+
+
+async def store_audio_file(store, session_id: str, part_id: int, path: str, mime_type: str, extension: str,
+                           sha256: Optional[str] = None) -> StoredObject:
+    """Copy a recording into the object store, returning what the responses row keeps"""
+    sha256 = sha256 or await asyncio.to_thread(file_sha256, path)
+    key = audio_key(session_id, part_id, sha256, extension)
+    await store.put_file(key, path, mime_type)
+    return StoredObject(key=key, size=os.path.getsize(path), sha256=sha256)
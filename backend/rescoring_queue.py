@@ -0,0 +1,121 @@
+import asyncio
+import os
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+
+import metrics
+from db import execute
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Queue processing configuration
+RESCORING_INTERVAL_SECONDS = float(os.getenv("RESCORING_INTERVAL_SECONDS", "60"))
+RESCORING_BATCH_SIZE = int(os.getenv("RESCORING_BATCH_SIZE", "10"))
+RESCORING_MAX_ATTEMPTS = int(os.getenv("RESCORING_MAX_ATTEMPTS", "5"))
+
+QUEUE_TABLE = "rescoring_queue"
+
+# part_id used for queued final evaluations
+FINAL_EVALUATION_PART_ID = 0
+
+
+class RescoringQueue:
+    """Evaluations that were answered with fallback scores and should be redone.
+
+    Rows live in the rescoring_queue table. A background worker claims pending
+    rows while the model is healthy and hands them to the rescoring handler.
+    """
+
+    def __init__(self, supabase, batch_size: int = RESCORING_BATCH_SIZE, max_attempts: int = RESCORING_MAX_ATTEMPTS):
+        self.supabase = supabase
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+
+    async def enqueue(self, session_id: str, part_id: int, reason: str):
+        """Queue a part (or FINAL_EVALUATION_PART_ID) for re-scoring unless it is already pending"""
+        if not self.supabase:
+            return
+        try:
+            existing = await execute(
+                self.supabase.table(QUEUE_TABLE).select("id").eq("session_id", session_id)
+                .eq("part_id", part_id).in_("status", ["pending", "processing"]).limit(1)
+            )
+            if existing.data:
+                return
+            now = datetime.now(timezone.utc).isoformat()
+            await execute(
+                self.supabase.table(QUEUE_TABLE).insert({
+                    "session_id": session_id,
+                    "part_id": part_id,
+                    "reason": reason[:500],
+                    "status": "pending",
+                    "attempts": 0,
+                    "created_at": now,
+                    "updated_at": now
+                })
+            )
+            metrics.increment("rescoring_queue", "enqueued")
+            logger.info(f"Queued session {session_id} part {part_id} for re-scoring: {reason}")
+        except Exception as e:
+            logger.error(f"Error queueing re-scoring for session {session_id} part {part_id}: {e}")
+
+    async def _claim(self, item: Dict) -> bool:
+        result = await execute(
+            self.supabase.table(QUEUE_TABLE).update({
+                "status": "processing",
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }).eq("id", item["id"]).eq("status", "pending")
+        )
+        return bool(result.data)
+
+    async def _finish(self, item: Dict, error: Optional[Exception]):
+        if error is None:
+            await execute(self.supabase.table(QUEUE_TABLE).delete().eq("id", item["id"]))
+            metrics.increment("rescoring_queue", "completed")
+            return
+
+        attempts = (item.get("attempts") or 0) + 1
+        status = "failed" if attempts >= self.max_attempts else "pending"
+        await execute(
+            self.supabase.table(QUEUE_TABLE).update({
+                "status": status,
+                "attempts": attempts,
+                "reason": str(error)[:500],
+                "updated_at": datetime.now(timezone.utc).isoformat()
+            }).eq("id", item["id"])
+        )
+        metrics.increment("rescoring_queue", status)
+
+    async def process_batch(self, handler: Callable[[Dict], Awaitable[None]]) -> int:
+        """Re-score one batch of pending items, returning how many were handled"""
+        pending = await execute(
+            self.supabase.table(QUEUE_TABLE).select("*").eq("status", "pending")
+            .order("created_at").limit(self.batch_size)
+        )
+        handled = 0
+        for item in pending.data or []:
+            if not await self._claim(item):
+                continue
+            try:
+                await handler(item)
+                await self._finish(item, None)
+            except Exception as e:
+                logger.warning(f"Re-scoring session {item['session_id']} part {item['part_id']} failed: {e}")
+                await self._finish(item, e)
+            handled += 1
+        return handled
+
+    async def run(self, handler: Callable[[Dict], Awaitable[None]], is_healthy: Callable[[], bool], interval_seconds: float = RESCORING_INTERVAL_SECONDS):
+        """Process the queue forever, skipping rounds while the model is unhealthy"""
+        if not self.supabase:
+            return
+        while True:
+            await asyncio.sleep(interval_seconds)
+            if not is_healthy():
+                continue
+            try:
+                await self.process_batch(handler)
+            except Exception as e:
+                logger.error(f"Error processing re-scoring queue: {e}")
@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+import logging
+import random
+import re
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+import httpx
+from google.genai import errors as genai_errors
+
+import metrics
+from circuit_breaker import CircuitOpenError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Retry configuration shared by all model call sites
+LLM_RETRY_MAX_ATTEMPTS = int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+LLM_RETRY_DEADLINE_SECONDS = float(os.getenv("LLM_RETRY_DEADLINE_SECONDS", "60"))
+
+# End-to-end time budgets (seconds) per call site, covering all attempts and backoff
+LLM_BUDGETS = {
+    "generate_case_study": float(os.getenv("LLM_BUDGET_GENERATE_CASE_STUDY", "45")),
+    "submit_part": float(os.getenv("LLM_BUDGET_SUBMIT_PART", "30")),
+    "evaluate_audio_response": float(os.getenv("LLM_BUDGET_EVALUATE_AUDIO", "45")),
+    "get_final_evaluation": float(os.getenv("LLM_BUDGET_FINAL_EVALUATION", "60")),
+    "transcribe_audio_segment": float(os.getenv("LLM_BUDGET_TRANSCRIBE_SEGMENT", "30")),
+}
+
+# Error classes
+RATE_LIMIT = "rate_limit"
+TIMEOUT = "timeout"
+SERVER = "server"
+PARSE = "parse"
+CIRCUIT_OPEN = "circuit_open"
+FATAL = "fatal"
+
+RETRYABLE = {RATE_LIMIT, TIMEOUT, SERVER, PARSE}
+
+# Cancellation message of attempts cut off by their time budget, so a slow
+# service can be told apart from a caller going away
+BUDGET_EXHAUSTED = "time budget exhausted"
+
+_DURATION = re.compile(r"^(\d+(?:\.\d+)?)s$")
+
+T = TypeVar("T")
+
+
+def classify_error(error: Exception) -> str:
+    """Sort a failed model call into one of the retry error classes"""
+    if isinstance(error, CircuitOpenError):
+        return CIRCUIT_OPEN
+    if isinstance(error, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return TIMEOUT
+    if isinstance(error, genai_errors.APIError):
+        if error.code == 429 or error.status == "RESOURCE_EXHAUSTED":
+            return RATE_LIMIT
+        if error.code in (408, 504) or error.status == "DEADLINE_EXCEEDED":
+            return TIMEOUT
+        if error.code and error.code >= 500:
+            return SERVER
+        return FATAL
+    if isinstance(error, httpx.TransportError):
+        return SERVER
+    if isinstance(error, (json.JSONDecodeError, ValueError)):
+        return PARSE
+    return FATAL
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-provided retry hint, from a Retry-After header or a RetryInfo detail"""
+    if not isinstance(error, genai_errors.APIError):
+        return None
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return max(0.0, float(value))
+            except ValueError:
+                pass
+
+    details = error.details if isinstance(error.details, dict) else {}
+    for detail in details.get("error", {}).get("details", []) or []:
+        if isinstance(detail, dict) and "retryDelay" in detail:
+            match = _DURATION.match(str(detail["retryDelay"]))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+class RetryPolicy:
+    """Jittered exponential backoff within an overall deadline"""
+
+    def __init__(
+        self,
+        max_attempts: int = LLM_RETRY_MAX_ATTEMPTS,
+        base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_delay: float = LLM_RETRY_MAX_DELAY,
+        deadline_seconds: float = LLM_RETRY_DEADLINE_SECONDS,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline_seconds = deadline_seconds
+
+    def backoff(self, retry_number: int, error: Exception) -> float:
+        """Delay before the given retry (1-based); honours retry-after hints"""
+        hint = retry_after_seconds(error)
+        if hint is not None:
+            return min(hint, self.max_delay * 4)
+        # Full jitter keeps concurrent clients from retrying in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (retry_number - 1))))
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+# Policies with each call site's end-to-end budget as the deadline
+ENDPOINT_POLICIES = {call_site: RetryPolicy(deadline_seconds=budget) for call_site, budget in LLM_BUDGETS.items()}
+
+def policy_for(call_site: str) -> RetryPolicy:
+    return ENDPOINT_POLICIES.get(call_site, DEFAULT_POLICY)
+
+
+async def _run_attempt(call: Callable[[], Awaitable[T]], timeout: float) -> T:
+    """Like asyncio.wait_for, but an attempt that runs out of time is cancelled with BUDGET_EXHAUSTED"""
+    task = asyncio.ensure_future(call())
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if task not in done:
+        task.cancel(BUDGET_EXHAUSTED)
+        await asyncio.wait({task})
+        raise asyncio.TimeoutError(BUDGET_EXHAUSTED)
+    return task.result()
+
+
+async def iterate_with_budget(call_site: str, stream: AsyncIterator[T], started: Optional[float] = None,
+                              policy: Optional[RetryPolicy] = None) -> AsyncIterator[T]:
+    """Yield the items of `stream`, raising asyncio.TimeoutError once the call site's budget runs out.
+
+    Streams are not retried: items already yielded can't be taken back.
+    """
+    policy = policy or policy_for(call_site)
+    started = time.monotonic() if started is None else started
+    metrics.increment("llm_attempts", call_site)
+    try:
+        while True:
+            remaining = policy.deadline_seconds - (time.monotonic() - started)
+            if remaining <= 0:
+                raise asyncio.TimeoutError(BUDGET_EXHAUSTED)
+            try:
+                item = await _run_attempt(stream.__anext__, remaining)
+            except StopAsyncIteration:
+                return
+            yield item
+    except Exception as e:
+        metrics.increment("llm_errors", f"{call_site}:{classify_error(e)}")
+        raise
+    finally:
+        await stream.aclose()
+
+
+async def call_with_retry(call_site: str, call: Callable[[], Awaitable[T]], policy: Optional[RetryPolicy] = None,
+                          started: Optional[float] = None) -> T:
+    """Run `call` until it succeeds, retrying retryable errors per the policy.
+
+    Each attempt is cut off when the policy deadline (the call site's time
+    budget) is reached. The last error is re-raised once attempts, or the
+    deadline, run out. The budget runs from `started` (a time.monotonic()
+    value) if given, so consecutive calls of one call site can share it.
+    """
+    policy = policy or policy_for(call_site)
+    started = time.monotonic() if started is None else started
+    for attempt in range(1, policy.max_attempts + 1):
+        metrics.increment("llm_attempts", call_site)
+        try:
+            remaining = policy.deadline_seconds - (time.monotonic() - started)
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"{call_site} time budget of {policy.deadline_seconds}s exhausted")
+            return await _run_attempt(call, remaining)
+        except Exception as e:
+            error_class = classify_error(e)
+            metrics.increment("llm_errors", f"{call_site}:{error_class}")
+            if error_class == PARSE:
+                metrics.increment("llm_parse_failures", call_site)
+
+            if error_class not in RETRYABLE:
+                raise
+            if time.monotonic() - started >= policy.deadline_seconds:
+                metrics.increment("llm_deadline_exceeded", call_site)
+                logger.error(f"{call_site}: time budget exhausted after {attempt} attempts ({error_class}): {e}")
+                raise
+            if attempt >= policy.max_attempts:
+                metrics.increment("llm_retries_exhausted", call_site)
+                logger.error(f"{call_site}: all {attempt} attempts failed ({error_class}): {e}")
+                raise
+
+            delay = policy.backoff(attempt, e)
+            if time.monotonic() - started + delay > policy.deadline_seconds:
+                metrics.increment("llm_deadline_exceeded", call_site)
+                logger.error(f"{call_site}: retry deadline reached after {attempt} attempts ({error_class}): {e}")
+                raise
+
+            metrics.increment("llm_retries", call_site)
+            logger.warning(f"{call_site}: attempt {attempt} failed ({error_class}), retrying in {delay:.2f}s: {e}")
+            await asyncio.sleep(delay)
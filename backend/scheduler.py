@@ -0,0 +1,102 @@
+import asyncio
+import os
+import logging
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List
+
+import metrics
+from db import execute
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+LEASE_TABLE = "scheduler_leases"
+
+# Identifies this worker process as a lease holder
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+
+class Job:
+    def __init__(self, name: str, run: Callable[[], Awaitable[None]], interval_seconds: float):
+        self.name = name
+        self.run = run
+        self.interval_seconds = interval_seconds
+
+
+class Scheduler:
+    """Runs jobs on a fixed cadence in exactly one worker.
+
+    Every worker runs the same loop, but before each run a worker must take or
+    renew the job's lease in the scheduler_leases table. The lease outlives
+    two intervals, so if the leader dies another worker takes over within two
+    intervals. Without a database, jobs run in every worker.
+    """
+
+    def __init__(self, supabase, holder: str = WORKER_ID):
+        self.supabase = supabase
+        self.holder = holder
+        self.jobs: List[Job] = []
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add_job(self, name: str, run: Callable[[], Awaitable[None]], interval_seconds: float):
+        self.jobs.append(Job(name, run, interval_seconds))
+
+    async def acquire_lease(self, job: Job) -> bool:
+        """Take or renew this worker's lease on the job"""
+        if not self.supabase:
+            return True
+        result = await execute(self.supabase.rpc("acquire_scheduler_lease", {
+            "p_name": job.name,
+            "p_holder": self.holder,
+            "p_ttl_seconds": job.interval_seconds * 2
+        }))
+        return bool(result.data)
+
+    async def release_lease(self, job: Job):
+        if not self.supabase:
+            return
+        await execute(self.supabase.table(LEASE_TABLE).delete().eq("name", job.name).eq("holder", self.holder))
+
+    async def run_once(self, job: Job) -> bool:
+        """Run the job if this worker holds its lease, returning whether it ran"""
+        try:
+            if not await self.acquire_lease(job):
+                return False
+        except Exception as e:
+            logger.error(f"Could not acquire scheduler lease for {job.name}: {e}")
+            return False
+
+        started = time.monotonic()
+        try:
+            await job.run()
+            metrics.increment("scheduler_runs", job.name)
+        except Exception as e:
+            metrics.increment("scheduler_failures", job.name)
+            logger.error(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            metrics.observe("scheduler_job_seconds", time.monotonic() - started, job.name)
+        return True
+
+    async def _loop(self, job: Job):
+        while True:
+            await self.run_once(job)
+            await asyncio.sleep(job.interval_seconds)
+
+    def start(self):
+        for job in self.jobs:
+            if job.name not in self._tasks:
+                self._tasks[job.name] = asyncio.create_task(self._loop(job))
+
+    async def stop(self):
+        """Cancel the loops and hand the leases over to the remaining workers"""
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        for job in self.jobs:
+            try:
+                await self.release_lease(job)
+            except Exception as e:
+                logger.warning(f"Could not release scheduler lease for {job.name}: {e}")
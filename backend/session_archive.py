@@ -0,0 +1,179 @@
+import asyncio
+import gzip
+import json
+import os
+import logging
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import metrics
+from db import supabase, execute
+from object_store import create_object_store, OBJECT_STORE_BACKEND
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Cold storage for sessions past the hot window. The archive uses the same
+# object store backend as recordings unless configured otherwise; with the
+# "azure" backend batches go to their own container.
+SESSION_ARCHIVE_ENABLED = os.getenv("SESSION_ARCHIVE_ENABLED", "true").lower() == "true"
+SESSION_ARCHIVE_BACKEND = os.getenv("SESSION_ARCHIVE_BACKEND", OBJECT_STORE_BACKEND)
+SESSION_ARCHIVE_CONTAINER = os.getenv("SESSION_ARCHIVE_CONTAINER", "session-archive")
+# Decompressed batches kept in memory for dashboard reads (batches never change)
+SESSION_ARCHIVE_CACHE_BATCHES = int(os.getenv("SESSION_ARCHIVE_CACHE_BATCHES", "32"))
+
+BATCH_TABLE = "session_archive_batches"
+ARCHIVED_SESSIONS_TABLE = "archived_sessions"
+
+# Tables moved to the archive with each session, children first
+CHILD_TABLES = ["responses", "part_evaluations", "final_evaluations"]
+
+
+def encode_batch(records: List[Dict]) -> bytes:
+    """Gzipped JSON Lines, one session with its rows per line"""
+    lines = "".join(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n" for record in records)
+    return gzip.compress(lines.encode("utf-8"))
+
+
+def decode_batch(data: bytes) -> List[Dict]:
+    return [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines() if line]
+
+
+def archived_session_row(record: Dict, key: str) -> Dict:
+    """Index row for one archived session, with the columns dashboard stats aggregate"""
+    session, final_evaluation = record["session"], record["final_evaluation"] or {}
+    return {
+        "session_id": session["session_id"],
+        "batch_key": key,
+        "created_at": session["created_at"],
+        "is_complete": bool(session.get("is_complete")),
+        "overall_performance": final_evaluation.get("overall_performance"),
+        "average_score": final_evaluation.get("average_score")
+    }
+
+
+class SessionArchive:
+    """Archive tier for sessions past the hot window.
+
+    Each archive run moves a batch of the oldest sessions, with their
+    responses, part evaluations and final evaluation, into one gzipped JSON
+    Lines object in the object store. The session_archive_batches table indexes
+    the batches by creation-time range, and archived_sessions maps each
+    session to its batch, so reads only download the batches they need.
+    """
+
+    def __init__(self, supabase, store, cache_batches: int = SESSION_ARCHIVE_CACHE_BATCHES):
+        self.supabase = supabase
+        self.store = store
+        self.cache_batches = cache_batches
+        self._batches: "OrderedDict[str, List[Dict]]" = OrderedDict()
+
+    async def archive_batch(self, cutoff: str, batch_size: int) -> Dict:
+        """Move up to batch_size sessions created before cutoff into one archive batch.
+
+        Returns the rows deleted per table, the archived session ids and their
+        model context cache handles (which the caller deletes). The hot
+        rows are deleted in one delete_archived_sessions transaction, and only
+        after the batch and its index rows are stored; if that fails nothing is
+        deleted and the sessions stay indexed to the latest complete batch.
+        """
+        sessions = await execute(
+            self.supabase.table("sessions").select("*").lt("created_at", cutoff).order("created_at").limit(batch_size)
+        )
+        rows = sessions.data or []
+        moved = {"sessions": len(rows), **{table: 0 for table in CHILD_TABLES}, "session_ids": []}
+        if not rows:
+            return moved
+
+        session_ids = [row["session_id"] for row in rows]
+        children = await asyncio.gather(*(
+            execute(self.supabase.table(table).select("*").in_("session_id", session_ids)) for table in CHILD_TABLES
+        ))
+        by_session = {session_id: {table: [] for table in CHILD_TABLES} for session_id in session_ids}
+        for table, result in zip(CHILD_TABLES, children):
+            moved[table] = len(result.data or [])
+            for row in result.data or []:
+                by_session[row["session_id"]][table].append(row)
+
+        records = [
+            {
+                "session": row,
+                "responses": by_session[row["session_id"]]["responses"],
+                "part_evaluations": by_session[row["session_id"]]["part_evaluations"],
+                "final_evaluation": next(iter(by_session[row["session_id"]]["final_evaluations"]), None)
+            }
+            for row in rows
+        ]
+        data = await asyncio.to_thread(encode_batch, records)
+        first_created_at, last_created_at = rows[0]["created_at"], rows[-1]["created_at"]
+        key = f"archive/sessions/{str(first_created_at)[:10]}/{uuid.uuid4().hex}.jsonl.gz"
+        await self.store.put_bytes(key, data, "application/gzip")
+
+        await execute(self.supabase.table(BATCH_TABLE).insert({
+            "key": key,
+            "session_count": len(rows),
+            "first_created_at": first_created_at,
+            "last_created_at": last_created_at,
+            "size_bytes": len(data),
+            "archived_at": datetime.now(timezone.utc).isoformat()
+        }))
+        # A session archived again points at this batch, which holds its latest rows
+        await execute(self.supabase.table(ARCHIVED_SESSIONS_TABLE).upsert([
+            archived_session_row(record, key) for record in records
+        ], on_conflict="session_id"))
+
+        result = await execute(self.supabase.rpc("delete_archived_sessions", {
+            "p_sessions": [{"session_id": row["session_id"], "row_version": row["row_version"]} for row in rows]
+        }))
+        deleted = result.data or {}
+        moved.update({table: deleted.get(table, 0) for table in ["sessions", "rescoring_queue"] + CHILD_TABLES})
+        moved["session_ids"] = deleted.get("session_ids") or []
+        deleted_ids = {str(session_id) for session_id in moved["session_ids"]}
+        moved["context_caches"] = [
+            row["context_cache_name"] for row in rows
+            if row.get("context_cache_name") and str(row["session_id"]) in deleted_ids
+        ]
+        if len(moved["session_ids"]) < len(rows):
+            # Written to while being archived; archived again on a later run
+            metrics.increment("session_archive", "skipped_changed", len(rows) - len(moved["session_ids"]))
+
+        metrics.increment("session_archive", "batches")
+        metrics.increment("session_archive", "sessions", len(moved["session_ids"]))
+        metrics.observe("session_archive_batch_bytes", len(data))
+        return moved
+
+    async def read_batch(self, key: str) -> List[Dict]:
+        records = self._batches.get(key)
+        if records is not None:
+            self._batches.move_to_end(key)
+            metrics.increment("session_archive_reads", "cached")
+            return records
+        records = await asyncio.to_thread(decode_batch, await self.store.get_bytes(key))
+        metrics.increment("session_archive_reads", "downloaded")
+        if self.cache_batches > 0:
+            self._batches[key] = records
+            while len(self._batches) > self.cache_batches:
+                self._batches.popitem(last=False)
+        return records
+
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        """The archived record of one session, or None"""
+        entry = await execute(self.supabase.table(ARCHIVED_SESSIONS_TABLE).select("batch_key").eq("session_id", session_id))
+        if not entry.data:
+            return None
+        records = await self.read_batch(entry.data[0]["batch_key"])
+        return next((record for record in records if record["session"]["session_id"] == session_id), None)
+
+
+def create_session_archive() -> Optional[SessionArchive]:
+    """The configured archive, or None if archiving is disabled or can't be configured"""
+    if not SESSION_ARCHIVE_ENABLED or not supabase:
+        return None
+    store = create_object_store(SESSION_ARCHIVE_BACKEND, azure_container=SESSION_ARCHIVE_CONTAINER)
+    return SessionArchive(supabase, store) if store else None
+
+
+# Shared by the expiry job and the dashboard
+session_archive = create_session_archive()
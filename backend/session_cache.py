@@ -0,0 +1,72 @@
+import copy
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import metrics
+
+# Cache sizing configuration
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "2048"))
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "30"))
+
+
+class SessionCache:
+    """Bounded TTL/LRU cache of sessions rows, keyed by session_id.
+
+    Writes made by this worker are applied to the cached row as they are
+    stored, so it only goes stale through writes from other workers, and then
+    for at most the TTL. Rows are copied in and out so callers can mutate them.
+    """
+
+    def __init__(self, max_entries: int = SESSION_CACHE_MAX_ENTRIES, ttl_seconds: float = SESSION_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        entry = self._entries.get(session_id)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl_seconds:
+            del self._entries[session_id]
+            metrics.increment("session_cache", "expired")
+            entry = None
+        if entry is None:
+            self.misses += 1
+            metrics.increment("session_cache", "miss")
+            return None
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        metrics.increment("session_cache", "hit")
+        return copy.deepcopy(entry[1])
+
+    def put(self, session: Dict):
+        if self.max_entries <= 0:
+            return
+        session_id = session["session_id"]
+        self._entries[session_id] = (time.monotonic(), copy.deepcopy(session))
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def update(self, session_id: str, columns: Dict):
+        """Write-through: apply columns just stored in the database to the cached row, if any"""
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            entry[1].update(copy.deepcopy(columns))
+
+    def invalidate(self, session_id: str):
+        if self._entries.pop(session_id, None) is not None:
+            metrics.increment("session_cache", "invalidated")
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "ttlSeconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 3) if lookups else None
+        }
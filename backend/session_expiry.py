@@ -0,0 +1,86 @@
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+import metrics
+from db import execute
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Sessions older than this are removed along with their responses and evaluations
+SESSION_TTL_HOURS = float(os.getenv("SESSION_TTL_HOURS", "24"))
+SESSION_EXPIRY_INTERVAL_SECONDS = float(os.getenv("SESSION_EXPIRY_INTERVAL_SECONDS", "300"))
+# Sessions deleted per statement, and statements per run
+SESSION_EXPIRY_BATCH_SIZE = int(os.getenv("SESSION_EXPIRY_BATCH_SIZE", "200"))
+SESSION_EXPIRY_MAX_BATCHES = int(os.getenv("SESSION_EXPIRY_MAX_BATCHES", "10"))
+
+EXPIRED_TABLES = ["sessions", "responses", "part_evaluations", "final_evaluations", "rescoring_queue"]
+
+
+class SessionExpiry:
+    """Removes expired sessions from the hot tables in bounded batches.
+
+    With an archive, each batch is moved to cold storage first. Without one,
+    each batch is one expire_sessions database call that deletes up to
+    batch_size sessions and their dependent rows in a single statement. Either
+    way a backlog is worked off over several runs instead of in one long delete.
+    The expired sessions' model context caches are deleted afterwards.
+    """
+
+    def __init__(self, supabase, object_store=None, on_expired: Optional[Callable[[List[str]], None]] = None,
+                 archive=None, context_cache=None, ttl_hours: float = SESSION_TTL_HOURS, batch_size: int = SESSION_EXPIRY_BATCH_SIZE,
+                 max_batches: int = SESSION_EXPIRY_MAX_BATCHES):
+        self.supabase = supabase
+        self.object_store = object_store
+        self.on_expired = on_expired
+        self.archive = archive
+        self.context_cache = context_cache
+        self.ttl_hours = ttl_hours
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+
+    async def run(self) -> Dict[str, int]:
+        """Expire one run's worth of sessions, returning the rows removed from each table"""
+        totals = {table: 0 for table in EXPIRED_TABLES}
+        if not self.supabase:
+            return totals
+        cutoff = (datetime.now(timezone.utc) - timedelta(hours=self.ttl_hours)).isoformat()
+
+        for _ in range(self.max_batches):
+            if self.archive:
+                # Moved to cold storage; recordings stay, the archived responses reference them
+                batch = await self.archive.archive_batch(cutoff, self.batch_size)
+            else:
+                result = await execute(self.supabase.rpc("expire_sessions", {"p_cutoff": cutoff, "p_batch_size": self.batch_size}))
+                batch = result.data or {}
+                await self._delete_recordings(batch.get("audio_keys") or [])
+            await self._delete_context_caches(batch.get("context_caches") or [])
+            for table in EXPIRED_TABLES:
+                totals[table] += batch.get(table, 0)
+            if self.on_expired and batch.get("session_ids"):
+                self.on_expired(batch["session_ids"])
+            if batch.get("sessions", 0) < self.batch_size:
+                break
+
+        for table, count in totals.items():
+            metrics.observe("session_expiry_rows", count, table)
+        if totals["sessions"]:
+            logger.info(f"Expired {totals['sessions']} sessions: {totals}")
+        return totals
+
+    async def _delete_recordings(self, keys: List[str]):
+        if not self.object_store:
+            return
+        for key in keys:
+            try:
+                await self.object_store.delete(key)
+            except Exception as e:
+                logger.warning(f"Could not delete recording {key} of an expired session: {e}")
+
+    async def _delete_context_caches(self, handles: List[str]):
+        if not self.context_cache:
+            return
+        for handle in handles:
+            await self.context_cache.delete(handle)
@@ -0,0 +1,123 @@
+import base64
+import json
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, field_validator
+
+from db import execute
+
+# Page sizes for the dashboard sessions listing
+SESSION_LIST_DEFAULT_LIMIT = int(os.getenv("SESSION_LIST_DEFAULT_LIMIT", "50"))
+SESSION_LIST_MAX_LIMIT = int(os.getenv("SESSION_LIST_MAX_LIMIT", "200"))
+
+LISTING_VIEW = "session_listing"
+LISTING_COLUMNS = "session_id, created_at, last_activity, is_complete, completed_parts_count, overall_performance, average_score"
+
+# Indexed columns the listing can be ordered by
+SORT_COLUMNS = ("created_at", "last_activity")
+STATUSES = ("completed", "in-progress")
+PERFORMANCE_BANDS = ("Excellent", "Good", "Satisfactory", "Needs Improvement", "pending")
+
+
+class SessionListQuery(BaseModel):
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None  # inclusive
+    status: Optional[str] = None
+    performance: Optional[str] = None
+    min_score: Optional[float] = None
+    max_score: Optional[float] = None
+    sort: str = "created_at"
+    order: str = "desc"
+    cursor: Optional[str] = None
+    limit: int = SESSION_LIST_DEFAULT_LIMIT
+
+    @field_validator("date_from", "date_to", "status", "performance", "min_score", "max_score", "cursor", mode="before")
+    @classmethod
+    def blank_as_unset(cls, value):
+        """Blank query parameters (an empty form field) mean no filter"""
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+
+class SessionPage(BaseModel):
+    rows: List[Dict]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(row: Dict, sort: str) -> str:
+    """Opaque cursor pointing just past `row` in the current ordering"""
+    payload = json.dumps([row[sort], row["session_id"]], default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> List[str]:
+    try:
+        value, session_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return [str(value), str(session_id)]
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _quote(value: str) -> str:
+    """Quote a value for a PostgREST logical filter (timestamps contain reserved characters)"""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def validate(query: SessionListQuery):
+    """Raise ValueError for parameters the listing doesn't support"""
+    if query.sort not in SORT_COLUMNS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+    if query.order not in ("asc", "desc"):
+        raise ValueError("order must be asc or desc")
+    if query.status and query.status not in STATUSES:
+        raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+    if query.performance and query.performance not in PERFORMANCE_BANDS:
+        raise ValueError(f"performance must be one of {', '.join(PERFORMANCE_BANDS)}")
+    if query.cursor:
+        decode_cursor(query.cursor)
+
+
+async def list_sessions(supabase, query: SessionListQuery) -> SessionPage:
+    """One page of the sessions listing, filtered and ordered in the database.
+
+    Pages are addressed by keyset cursor on (sort column, session_id), so each
+    page is an index range scan no matter how deep into the listing it is.
+    """
+    validate(query)
+    limit = max(1, min(query.limit, SESSION_LIST_MAX_LIMIT))
+    descending = query.order == "desc"
+
+    request = supabase.table(LISTING_VIEW).select(LISTING_COLUMNS)
+    if query.date_from:
+        request = request.gte("created_at", query.date_from.isoformat())
+    if query.date_to:
+        request = request.lt("created_at", (query.date_to + timedelta(days=1)).isoformat())
+    if query.status:
+        request = request.eq("is_complete", query.status == "completed")
+    if query.performance == "pending":
+        request = request.is_("overall_performance", "null")
+    elif query.performance:
+        request = request.eq("overall_performance", query.performance)
+    if query.min_score is not None:
+        request = request.gte("average_score", query.min_score)
+    if query.max_score is not None:
+        request = request.lte("average_score", query.max_score)
+
+    if query.cursor:
+        value, session_id = decode_cursor(query.cursor)
+        op = "lt" if descending else "gt"
+        request = request.or_(
+            f"{query.sort}.{op}.{_quote(value)},"
+            f"and({query.sort}.eq.{_quote(value)},session_id.{op}.{_quote(session_id)})"
+        )
+
+    # One extra row tells whether there is a next page
+    result = await execute(
+        request.order(query.sort, desc=descending).order("session_id", desc=descending).limit(limit + 1)
+    )
+    rows = result.data or []
+    next_cursor = encode_cursor(rows[limit - 1], query.sort) if len(rows) > limit else None
+    return SessionPage(rows=rows[:limit], next_cursor=next_cursor)
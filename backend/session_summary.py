@@ -0,0 +1,94 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+# Running per-session summary configuration
+SESSION_SUMMARY_ANSWER_CHARS = int(os.getenv("SESSION_SUMMARY_ANSWER_CHARS", "400"))
+SESSION_SUMMARY_FEEDBACK_CHARS = int(os.getenv("SESSION_SUMMARY_FEEDBACK_CHARS", "300"))
+
+# Hard cap on the estimated size of the final evaluation prompt
+FINAL_PROMPT_TOKEN_BUDGET = int(os.getenv("FINAL_PROMPT_TOKEN_BUDGET", "4000"))
+
+# Rough English average for Gemini tokenizers; good enough for budgeting and reporting
+CHARS_PER_TOKEN = 4
+
+_WHITESPACE = re.compile(r"\s+")
+# End of a sentence: terminal punctuation followed by whitespace, or a line break
+_SENTENCE_END = re.compile(r"[.!?](?=\s)|\n")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a prompt fragment"""
+    return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def shorten(text: str, max_chars: int) -> str:
+    """Cut text to at most max_chars characters at a sentence end, else at a word end marked with an ellipsis"""
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 3:
+        return text[:max_chars]
+    head = text[:max(0, max_chars - 3)]
+    # Only back off to a sentence end if it keeps at least half the allowance
+    sentence_ends = [match.end() for match in _SENTENCE_END.finditer(text[:max_chars])]
+    if sentence_ends and sentence_ends[-1] >= max_chars // 2:
+        return text[:sentence_ends[-1]].rstrip()
+    if not text[len(head)].isspace():
+        word_end = head.rfind(" ")
+        if word_end > 0:
+            head = head[:word_end]
+    return head.rstrip() + "..."
+
+
+def clip(text: Optional[str], max_chars: int) -> str:
+    """Collapse whitespace and cut text to at most max_chars characters"""
+    return shorten(_WHITESPACE.sub(" ", text or "").strip(), max_chars)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens tokens, keeping its formatting"""
+    return shorten(text or "", max_tokens * CHARS_PER_TOKEN)
+
+
+def summarize_part(part, responses: Optional[Dict[str, str]], evaluation) -> str:
+    """Compact summary of one evaluated part: scores, clipped answers and feedback"""
+    scores = evaluation.get("scores") or {}
+    average = evaluation.get("average_score", evaluation.get("averageScore"))
+    if average is None and scores:
+        average = round(sum(scores.values()) / len(scores), 1)
+
+    lines = [f"Part {part['id']}: {part['title']} (average {average}/10)"]
+    if scores:
+        lines.append("Scores: " + ", ".join(f"{key}={value}" for key, value in scores.items()))
+    for question in part.get("questions", []):
+        answer = (responses or {}).get(question["id"])
+        if answer:
+            lines.append(f"{question['id']}: {clip(answer, SESSION_SUMMARY_ANSWER_CHARS)}")
+    transcription = evaluation.get("transcription")
+    if transcription:
+        lines.append(f"Verbal: {clip(transcription, SESSION_SUMMARY_ANSWER_CHARS)}")
+    if evaluation.get("feedback"):
+        lines.append(f"Feedback: {clip(evaluation['feedback'], SESSION_SUMMARY_FEEDBACK_CHARS)}")
+    return "\n".join(lines)
+
+
+def fit_summaries(summaries: List[str], budget_tokens: int) -> str:
+    """Join part summaries, clipping each to an equal share of the budget if they don't fit"""
+    block = "\n\n".join(summaries)
+    if estimate_tokens(block) <= budget_tokens or not summaries:
+        return block
+    share_chars = max(0, budget_tokens * CHARS_PER_TOKEN // len(summaries) - 2)
+    return "\n\n".join(shorten(summary, share_chars) for summary in summaries)
+
+
+def token_report(prompt: str, summary_block: str, baseline_tokens: int, case_study_cached: bool) -> Dict:
+    """Size of the final prompt against the full-transcript prompt it replaces"""
+    prompt_tokens = estimate_tokens(prompt)
+    return {
+        "promptTokens": prompt_tokens,
+        "summaryTokens": estimate_tokens(summary_block),
+        "baselinePromptTokens": baseline_tokens,
+        "savedTokens": max(0, baseline_tokens - prompt_tokens),
+        "budgetTokens": FINAL_PROMPT_TOKEN_BUDGET,
+        "caseStudyCached": case_study_cached
+    }
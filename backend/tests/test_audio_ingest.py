@@ -0,0 +1,100 @@
+import asyncio
+import os
+
+import pytest
+
+import audio_ingest
+from audio_ingest import AudioIngest, ChunkOrderError, IngestCapacityError
+
+
+@pytest.fixture(autouse=True)
+def ingest_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_ingest, "AUDIO_INGEST_DIR", str(tmp_path))
+
+
+async def blocks(*data, fail=False):
+    for block in data:
+        yield block
+    if fail:
+        raise ConnectionError("client went away")
+
+
+def contents(ingest, session_id):
+    with open(ingest.recordings[session_id].path, "rb") as recording:
+        return recording.read()
+
+
+def test_chunks_append_in_order():
+    async def run():
+        ingest = AudioIngest(None)
+        await ingest.append("s", "r", 0, blocks(b"aa", b"bb"), "audio/webm", 1000)
+        status = await ingest.append("s", "r", 1, blocks(b"cc"), "audio/webm", 2000)
+        assert status["receivedChunks"] == 2
+        assert status["elapsedMs"] == 2000
+        assert contents(ingest, "s") == b"aabbcc"
+
+    asyncio.run(run())
+
+
+def test_out_of_order_chunks_are_rejected():
+    async def run():
+        ingest = AudioIngest(None)
+        with pytest.raises(ChunkOrderError):
+            await ingest.append("s", "r", 1, blocks(b"aa"), "audio/webm", 1000)
+        await ingest.append("s", "r", 0, blocks(b"aa"), "audio/webm", 1000)
+        with pytest.raises(ChunkOrderError):
+            await ingest.append("s", "r", 2, blocks(b"cc"), "audio/webm", 3000)
+
+    asyncio.run(run())
+
+
+def test_resent_chunks_are_duplicates():
+    async def run():
+        ingest = AudioIngest(None)
+        await ingest.append("s", "r", 0, blocks(b"aa"), "audio/webm", 1000)
+        await ingest.append("s", "r", 1, blocks(b"bb"), "audio/webm", 2000)
+        status = await ingest.append("s", "r", 0, blocks(b"zz"), "audio/webm", 1000)
+        assert status["receivedChunks"] == 2
+        assert contents(ingest, "s") == b"aabb"
+
+    asyncio.run(run())
+
+
+def test_partial_chunk_is_rolled_back():
+    async def run():
+        ingest = AudioIngest(None)
+        await ingest.append("s", "r", 0, blocks(b"aa"), "audio/webm", 1000)
+        with pytest.raises(ConnectionError):
+            await ingest.append("s", "r", 1, blocks(b"bb", fail=True), "audio/webm", 2000)
+        assert ingest.recordings["s"].size == 2
+        await ingest.append("s", "r", 1, blocks(b"bb", b"cc"), "audio/webm", 2000)
+        assert contents(ingest, "s") == b"aabbcc"
+
+    asyncio.run(run())
+
+
+def test_new_recording_replaces_the_old_one():
+    async def run():
+        ingest = AudioIngest(None)
+        await ingest.append("s", "r1", 0, blocks(b"old"), "audio/webm", 1000)
+        old_path = ingest.recordings["s"].path
+        await ingest.append("s", "r2", 0, blocks(b"new"), "audio/webm", 1000)
+        assert contents(ingest, "s") == b"new"
+        assert not os.path.exists(old_path)
+        with pytest.raises(ChunkOrderError):
+            await ingest.append("s", "r1", 1, blocks(b"late"), "audio/webm", 2000)
+
+    asyncio.run(run())
+
+
+def test_capacity_limits():
+    async def run():
+        ingest = AudioIngest(None, max_recordings=1, max_total_bytes=4)
+        await ingest.append("s", "r", 0, blocks(b"aa"), "audio/webm", 1000)
+        with pytest.raises(IngestCapacityError):
+            await ingest.append("t", "r", 0, blocks(b"aa"), "audio/webm", 1000)
+        with pytest.raises(IngestCapacityError):
+            await ingest.append("s", "r", 1, blocks(b"bbb"), "audio/webm", 2000)
+        assert ingest.total_bytes() == 2
+
+    asyncio.run(run())
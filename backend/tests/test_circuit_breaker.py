@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+import llm_gateway
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN
+from retry_policy import BUDGET_EXHAUSTED
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=0)
+    monkeypatch.setattr(llm_gateway, "breaker", breaker)
+    return breaker
+
+
+def test_opens_after_consecutive_failures_and_recovers():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=60)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+def test_budget_cancellation_counts_as_failure(breaker):
+    llm_gateway._record_outcome(asyncio.CancelledError(BUDGET_EXHAUSTED))
+    llm_gateway._record_outcome(asyncio.CancelledError(BUDGET_EXHAUSTED))
+    assert breaker.state == OPEN
+
+
+def test_caller_cancellation_is_neutral(breaker):
+    breaker.record_failure()
+    llm_gateway._record_outcome(asyncio.CancelledError())
+    llm_gateway._record_outcome(GeneratorExit())
+    assert breaker.consecutive_failures == 1
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_trial_frees_half_open_slot(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.allow()
+    llm_gateway._record_outcome(asyncio.CancelledError())
+    assert breaker.allow()
+
+
+def test_only_service_errors_count(breaker):
+    llm_gateway._record_outcome(asyncio.TimeoutError())
+    assert breaker.consecutive_failures == 1
+    llm_gateway._record_outcome(ValueError("bad JSON"))
+    assert breaker.consecutive_failures == 0
@@ -0,0 +1,17 @@
+from evaluation_cache import make_cache_key
+
+RUBRICS = {"clarity": "Is it clear?", "depth": "Is it deep?"}
+
+
+def test_key_ignores_response_order_and_whitespace():
+    first = make_cache_key("Case study", {"q1": "An answer", "q2": "Another"}, RUBRICS, "v1")
+    second = make_cache_key("Case study", {"q2": "Another", "q1": "  An   answer "}, dict(reversed(list(RUBRICS.items()))), "v1")
+    assert first == second
+
+
+def test_key_changes_with_content_and_prompt_version():
+    base = make_cache_key("Case study", {"q1": "An answer"}, RUBRICS, "v1")
+    assert make_cache_key("Case study", {"q1": "A different answer"}, RUBRICS, "v1") != base
+    assert make_cache_key("Other case", {"q1": "An answer"}, RUBRICS, "v1") != base
+    assert make_cache_key("Case study", {"q1": "An answer"}, {"clarity": "Is it clear?"}, "v1") != base
+    assert make_cache_key("Case study", {"q1": "An answer"}, RUBRICS, "v2") != base
@@ -0,0 +1,37 @@
+import json
+
+from evaluation_stream import IncrementalEvaluationParser, sse_event
+
+
+def feed_all(parser, chunks):
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events
+
+
+def test_scores_are_emitted_once_complete():
+    parser = IncrementalEvaluationParser(["clarity", "depth"])
+    assert parser.feed('{"scores": {"clarity": 7') == []
+    assert parser.feed('.5, "depth"') == [("score", {"rubric": "clarity", "score": 7.5})]
+    assert parser.feed(": 6}") == [("score", {"rubric": "depth", "score": 6.0})]
+    assert parser.scores == {"clarity": 7.5, "depth": 6.0}
+
+
+def test_feedback_streams_as_deltas():
+    parser = IncrementalEvaluationParser(["clarity"])
+    events = feed_all(parser, ['{"clarity": 8, "feedback": "Goo', 'd work', ', well done."}'])
+    deltas = [data["delta"] for event, data in events if event == "feedback"]
+    assert "".join(deltas) == "Good work, well done."
+    assert parser.feedback == "Good work, well done."
+
+
+def test_split_escape_sequences_are_held_back():
+    parser = IncrementalEvaluationParser([])
+    text = json.dumps({"feedback": 'Say "café"\nnext'})
+    events = feed_all(parser, [text[i:i + 3] for i in range(0, len(text), 3)])
+    assert "".join(data["delta"] for _, data in events) == 'Say "café"\nnext'
+
+
+def test_sse_event_format():
+    assert sse_event("score", {"rubric": "a", "score": 1}) == 'event: score\ndata: {"rubric": "a", "score": 1}\n\n'
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import pytest
+
+from retry_policy import RetryPolicy, call_with_retry, iterate_with_budget, BUDGET_EXHAUSTED
+
+
+def no_backoff(**kwargs):
+    return RetryPolicy(base_delay=0, max_delay=0, **kwargs)
+
+
+def test_retries_retryable_errors_until_success():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ValueError("not JSON yet")
+        return "ok"
+
+    assert asyncio.run(call_with_retry("test", flaky, no_backoff(max_attempts=3))) == "ok"
+    assert len(calls) == 3
+
+
+def test_gives_up_after_max_attempts():
+    calls = []
+
+    async def broken():
+        calls.append(1)
+        raise ValueError("still not JSON")
+
+    with pytest.raises(ValueError):
+        asyncio.run(call_with_retry("test", broken, no_backoff(max_attempts=2)))
+    assert len(calls) == 2
+
+
+def test_fatal_errors_are_not_retried():
+    calls = []
+
+    async def fatal():
+        calls.append(1)
+        raise KeyError("bug")
+
+    with pytest.raises(KeyError):
+        asyncio.run(call_with_retry("test", fatal, no_backoff(max_attempts=3)))
+    assert len(calls) == 1
+
+
+def test_attempt_is_cancelled_when_budget_runs_out():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError as e:
+            cancelled.append(e.args)
+            raise
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(call_with_retry("test", slow, no_backoff(max_attempts=3, deadline_seconds=0.1)))
+    assert time.monotonic() - started < 1
+    assert cancelled == [(BUDGET_EXHAUSTED,)]
+
+
+def test_budget_is_shared_from_started():
+    async def instant():
+        return "ok"
+
+    policy = no_backoff(deadline_seconds=1)
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(call_with_retry("test", instant, policy, started=time.monotonic() - 2))
+
+
+def test_stream_stops_at_budget():
+    async def stalls():
+        yield "first"
+        await asyncio.sleep(5)
+        yield "never"
+
+    received = []
+
+    async def consume():
+        async for item in iterate_with_budget("test", stalls(), policy=no_backoff(deadline_seconds=0.1)):
+            received.append(item)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(consume())
+    assert received == ["first"]
+
+
+def test_backoff_honours_max_delay():
+    policy = RetryPolicy(base_delay=1, max_delay=2)
+    assert all(0 <= policy.backoff(retry, ValueError()) <= 2 for retry in range(1, 10))
@@ -0,0 +1,20 @@
+import pytest
+
+from session_listing import encode_cursor, decode_cursor
+
+
+def test_cursor_round_trip():
+    row = {"created_at": "2026-10-01T12:00:00+00:00", "session_id": "abc-123"}
+    assert decode_cursor(encode_cursor(row, "created_at")) == ["2026-10-01T12:00:00+00:00", "abc-123"]
+
+
+def test_cursor_is_url_safe():
+    row = {"last_activity": "2026-10-01T12:00:00.123456+00:00", "session_id": "??>>"}
+    cursor = encode_cursor(row, "last_activity")
+    assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24=", "WzFd"])
+def test_invalid_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
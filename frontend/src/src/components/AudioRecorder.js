@@ -1,7 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import './AudioRecorder.css';
 
-function AudioRecorder({ onAudioData, disabled }) {
+function AudioRecorder({ onAudioData, onAudioChunk, disabled }) {
   const [isRecording, setIsRecording] = useState(false);
   const [recordingTime, setRecordingTime] = useState(0);
   const [audioBlob, setAudioBlob] = useState(null);
@@ -11,7 +11,11 @@ function AudioRecorder({ onAudioData, disabled }) {
   const audioChunks = useRef([]);
   const timerInterval = useRef(null);
   
+  const chunkSeq = useRef(0);
+  const recordingStartedAt = useRef(0);
+  
   const MAX_RECORDING_TIME = 120; // 2 minutes in seconds
+  const CHUNK_INTERVAL_MS = 5000; // Chunks streamed to the server while recording
 
   useEffect(() => {
     return () => {
@@ -40,10 +44,16 @@ function AudioRecorder({ onAudioData, disabled }) {
       });
       
       audioChunks.current = [];
+      chunkSeq.current = 0;
+      recordingStartedAt.current = Date.now();
       
       mediaRecorder.current.ondataavailable = (event) => {
         if (event.data.size > 0) {
           audioChunks.current.push(event.data);
+          if (onAudioChunk) {
+            onAudioChunk(event.data, chunkSeq.current, Date.now() - recordingStartedAt.current);
+            chunkSeq.current += 1;
+          }
         }
       };
       
@@ -51,13 +61,14 @@ function AudioRecorder({ onAudioData, disabled }) {
         const audioBlob = new Blob(audioChunks.current, { type: 'audio/webm;codecs=opus' });
         setAudioBlob(audioBlob);
         setHasRecording(true);
-        convertToBase64(audioBlob);
+        // The blob is uploaded as-is to the streaming audio endpoint
+        onAudioData(audioBlob);
         
         // Stop all tracks to free up microphone
         stream.getTracks().forEach(track => track.stop());
       };
       
-      mediaRecorder.current.start();
+      mediaRecorder.current.start(onAudioChunk ? CHUNK_INTERVAL_MS : undefined);
       setIsRecording(true);
       setRecordingTime(0);
       
@@ -91,15 +102,6 @@ function AudioRecorder({ onAudioData, disabled }) {
     }
   };
 
-  const convertToBase64 = (blob) => {
-    const reader = new FileReader();
-    reader.onload = () => {
-      const base64String = reader.result.split(',')[1]; // Remove data:audio/webm;base64, prefix
-      onAudioData(base64String);
-    };
-    reader.readAsDataURL(blob);
-  };
-
   const resetRecording = () => {
     setAudioBlob(null);
     setHasRecording(false);
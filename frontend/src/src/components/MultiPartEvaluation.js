@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import './MultiPartEvaluation.css';
 import PartComponent from './PartComponent';
 import FinalResults from './FinalResults';
@@ -128,30 +128,77 @@ function MultiPartEvaluation() {
     });
   };
 
+  // Part 5 chunks are uploaded in order while recording so transcription can start early
+  const audioUpload = useRef({ queue: Promise.resolve(), failed: false, chunks: 0, recordingId: null });
+
+  const handleAudioChunk = (chunk, seq, elapsedMs) => {
+    if (seq === 0) {
+      // A new id per recording, so the server can tell a re-recording from a resent first chunk
+      const recordingId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+      audioUpload.current = { queue: Promise.resolve(), failed: false, chunks: 0, recordingId };
+    }
+    const upload = audioUpload.current;
+    upload.queue = upload.queue.then(async () => {
+      if (upload.failed) return;
+      try {
+        const response = await fetch(`${API_BASE_URL}/api/audio-chunks?sessionId=${encodeURIComponent(sessionData.sessionId)}&recordingId=${upload.recordingId}&seq=${seq}&elapsedMs=${Math.round(elapsedMs)}`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': chunk.type || 'audio/webm',
+          },
+          body: chunk,
+        });
+        if (!response.ok) {
+          throw new Error('Failed to upload audio chunk');
+        }
+        upload.chunks += 1;
+      } catch (error) {
+        // The whole recording is uploaded on submit instead
+        console.error('Error uploading audio chunk:', error);
+        upload.failed = true;
+      }
+    });
+  };
+
   const handlePartSubmit = async (partId, responses, audioData = null) => {
     setIsSubmitting(true);
     setShowLoadingOverlay(true);
     
     try {
-      const requestBody = {
-        partId,
-        responses,
-        sessionId: sessionData.sessionId
-      };
-
-      // Add audio data for Part 5
+      let response = null;
       if (audioData) {
-        requestBody.audioData = audioData;
+        const upload = audioUpload.current;
+        await upload.queue;
+        if (!upload.failed && upload.chunks > 0) {
+          // Chunks already on the server: only the untranscribed tail is left to process
+          response = await fetch(`${API_BASE_URL}/api/submit-part/audio/complete?sessionId=${encodeURIComponent(sessionData.sessionId)}`, {
+            method: 'POST',
+          });
+        }
+        if (!response || !response.ok) {
+          // Part 5: upload the recording as a raw body instead of base64 JSON
+          response = await fetch(`${API_BASE_URL}/api/submit-part/audio?sessionId=${encodeURIComponent(sessionData.sessionId)}`, {
+            method: 'POST',
+            headers: {
+              'Content-Type': audioData.type || 'audio/webm',
+            },
+            body: audioData,
+          });
+        }
+      } else {
+        response = await fetch(`${API_BASE_URL}/api/submit-part`, {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({
+            partId,
+            responses,
+            sessionId: sessionData.sessionId
+          }),
+        });
       }
 
-      const response = await fetch(`${API_BASE_URL}/api/submit-part`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(requestBody),
-      });
-
       if (!response.ok) {
         throw new Error('Failed to submit part');
       }
@@ -289,6 +336,7 @@ function MultiPartEvaluation() {
                 key={part.id}
                 part={part}
                 onSubmit={handlePartSubmit}
+                onAudioChunk={handleAudioChunk}
                 isSubmitting={isSubmitting}
                 evaluation={partEvaluations[part.id]}
                 demoResponses={getDemoResponsesForCurrentPart()}
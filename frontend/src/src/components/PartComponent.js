@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import './PartComponent.css';
 import AudioRecorder from './AudioRecorder';
 
-function PartComponent({ part, onSubmit, isSubmitting, evaluation, demoResponses, onDemoModeChange }) {
+function PartComponent({ part, onSubmit, onAudioChunk, isSubmitting, evaluation, demoResponses, onDemoModeChange }) {
   const [responses, setResponses] = useState({});
   const [audioData, setAudioData] = useState(null);
 
@@ -24,10 +24,10 @@ function PartComponent({ part, onSubmit, isSubmitting, evaluation, demoResponses
     }));
   };
 
-  const handleAudioData = (base64Data) => {
-    setAudioData(base64Data);
+  const handleAudioData = (audioBlob) => {
+    setAudioData(audioBlob);
     // For audio questions, we set a placeholder response
-    if (base64Data) {
+    if (audioBlob) {
       setResponses(prev => ({
         ...prev,
         'q5_verbal': 'Audio recording submitted'
@@ -135,6 +135,7 @@ function PartComponent({ part, onSubmit, isSubmitting, evaluation, demoResponses
               <div className="audio-question">
                 <AudioRecorder 
                   onAudioData={handleAudioData}
+                  onAudioChunk={onAudioChunk}
                   disabled={isSubmitting}
                 />
                 {question.instructions && (